@@ -1,11 +1,34 @@
 # /app/routers/rundeck.py
+import asyncio
+import heapq
 import os
 import re
-from fastapi import APIRouter, Query, HTTPException
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from fastapi import APIRouter, Query, HTTPException, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, Response
+from starlette.responses import StreamingResponse
+from services import rundeck_cache
 from services.rundeck_client import RundeckClient
+from services.rundeck_tail import TAILS
+from services.swr_cache import SWRCache
 
 router = APIRouter(prefix="/api/rundeck", tags=["rundeck"])
 
+# Execution history is cached briefly and revalidated in the background; concurrent
+# requests for the same page depth share one upstream fetch.
+RUNDECK_HISTORY_TTL = float(os.getenv("RUNDECK_HISTORY_TTL", "5"))       # seconds served as fresh
+RUNDECK_HISTORY_STALE = float(os.getenv("RUNDECK_HISTORY_STALE", "30"))  # extra seconds served while refreshing
+HISTORY_DEPTH_STEP = 50
+# Deepest page served: every job is fetched down to offset+limit, so this bounds the upstream
+# request size and the number of distinct depths the cache can hold
+HISTORY_MAX_OFFSET = int(os.getenv("RUNDECK_HISTORY_MAX_OFFSET", "1000"))
+TAIL_KEEPALIVE_S = float(os.getenv("SSE_KEEPALIVE_S", "15"))
+
+_HISTORY_CACHE = SWRCache(ttl=RUNDECK_HISTORY_TTL, stale=RUNDECK_HISTORY_STALE)
+_FANOUT = ThreadPoolExecutor(max_workers=8, thread_name_prefix="rundeck-fanout")
+
 def _client():
     return RundeckClient()
 
@@ -28,59 +51,183 @@ def _parse_opt(argstring: str | None, opt: str) -> str | None:
 @router.get("/executions")
 def list_executions(
     limit: int = Query(20, ge=1, le=200),
-    offset: int = Query(0, ge=0),
+    offset: int = Query(0, ge=0, le=HISTORY_MAX_OFFSET),
 ):
     """
     Aggregated run history across LM-managed Rundeck jobs.
-    Pagination is applied AFTER merge + sort.
+    Pagination is applied AFTER merge + sort, down to RUNDECK_HISTORY_MAX_OFFSET.
     """
-    c = _client()
     job_ids = _job_ids()
     if not job_ids:
         raise HTTPException(status_code=500, detail="No Rundeck job IDs configured.")
 
-    merged: list[dict] = []
-    per_job_fetch = min(limit * 2, 100)
+    # Any page needs at most offset+limit executions from each job; depths are bucketed so
+    # nearby pages (and the Events page polling) share one cached upstream fetch.
+    depth = -(-(offset + limit) // HISTORY_DEPTH_STEP) * HISTORY_DEPTH_STEP
+    merged, total = _HISTORY_CACHE.get((tuple(job_ids), depth), lambda: _fetch_history(job_ids, depth))
+
+    page = merged[offset: offset + limit]
+    return {"items": page, "limit": limit, "offset": offset, "total": total}
+
+@router.get("/executions/stats")
+def executions_cache_stats():
+    return _HISTORY_CACHE.stats()
 
-    for job_id in job_ids:
-        data = c.job_executions(job_id, max=per_job_fetch, offset=0) or {}
+def _fetch_history(job_ids: list[str], depth: int) -> tuple[list[dict], int]:
+    """Newest `depth` executions of every job, fetched concurrently and k-way merged."""
+    c = _client()
+    futures = [_FANOUT.submit(c.job_executions, job_id, depth, 0) for job_id in job_ids]
+
+    per_job: list[list[dict]] = []
+    total = 0
+    for fut in futures:
+        data = fut.result() or {}
         executions = data.get("executions") or []
+        total += (data.get("paging") or {}).get("total") or len(executions)
+        items = [_execution_item(ex) for ex in executions]
+        # Rundeck returns newest first already; sorting a sorted list is cheap insurance for the merge
+        items.sort(key=_started, reverse=True)
+        per_job.append(items)
 
-        for ex in executions:
-            argstring = ex.get("argstring") or ""
-            merged.append({
-                "executionId": ex.get("id"),
-                "status": ex.get("status"),
-                "project": ex.get("project"),
-                "user": ex.get("user"),
-                "dateStarted": (ex.get("date-started") or {}).get("date"),
-                "dateEnded": (ex.get("date-ended") or {}).get("date"),
-                "argstring": argstring,
-                # helpful derived fields so UI doesnt need to regex
-                "machineName": _parse_opt(argstring, "machineName"),
-                "lmRunId": _parse_opt(argstring, "lmRunId"),
-                "job": {
-                    "id": (ex.get("job") or {}).get("id"),
-                    "name": (ex.get("job") or {}).get("name"),
-                },
-            })
-
-    merged.sort(key=lambda x: x.get("dateStarted") or "", reverse=True)
-    total = len(merged)
-    page = merged[offset: offset + limit]
+    merged = list(islice(heapq.merge(*per_job, key=_started, reverse=True), depth))
+    return merged, total
 
-    return {"items": page, "limit": limit, "offset": offset, "total": total}
+def _started(item: dict) -> str:
+    return item.get("dateStarted") or ""
+
+def _execution_item(ex: dict) -> dict:
+    argstring = ex.get("argstring") or ""
+    return {
+        "executionId": ex.get("id"),
+        "status": ex.get("status"),
+        "project": ex.get("project"),
+        "user": ex.get("user"),
+        "dateStarted": (ex.get("date-started") or {}).get("date"),
+        "dateEnded": (ex.get("date-ended") or {}).get("date"),
+        "argstring": argstring,
+        # helpful derived fields so UI doesnt need to regex
+        "machineName": _parse_opt(argstring, "machineName"),
+        "lmRunId": _parse_opt(argstring, "lmRunId"),
+        "job": {
+            "id": (ex.get("job") or {}).get("id"),
+            "name": (ex.get("job") or {}).get("name"),
+        },
+    }
+
+# Finished executions are served from rundeck_execution_cache and never change
+IMMUTABLE_HEADERS = {"Cache-Control": "private, max-age=31536000, immutable"}
+
+def _cached_or_none(read, execution_id: int):
+    try:
+        return read(execution_id)
+    except Exception as e:
+        # cache unavailable (DB down): fall through to Rundeck
+        print(f"[rundeck-cache] read for {execution_id} failed: {e}")
+        return None
+
+def _immutable(request: Request, etag: str, body: dict | None = None) -> Response:
+    headers = {**IMMUTABLE_HEADERS, "ETag": etag}
+    if etag in (request.headers.get("if-none-match") or ""):
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(jsonable_encoder(body), headers=headers)
 
 @router.get("/executions/{execution_id}")
-def get_execution(execution_id: int):
+def get_execution(execution_id: int, request: Request):
+    detail = _cached_or_none(rundeck_cache.cached_detail, execution_id)
+    if detail is not None:
+        return _immutable(request, f'"rdx-{execution_id}"', detail)
+
     c = _client()
-    return c.execution_detail(execution_id)
+    detail = c.execution_detail(execution_id)
+    rundeck_cache.remember(execution_id, detail)
+    return detail
 
 @router.get("/executions/{execution_id}/output")
 def get_execution_output(
     execution_id: int,
+    request: Request,
     offset: int = Query(0, ge=0),
     lastmod: int = Query(0, ge=0),
 ):
+    if _cached_or_none(rundeck_cache.cached_output, execution_id) is not None:
+        data = rundeck_cache.execution_output(None, execution_id, offset=offset, lastmod=lastmod)
+        if data.get("cached"):
+            return _immutable(request, f'"rdo-{execution_id}-{offset}"', data)
+        return data
+
     c = _client()
     return c.execution_output(execution_id, offset=offset, lastmod=lastmod)
+
+@router.get("/executions/{execution_id}/log")
+def get_execution_log(execution_id: int, request: Request):
+    """
+    Plain-text log of a finished execution, served locally. Supports Range: bytes=a-b / a- / -n
+    for paging through large logs. 409 while the execution is still running.
+    """
+    output = _cached_or_none(rundeck_cache.cached_output, execution_id) or rundeck_cache.ensure(execution_id)
+    if output is None:
+        raise HTTPException(status_code=409, detail="Execution is still running; use /output/stream")
+
+    text = rundeck_cache.log_text(output)
+    headers = {**IMMUTABLE_HEADERS, "ETag": f'"rdl-{execution_id}"', "Accept-Ranges": "bytes"}
+    if headers["ETag"] in (request.headers.get("if-none-match") or ""):
+        return Response(status_code=304, headers=headers)
+
+    rng = request.headers.get("range")
+    if not rng:
+        return Response(text, media_type="text/plain; charset=utf-8", headers=headers)
+
+    m = re.fullmatch(r"\s*bytes=(\d*)-(\d*)\s*", rng)
+    size = len(text)
+    if not m or (m.group(1) == "" and m.group(2) == ""):
+        raise HTTPException(status_code=416, detail="Only a single bytes=start-end range is supported",
+                            headers={"Content-Range": f"bytes */{size}"})
+    if m.group(1) == "":
+        start, end = max(0, size - int(m.group(2))), size - 1   # suffix: last n bytes
+    else:
+        start = int(m.group(1))
+        end = min(int(m.group(2)), size - 1) if m.group(2) else size - 1
+    if start >= size or start > end:
+        raise HTTPException(status_code=416, detail="Range not satisfiable",
+                            headers={"Content-Range": f"bytes */{size}"})
+
+    headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    return Response(text[start:end + 1], status_code=206, media_type="text/plain; charset=utf-8", headers=headers)
+
+@router.get("/executions/{execution_id}/output/stream")
+async def stream_execution_output(execution_id: int, request: Request):
+    """
+    SSE log tail shared by every viewer of the execution (services.rundeck_tail).
+    Events: "output" {"entries": [{"log", "time", "level"}], "truncated"?} with the line
+    number as id, and a final "state" {"completed", "execState", "error"?}.
+    """
+    try:
+        last_seq = int(request.headers.get("last-event-id") or request.query_params.get("lastEventId") or 0)
+    except ValueError:
+        last_seq = 0
+    tail = TAILS.get(execution_id)
+    client_id, q, backlog = tail.subscribe(last_seq)
+
+    async def gen():
+        yield b"retry: 2000\n\n"
+        if backlog:
+            yield b"".join(backlog)
+        try:
+            while True:
+                try:
+                    frame = await asyncio.wait_for(q.get(), timeout=TAIL_KEEPALIVE_S)
+                except asyncio.TimeoutError:
+                    yield b": keepalive\n\n"
+                    continue
+                if frame is None:
+                    return  # dropped for falling behind; the browser reconnects and resumes
+                yield frame
+        finally:
+            tail.unsubscribe(client_id)
+
+    headers = {"Cache-Control": "no-cache", "Connection": "keep-alive", "X-Accel-Buffering": "no"}
+    return StreamingResponse(gen(), media_type="text/event-stream", headers=headers)
+
+@router.get("/tails")
+def tail_stats():
+    return TAILS.stats()
@@ -0,0 +1,188 @@
+# /app/services/event_bus.py
+import asyncio
+import json
+import os
+import queue
+import threading
+import time
+
+from services.db_pool import get_pool
+from services.events import EventBroker, sse_frame
+from services.pg_listen import LISTENER
+
+# Cross-process SSE fan-out over Postgres LISTEN/NOTIFY.
+#
+# publish() (any process: API workers, worker.py) -> publisher thread -> one batched
+# pg_notify('lm_events', ...) statement. Every API process keeps one LISTEN connection and
+# re-broadcasts what it receives to its local SSE clients, so it doesn't matter which
+# uvicorn worker or replica handled the request that produced the event (services.pg_listen).
+#
+# Notification payload: "<id> <event> <json>", or "<id> <event> *" when the JSON does not fit
+# into a NOTIFY (8000 bytes) and was written to event_outbox instead.
+
+EVENTS_BACKEND = os.getenv("EVENTS_BACKEND", "postgres")  # "local" = single process, no NOTIFY
+EVENTS_CHANNEL = "lm_events"
+EVENT_NOTIFY_MAX_BYTES = 7900                              # hard limit is 8000 incl. id/event prefix
+EVENT_PUBLISH_BATCH = int(os.getenv("EVENT_PUBLISH_BATCH", "500"))
+EVENT_OUTBOX_RETENTION = int(os.getenv("EVENT_OUTBOX_RETENTION", "3600"))  # seconds
+
+_PUBLISH_SQL = """
+WITH items AS (
+    SELECT t.n, t.event, t.data, t.big, nextval('lm_event_seq') AS id
+    FROM unnest(%s::text[], %s::text[], %s::bool[]) WITH ORDINALITY AS t(event, data, big, n)
+),
+outbox AS (
+    INSERT INTO event_outbox (id, event, data)
+    SELECT id, event, data FROM items WHERE big
+)
+SELECT pg_notify(%s, i.id || ' ' || i.event || ' ' || CASE WHEN i.big THEN '*' ELSE i.data END)
+FROM items i
+ORDER BY i.n
+"""
+
+
+class PgEventBus:
+    def __init__(self, broker: EventBroker):
+        self._broker = broker
+        self._queue: queue.Queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._publisher: threading.Thread | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._last_cleanup = 0.0
+        self._published = 0
+        self._received = 0
+        self._dropped = 0
+
+    # --- publishing (any process) ---
+
+    def send(self, event: str, items: list[dict]) -> None:
+        for data in items:
+            self._queue.put((event, json.dumps(data, default=str)))
+        self._ensure_publisher()
+
+    def _ensure_publisher(self) -> None:
+        if self._publisher is not None and self._publisher.is_alive():
+            return
+        with self._lock:
+            if self._publisher is None or not self._publisher.is_alive():
+                self._publisher = threading.Thread(target=self._publish_loop, name="event-publisher", daemon=True)
+                self._publisher.start()
+
+    def _publish_loop(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            while len(batch) < EVENT_PUBLISH_BATCH:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    self._flush(batch)
+                    return
+                batch.append(item)
+            self._flush(batch)
+
+    def _flush(self, batch: list[tuple[str, str]]) -> None:
+        events = [event for event, _ in batch]
+        datas = [data for _, data in batch]
+        big = [len(data.encode("utf-8")) + len(event) + 24 > EVENT_NOTIFY_MAX_BYTES for event, data in batch]
+        try:
+            with get_pool().connection() as c, c.cursor() as cur:
+                cur.execute(_PUBLISH_SQL, (events, datas, big, EVENTS_CHANNEL))
+                if any(big) and time.monotonic() - self._last_cleanup > 60:
+                    cur.execute(
+                        "DELETE FROM event_outbox WHERE created_at < now() - make_interval(secs => %s)",
+                        (EVENT_OUTBOX_RETENTION,),
+                    )
+                    self._last_cleanup = time.monotonic()
+            self._published += len(batch)
+        except Exception as e:
+            # Realtime events are best effort; the UI catches up on its next refresh
+            self._dropped += len(batch)
+            print(f"[event-bus] publish of {len(batch)} event(s) failed: {e}")
+
+    # --- listening (API processes only) ---
+
+    def start_listener(self, loop: asyncio.AbstractEventLoop) -> None:
+        self._loop = loop
+        LISTENER.add(EVENTS_CHANNEL, self._dispatch, self._on_connect)
+        LISTENER.start()
+
+    def _on_connect(self) -> None:
+        # Anything published while we were not listening is gone for our clients
+        if self._broker.client_count():
+            self._call_on_loop(self._broker.resync_all, "event bus reconnected")
+
+    def _dispatch(self, conn, payloads: list[str]) -> None:
+        parsed = []
+        outbox_ids = []
+        for payload in payloads:
+            try:
+                event_id, event, data = payload.split(" ", 2)
+                event_id = int(event_id)
+            except ValueError:
+                continue
+            if data == "*":
+                outbox_ids.append(event_id)
+            parsed.append((event_id, event, data))
+
+        stored: dict[int, str] = {}
+        if outbox_ids:
+            with conn.cursor() as cur:
+                cur.execute("SELECT id, data FROM event_outbox WHERE id = ANY(%s)", (outbox_ids,))
+                stored = dict(cur.fetchall())
+
+        batch = []
+        for event_id, event, data in parsed:
+            if data == "*":
+                data = stored.get(event_id)
+                if data is None:
+                    continue  # purged already
+            batch.append((event_id, sse_frame(event, data)))
+
+        self._received += len(batch)
+        if batch:
+            self._call_on_loop(self._broker.deliver, batch)
+
+    def _call_on_loop(self, fn, *args) -> None:
+        loop = self._loop
+        if loop is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(fn, *args)
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Flush pending events and stop the publisher thread."""
+        publisher = self._publisher
+        if publisher is not None and publisher.is_alive():
+            self._queue.put(None)
+            publisher.join(timeout)
+
+    def stats(self) -> dict:
+        return {
+            "backend": "postgres",
+            "pending": self._queue.qsize(),
+            "published": self._published,
+            "received": self._received,
+            "dropped": self._dropped,
+            "listener": LISTENER.stats(),
+        }
+
+
+_BUS: PgEventBus | None = None
+
+
+def install(broker: EventBroker) -> PgEventBus | None:
+    """Route broker.publish() through Postgres. No-op when EVENTS_BACKEND=local."""
+    global _BUS
+    if EVENTS_BACKEND != "postgres":
+        return None
+    if _BUS is None:
+        _BUS = PgEventBus(broker)
+        broker.set_relay(_BUS.send)
+    return _BUS
+
+
+def get_bus() -> PgEventBus | None:
+    return _BUS
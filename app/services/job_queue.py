@@ -0,0 +1,274 @@
+# /app/services/job_queue.py
+import os
+import socket
+import threading
+import time
+
+from psycopg2.extras import RealDictCursor
+
+from services.db_pool import get_pool
+from services.events import BROKER
+from services.rundeck_jobs import JOB_CONFIG, trigger_rundeck_job
+
+# Durable work queue for Rundeck triggers (table: job_queue).
+# Rows are claimed with FOR UPDATE SKIP LOCKED and hidden for JOB_VISIBILITY_TIMEOUT seconds;
+# a worker that dies mid-job simply lets the row become visible again for another worker.
+#
+# Triggers are sent at most once: the row is marked triggered_at before the POST to Rundeck,
+# and a marked row is never claimed again. It is retried only when Rundeck provably did not
+# start the job; a marked row a dead worker left behind is dropped by the sweep, as is one
+# whose attempts ran out while its worker crashed.
+
+BULK_WORKERS = int(os.getenv("BULK_WORKERS", "3"))          # concurrency cap (per process)
+BULK_DELAY_MS = int(os.getenv("BULK_DELAY_MS", "150"))      # small pacing delay between triggers
+JOB_VISIBILITY_TIMEOUT = int(os.getenv("JOB_VISIBILITY_TIMEOUT", "120"))  # seconds a claimed job stays hidden
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+JOB_RETRY_DELAY = int(os.getenv("JOB_RETRY_DELAY", "15"))   # seconds, multiplied by attempt number
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "1.0"))  # idle poll when nothing was enqueued locally
+JOB_SWEEP_INTERVAL = float(os.getenv("JOB_SWEEP_INTERVAL", "30"))  # seconds between stranded-row sweeps (per worker)
+
+# trigger_rundeck_job status codes that prove the job was not started
+_NOT_STARTED = (502, 503)
+
+# Set when this process enqueues work so local workers don't wait for the next poll.
+_WAKE = threading.Event()
+
+
+class PermanentJobError(Exception):
+    """Job can never succeed (bad action / missing config) - fail the run without retrying."""
+
+
+class NotSentJobError(Exception):
+    """Failed before anything reached Rundeck - safe to retry."""
+
+
+def wake_workers() -> None:
+    _WAKE.set()
+
+
+def _claim(worker_id: str) -> dict | None:
+    with get_pool().connection() as c, c.cursor(cursor_factory=RealDictCursor) as cur:
+        cur.execute(
+            """
+            UPDATE job_queue q
+            SET attempts   = q.attempts + 1,
+                visible_at = now() + make_interval(secs => %s),
+                locked_by  = %s,
+                locked_at  = now()
+            FROM (
+                SELECT id
+                FROM job_queue
+                WHERE visible_at <= now()
+                  AND attempts < max_attempts
+                  AND triggered_at IS NULL
+                ORDER BY id
+                FOR UPDATE SKIP LOCKED
+                LIMIT 1
+            ) next_job
+            WHERE q.id = next_job.id
+            RETURNING q.id, q.run_id, q.action, q.machine_name, q.attempts, q.max_attempts, q.locked_by
+            """,
+            (JOB_VISIBILITY_TIMEOUT, worker_id),
+        )
+        return cur.fetchone()
+
+
+def _mark_triggered(job: dict) -> bool:
+    # Committed before the POST; False if the claim expired and another worker owns the row now
+    with get_pool().connection() as c, c.cursor() as cur:
+        cur.execute(
+            """
+            UPDATE job_queue
+            SET triggered_at = now()
+            WHERE id = %s AND locked_by = %s AND triggered_at IS NULL
+            """,
+            (job["id"], job["locked_by"]),
+        )
+        return cur.rowcount == 1
+
+
+def _ack(job_id: int) -> None:
+    with get_pool().connection() as c, c.cursor() as cur:
+        cur.execute("DELETE FROM job_queue WHERE id = %s", (job_id,))
+
+
+def _retry(job: dict, err: str) -> None:
+    delay = JOB_RETRY_DELAY * job["attempts"]
+    with get_pool().connection() as c, c.cursor() as cur:
+        cur.execute(
+            """
+            UPDATE job_queue
+            SET visible_at   = now() + make_interval(secs => %s),
+                locked_by    = NULL,
+                locked_at    = NULL,
+                triggered_at = NULL,
+                last_error   = %s
+            WHERE id = %s
+            """,
+            (delay, err[:4000], job["id"]),
+        )
+
+
+def set_run_failed(lm_run_id: int, machine_name: str, action: str, err: str, job_id: int | None = None) -> None:
+    # Mark the queued run as failed if we cannot trigger Rundeck at all (and drop its queue row).
+    try:
+        with get_pool().connection() as c, c.cursor() as cur:
+            cur.execute(
+                """
+                UPDATE automation_runs
+                SET status = %s, output = %s, finished_at = NOW()
+                WHERE id = %s
+                """,
+                ("failed", err[:4000], lm_run_id),
+            )
+            if job_id is not None:
+                cur.execute("DELETE FROM job_queue WHERE id = %s", (job_id,))
+    except Exception:
+        pass
+
+    BROKER.publish("automation_run", {
+        "machine_name": machine_name,
+        "run_id": lm_run_id,
+        "job_type": action,
+        "status": "failed",
+        "step_name": None,
+        "result": {"error": err},
+    })
+
+
+def _sweep() -> None:
+    # Rows no worker will claim again once their visibility timeout passed: triggered by a
+    # worker that died before acking (the run keeps its 'queued' status, like any triggered
+    # run) or out of attempts because the worker kept crashing (the run fails).
+    with get_pool().connection() as c, c.cursor(cursor_factory=RealDictCursor) as cur:
+        cur.execute(
+            """
+            DELETE FROM job_queue
+            WHERE visible_at <= now()
+              AND (triggered_at IS NOT NULL OR attempts >= max_attempts)
+            RETURNING id, run_id, action, machine_name, attempts, triggered_at, last_error
+            """
+        )
+        rows = cur.fetchall()
+
+    for r in rows:
+        if r["triggered_at"] is not None:
+            print(f"[job_queue] job {r['id']} ({r['action']} {r['machine_name']}) was triggered at "
+                  f"{r['triggered_at']} but never acknowledged; dropped without re-triggering")
+            continue
+        err = f"Gave up after {r['attempts']} attempts"
+        if r["last_error"]:
+            err += f": {r['last_error']}"
+        set_run_failed(r["run_id"], r["machine_name"], r["action"], err)
+
+
+def process_job(job: dict) -> bool:
+    """Trigger the job's Rundeck run; False if the claim was lost before anything was sent."""
+    action = job["action"]
+    machine_name = job["machine_name"]
+
+    cfg = JOB_CONFIG.get(action)
+    if not cfg:
+        raise PermanentJobError(f"Unknown action '{action}'")
+
+    job_id = os.getenv(cfg["job_env"])
+    if not job_id:
+        raise PermanentJobError(f"Missing env var {cfg['job_env']}")
+
+    try:
+        if not _mark_triggered(job):
+            return False
+    except Exception as e:
+        raise NotSentJobError(f"Could not mark job triggered: {e}") from e
+
+    # Trigger Rundeck (this is the rate-limited part)
+    trigger_rundeck_job(
+        job_id,
+        options={"machineName": machine_name, "lmRunId": str(job["run_id"])},
+    )
+    return True
+
+
+def _error_text(e: Exception) -> str:
+    return str(getattr(e, "detail", None) or e)
+
+
+def worker_loop(worker_id: str, stop: threading.Event) -> None:
+    next_sweep = 0.0
+    while not stop.is_set():
+        if time.monotonic() >= next_sweep:
+            next_sweep = time.monotonic() + JOB_SWEEP_INTERVAL
+            try:
+                _sweep()
+            except Exception as e:
+                print(f"[job_queue] {worker_id}: sweep failed: {e}")
+
+        try:
+            job = _claim(worker_id)
+        except Exception as e:
+            print(f"[job_queue] {worker_id}: claim failed: {e}")
+            stop.wait(5)
+            continue
+
+        if not job:
+            _WAKE.wait(JOB_POLL_INTERVAL)
+            _WAKE.clear()
+            continue
+
+        try:
+            triggered = process_job(job)
+        except PermanentJobError as e:
+            set_run_failed(job["run_id"], job["machine_name"], job["action"], str(e), job_id=job["id"])
+        except Exception as e:
+            err = _error_text(e)
+            if not isinstance(e, NotSentJobError) and getattr(e, "status_code", None) not in _NOT_STARTED:
+                # The request may have reached Rundeck: retrying could run the job twice
+                set_run_failed(job["run_id"], job["machine_name"], job["action"],
+                               f"{err} (not retried, check Rundeck for the execution)", job_id=job["id"])
+            elif job["attempts"] >= job["max_attempts"]:
+                set_run_failed(job["run_id"], job["machine_name"], job["action"], err, job_id=job["id"])
+            else:
+                print(f"[job_queue] {worker_id}: job {job['id']} attempt {job['attempts']} failed, retrying: {err}")
+                try:
+                    _retry(job, err)
+                except Exception:
+                    pass  # still marked triggered, so the sweep drops it once the claim expires
+        else:
+            if triggered:
+                try:
+                    _ack(job["id"])
+                except Exception as e:
+                    # Triggered already; the sweep drops the row once its claim expires
+                    print(f"[job_queue] {worker_id}: ack of job {job['id']} failed: {e}")
+
+        # tiny pacing delay so we don't spike Rundeck even with multiple workers
+        if BULK_DELAY_MS > 0:
+            time.sleep(BULK_DELAY_MS / 1000.0)
+
+
+def start_workers(count: int, stop: threading.Event, prefix: str | None = None) -> list[threading.Thread]:
+    prefix = prefix or f"{socket.gethostname()}:{os.getpid()}"
+    threads = []
+    for i in range(count):
+        t = threading.Thread(target=worker_loop, args=(f"{prefix}:{i}", stop), daemon=True)
+        t.start()
+        threads.append(t)
+    return threads
+
+
+def queue_stats() -> dict:
+    with get_pool().connection() as c, c.cursor(cursor_factory=RealDictCursor) as cur:
+        cur.execute(
+            """
+            SELECT
+              COUNT(*)::int                                          AS total,
+              COUNT(*) FILTER (WHERE visible_at <= now())::int       AS ready,
+              COUNT(*) FILTER (WHERE locked_by IS NOT NULL
+                                 AND visible_at > now())::int        AS in_flight,
+              COUNT(*) FILTER (WHERE locked_by IS NULL
+                                 AND visible_at > now())::int        AS retry_wait,
+              MIN(created_at)                                        AS oldest_created_at
+            FROM job_queue
+            """
+        )
+        return cur.fetchone()
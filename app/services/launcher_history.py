@@ -0,0 +1,514 @@
+# /app/services/launcher_history.py
+import os
+import re
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from fastapi import HTTPException
+
+from services.db_pool import get_pool
+
+# Launcher state history rollups and queries (tables: see "Launcher state history" in 10-schema.sql).
+#
+# launcher_state_history gets a row per online / state / sessions transition from triggers.
+# Every LAUNCHER_HISTORY_INTERVAL seconds this
+# - rolls finished 5-minute buckets into launcher_group_state_5m (per group and fleet-wide),
+# - rolls finished hours into launcher_group_state_1h and launcher_state_1h (per launcher,
+#   hours with a transition only),
+# - writes the monthly checkpoint rows (state of every launcher at the start of a month),
+# - keeps monthly history partitions created ahead and drops / deletes what is past retention:
+#   raw transitions LAUNCHER_HISTORY_RAW_DAYS, 5-minute rollups LAUNCHER_HISTORY_5M_DAYS,
+#   hourly rollups LAUNCHER_HISTORY_DAYS (a year online by default).
+#
+# Buckets are time-weighted: seconds online / with a known state and session-seconds, so an
+# hour is the sum of its 5-minute buckets. Any process may run this; a transaction-level
+# advisory lock makes the others skip the cycle.
+
+LAUNCHER_HISTORY_ENABLED = os.getenv("LAUNCHER_HISTORY_ENABLED", "true").lower() == "true"
+LAUNCHER_HISTORY_INTERVAL = float(os.getenv("LAUNCHER_HISTORY_INTERVAL", "60"))  # seconds
+LAUNCHER_HISTORY_RAW_DAYS = int(os.getenv("LAUNCHER_HISTORY_RAW_DAYS", "35"))
+LAUNCHER_HISTORY_5M_DAYS = int(os.getenv("LAUNCHER_HISTORY_5M_DAYS", "14"))
+LAUNCHER_HISTORY_DAYS = int(os.getenv("LAUNCHER_HISTORY_DAYS", "400"))
+# A bucket is rolled up this long after it ended: changed_at is the writing transaction's
+# start, and a sync transaction stays open while it reads LE
+LAUNCHER_HISTORY_DELAY = int(os.getenv("LAUNCHER_HISTORY_DELAY", "120"))  # seconds
+
+HISTORY_LOCK = 0x6C6D_0004  # pg advisory lock key
+FLEET_GROUP = "00000000-0000-0000-0000-000000000000"  # group_id of the fleet-wide rollups
+RESOLUTIONS = {"5m": 300, "1h": 3600}
+ROLLUP_BATCH = 12        # buckets per rollup statement
+ROLLUP_MAX_BUCKETS = 288  # 5-minute buckets per cycle when catching up
+PRUNE_INTERVAL = 3600     # seconds between retention passes
+
+_PARTITION_RE = re.compile(r"^launcher_state_history_p(\d{4})(\d{2})$")
+
+# Per-launcher state segments clipped to buckets of width %(width)s seconds over [%(t0)s, %(t1)s)
+# ("piece": ps..pe, secs long), for the launchers in %(names)s (NULL = all). The state in effect
+# at t0 is the last row before it.
+_PIECES_CTE = """
+h AS (
+    SELECT l.machine_name, p.changed_at, p.online, p.state, p.sessions, false AS counted
+    FROM launchers l
+    CROSS JOIN LATERAL (
+        SELECT x.changed_at, x.online, x.state, x.sessions
+        FROM launcher_state_history x
+        WHERE x.machine_name = l.machine_name AND x.changed_at < %(t0)s
+        ORDER BY x.changed_at DESC
+        LIMIT 1
+    ) p
+    WHERE %(names)s::text[] IS NULL OR l.machine_name = ANY(%(names)s::text[])
+    UNION ALL
+    SELECT machine_name, changed_at, online, state, sessions, transition
+    FROM launcher_state_history
+    WHERE changed_at >= %(t0)s AND changed_at < %(t1)s
+      AND (%(names)s::text[] IS NULL OR machine_name = ANY(%(names)s::text[]))
+),
+seg AS (
+    SELECT machine_name, changed_at, online, state, sessions, counted,
+           greatest(changed_at, %(t0)s) AS s,
+           coalesce(lead(changed_at) OVER (PARTITION BY machine_name ORDER BY changed_at), %(t1)s) AS e
+    FROM h
+),
+piece AS (
+    SELECT b.bucket, seg.machine_name, seg.changed_at, seg.online, seg.state, seg.sessions, seg.counted,
+           seg.s, o.ps, o.pe, extract(epoch FROM o.pe - o.ps) AS secs
+    FROM generate_series(
+             %(t0)s::timestamptz,
+             %(t1)s::timestamptz - make_interval(secs => %(width)s),
+             make_interval(secs => %(width)s)
+         ) AS b(bucket)
+    JOIN seg ON seg.s < b.bucket + make_interval(secs => %(width)s) AND seg.e > b.bucket
+    CROSS JOIN LATERAL (
+        SELECT greatest(seg.s, b.bucket) AS ps,
+               least(seg.e, b.bucket + make_interval(secs => %(width)s)) AS pe
+    ) o
+)"""
+
+# Time-weighted per-launcher buckets from the pieces
+_BUCKET_COLUMNS = """
+       bucket, machine_name,
+       coalesce(sum(secs) FILTER (WHERE online), 0)::int                       AS online_s,
+       coalesce(sum(secs) FILTER (WHERE online IS NOT NULL), 0)::int           AS known_s,
+       coalesce(sum(secs * sessions) FILTER (WHERE online IS NOT NULL), 0)::int AS session_s,
+       max(sessions) FILTER (WHERE online IS NOT NULL)                         AS sessions_max,
+       count(*) FILTER (WHERE counted AND changed_at >= bucket)::int           AS transitions,
+       (array_agg(online ORDER BY s DESC))[1]                                  AS online_end,
+       (array_agg(state ORDER BY s DESC))[1]                                   AS state_end,
+       (array_agg(sessions ORDER BY s DESC))[1]                                AS sessions_end
+FROM piece
+GROUP BY bucket, machine_name"""
+
+_BUCKETS_SQL = "WITH" + _PIECES_CTE + "\nSELECT" + _BUCKET_COLUMNS + "\n"
+
+# Groups and the fleet per 5-minute bucket. sessions_peak is the highest concurrent session total
+# of the members: a running sum over the points where one of their segments starts or ends.
+_GROUP_5M_SQL = """
+INSERT INTO launcher_group_state_5m
+    (group_id, bucket, launchers, online_s, known_s, session_s, sessions_peak, transitions)
+WITH""" + _PIECES_CTE + """,
+r AS (
+    SELECT""" + _BUCKET_COLUMNS + """
+),
+membership AS (
+    SELECT m.machine_name, g.group_id
+    FROM (SELECT DISTINCT machine_name FROM piece) m
+    CROSS JOIN LATERAL (
+        SELECT %(fleet)s::uuid AS group_id
+        UNION ALL
+        SELECT gm.group_id FROM launcher_group_members gm WHERE gm.machine_name = m.machine_name
+    ) g
+),
+totals AS (
+    SELECT mg.group_id, r.bucket, count(*) FILTER (WHERE r.known_s > 0) AS launchers,
+           sum(r.online_s) AS online_s, sum(r.known_s) AS known_s, sum(r.session_s) AS session_s,
+           sum(r.transitions) AS transitions
+    FROM r
+    JOIN membership mg ON mg.machine_name = r.machine_name
+    GROUP BY mg.group_id, r.bucket
+),
+steps AS (
+    SELECT mg.group_id, p.bucket, d.t, sum(d.delta) AS delta
+    FROM piece p
+    JOIN membership mg ON mg.machine_name = p.machine_name
+    CROSS JOIN LATERAL (VALUES (p.ps, p.sessions), (p.pe, -p.sessions)) AS d(t, delta)
+    WHERE p.online IS NOT NULL AND p.sessions > 0
+    GROUP BY mg.group_id, p.bucket, d.t
+),
+peaks AS (
+    SELECT group_id, bucket, max(running)::int AS sessions_peak
+    FROM (
+        SELECT group_id, bucket, sum(delta) OVER (PARTITION BY group_id, bucket ORDER BY t) AS running
+        FROM steps
+    ) x
+    GROUP BY group_id, bucket
+)
+SELECT t.group_id, t.bucket, t.launchers, t.online_s, t.known_s, t.session_s,
+       CASE WHEN t.known_s > 0 THEN coalesce(pk.sessions_peak, 0) END, t.transitions
+FROM totals t
+LEFT JOIN peaks pk ON pk.group_id = t.group_id AND pk.bucket = t.bucket
+ON CONFLICT (group_id, bucket) DO UPDATE
+SET launchers = EXCLUDED.launchers, online_s = EXCLUDED.online_s, known_s = EXCLUDED.known_s,
+    session_s = EXCLUDED.session_s, sessions_peak = EXCLUDED.sessions_peak,
+    transitions = EXCLUDED.transitions
+"""
+
+_GROUP_1H_SQL = """
+INSERT INTO launcher_group_state_1h
+    (group_id, bucket, launchers, online_s, known_s, session_s, sessions_peak, transitions)
+SELECT group_id, date_bin('1 hour', bucket, TIMESTAMPTZ '2000-01-01 00:00+00'), max(launchers),
+       sum(online_s), sum(known_s), sum(session_s), max(sessions_peak), sum(transitions)
+FROM launcher_group_state_5m
+WHERE bucket >= %(t0)s AND bucket < %(t1)s
+GROUP BY 1, 2
+ON CONFLICT (group_id, bucket) DO UPDATE
+SET launchers = EXCLUDED.launchers, online_s = EXCLUDED.online_s, known_s = EXCLUDED.known_s,
+    session_s = EXCLUDED.session_s, sessions_peak = EXCLUDED.sessions_peak,
+    transitions = EXCLUDED.transitions
+"""
+
+_LAUNCHER_1H_SQL = """
+INSERT INTO launcher_state_1h
+    (machine_name, bucket, online_s, known_s, session_s, sessions_max, transitions,
+     online_end, state_end, sessions_end)
+SELECT machine_name, bucket, online_s, known_s, session_s, sessions_max, transitions,
+       online_end, state_end, sessions_end
+FROM (""" + _BUCKETS_SQL + """) r
+WHERE r.transitions > 0
+ON CONFLICT (machine_name, bucket) DO UPDATE
+SET online_s = EXCLUDED.online_s, known_s = EXCLUDED.known_s, session_s = EXCLUDED.session_s,
+    sessions_max = EXCLUDED.sessions_max, transitions = EXCLUDED.transitions,
+    online_end = EXCLUDED.online_end, state_end = EXCLUDED.state_end,
+    sessions_end = EXCLUDED.sessions_end
+"""
+
+_CHECKPOINT_SQL = """
+INSERT INTO launcher_state_history (machine_name, changed_at, online, state, sessions, transition)
+SELECT l.machine_name, %(at)s, p.online, p.state, p.sessions, false
+FROM launchers l
+CROSS JOIN LATERAL (
+    SELECT x.online, x.state, x.sessions
+    FROM launcher_state_history x
+    WHERE x.machine_name = l.machine_name AND x.changed_at < %(at)s
+    ORDER BY x.changed_at DESC
+    LIMIT 1
+) p
+WHERE p.online IS NOT NULL
+ON CONFLICT (machine_name, changed_at) DO NOTHING
+"""
+
+
+def _floor(ts: datetime, width: int) -> datetime:
+    return datetime.fromtimestamp(int(ts.timestamp()) // width * width, tz=timezone.utc)
+
+
+def _month_start(ts: datetime) -> datetime:
+    return datetime(ts.year, ts.month, 1, tzinfo=timezone.utc)
+
+
+def _next_month(ts: datetime) -> datetime:
+    return datetime(ts.year + ts.month // 12, ts.month % 12 + 1, 1, tzinfo=timezone.utc)
+
+
+class LauncherHistory:
+    def __init__(self):
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._last: dict = {}
+        self._pruned_at = 0.0
+
+    def start(self) -> None:
+        if not LAUNCHER_HISTORY_ENABLED:
+            return
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, name="launcher-history", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def stats(self) -> dict:
+        rolled = {}
+        try:
+            with get_pool().connection() as c, c.cursor() as cur:
+                cur.execute("SELECT resolution, rolled_through FROM launcher_state_rollups")
+                rolled = {r[0]: r[1].isoformat() for r in cur.fetchall()}
+        except Exception as e:
+            print(f"[launcher-history] reading rollup state failed: {e}")
+        return {
+            "enabled": LAUNCHER_HISTORY_ENABLED,
+            "running": self._thread is not None and self._thread.is_alive(),
+            "raw_days": LAUNCHER_HISTORY_RAW_DAYS,
+            "five_minute_days": LAUNCHER_HISTORY_5M_DAYS,
+            "hourly_days": LAUNCHER_HISTORY_DAYS,
+            "rolled_through": rolled,
+            "last": self._last,
+        }
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                print(f"[launcher-history] rollup failed: {e}")
+            self._stop.wait(LAUNCHER_HISTORY_INTERVAL)
+
+    def run_once(self, now: datetime | None = None) -> dict:
+        """One rollup cycle. Returns what was done (empty when another process holds the lock)."""
+        now = now or datetime.now(timezone.utc)
+        done = {"at": now.isoformat(), "buckets_5m": 0, "hours": 0, "checkpoints": 0, "dropped": [], "pruned": 0}
+
+        with get_pool().connection() as c, c.cursor() as cur:
+            cur.execute("SELECT pg_try_advisory_xact_lock(%s)", (HISTORY_LOCK,))
+            if not cur.fetchone()[0]:
+                return {}
+            cur.execute("SELECT public.lm_ensure_monthly_partitions('launcher_state_history')")
+
+            cur.execute("SELECT resolution, rolled_through FROM launcher_state_rollups")
+            rolled = dict(cur.fetchall())
+            if "5m" not in rolled:
+                cur.execute("SELECT min(changed_at) FROM launcher_state_history")
+                first = cur.fetchone()[0] or now
+                rolled = {"5m": _floor(first, 300), "1h": _floor(first, 3600)}
+
+            # 5-minute buckets, up to the last one that ended LAUNCHER_HISTORY_DELAY ago
+            target = min(_floor(now - timedelta(seconds=LAUNCHER_HISTORY_DELAY), 300),
+                         rolled["5m"] + timedelta(seconds=300 * ROLLUP_MAX_BUCKETS))
+            t0 = rolled["5m"]
+            while t0 < target:
+                t1 = min(target, t0 + timedelta(seconds=300 * ROLLUP_BATCH))
+                month = _next_month(t0) if t0 != _month_start(t0) else t0
+                if month < t1:
+                    # checkpoint first, so the month's partition holds the state at its start
+                    cur.execute(_CHECKPOINT_SQL, {"at": month})
+                    done["checkpoints"] += cur.rowcount
+                cur.execute(_GROUP_5M_SQL, {"t0": t0, "t1": t1, "width": 300, "names": None, "fleet": FLEET_GROUP})
+                done["buckets_5m"] += int((t1 - t0).total_seconds()) // 300
+                t0 = t1
+            rolled["5m"] = t0
+
+            # Hours whose 5-minute buckets are all rolled up
+            h0 = rolled["1h"]
+            h1 = min(_floor(rolled["5m"], 3600), h0 + timedelta(hours=ROLLUP_MAX_BUCKETS // ROLLUP_BATCH))
+            while h0 < h1:
+                step = min(h1, h0 + timedelta(hours=ROLLUP_BATCH))
+                cur.execute(_GROUP_1H_SQL, {"t0": h0, "t1": step})
+                cur.execute(_LAUNCHER_1H_SQL, {"t0": h0, "t1": step, "width": 3600, "names": None})
+                done["hours"] += int((step - h0).total_seconds()) // 3600
+                h0 = step
+            rolled["1h"] = h0
+
+            cur.execute(
+                """
+                INSERT INTO launcher_state_rollups (resolution, rolled_through)
+                SELECT * FROM unnest(%s::text[], %s::timestamptz[])
+                ON CONFLICT (resolution) DO UPDATE SET rolled_through = EXCLUDED.rolled_through
+                """,
+                (list(rolled), list(rolled.values())),
+            )
+
+            if time.monotonic() - self._pruned_at >= PRUNE_INTERVAL:
+                self._prune(cur, now, rolled, done)
+
+        done["dropped"] = [name for name in done.pop("expired", []) if self._drop(name)]
+        self._last = done
+        return done
+
+    def _prune(self, cur, now: datetime, rolled: dict, done: dict) -> None:
+        self._pruned_at = time.monotonic()
+        if LAUNCHER_HISTORY_5M_DAYS > 0:
+            # (5-minute rows are kept until their hour is rolled up)
+            cur.execute("DELETE FROM launcher_group_state_5m WHERE bucket < %s",
+                        (min(now - timedelta(days=LAUNCHER_HISTORY_5M_DAYS), rolled["1h"]),))
+            done["pruned"] += cur.rowcount
+        if LAUNCHER_HISTORY_DAYS > 0:
+            keep_from = now - timedelta(days=LAUNCHER_HISTORY_DAYS)
+            for table in ("launcher_group_state_1h", "launcher_state_1h"):
+                cur.execute(f"DELETE FROM {table} WHERE bucket < %s", (keep_from,))
+                done["pruned"] += cur.rowcount
+        if LAUNCHER_HISTORY_RAW_DAYS <= 0:
+            return
+
+        # A month can go once it is past retention and the next month's checkpoint is written
+        raw_from = min(now - timedelta(days=LAUNCHER_HISTORY_RAW_DAYS), rolled["5m"])
+        cur.execute(
+            """
+            SELECT c.relname
+            FROM pg_inherits i
+            JOIN pg_class c ON c.oid = i.inhrelid
+            WHERE i.inhparent = 'public.launcher_state_history'::regclass
+            ORDER BY c.relname
+            """
+        )
+        done["expired"] = []
+        for (name,) in cur.fetchall():
+            m = _PARTITION_RE.match(name)
+            if m and _next_month(datetime(int(m.group(1)), int(m.group(2)), 1, tzinfo=timezone.utc)) <= raw_from:
+                done["expired"].append(name)
+        cur.execute("DELETE FROM launcher_state_history_default WHERE changed_at < %s", (raw_from,))
+        done["pruned"] += cur.rowcount
+
+    def _drop(self, name: str) -> bool:
+        # Needs a short exclusive lock on launcher_state_history (trigger writers); give up
+        # quickly and retry next prune if busy
+        try:
+            with get_pool().connection() as c, c.cursor() as cur:
+                cur.execute("SELECT pg_try_advisory_xact_lock(%s)", (HISTORY_LOCK,))
+                if not cur.fetchone()[0]:
+                    return False
+                cur.execute("SET LOCAL lock_timeout = '5s'")
+                cur.execute(f"DROP TABLE IF EXISTS public.{name}")
+            return True
+        except Exception as e:
+            print(f"[launcher-history] dropping {name} failed: {e}")
+            return False
+
+
+HISTORY = LauncherHistory()
+
+
+# --- Queries (GET /api/launchers/history, /api/launchers/{name}/history, /api/groups/{id}/history) ---
+
+def _range(hours: int, resolution: str | None, max_days: dict) -> tuple[str, int, datetime]:
+    """-> (resolution, bucket width, range start); 5m is the default up to two days."""
+    if resolution is None:
+        resolution = "5m" if hours <= 48 else "1h"
+    if resolution not in RESOLUTIONS:
+        raise HTTPException(status_code=400, detail="resolution must be '5m' or '1h'")
+    if hours < 1 or (max_days[resolution] > 0 and hours > max_days[resolution] * 24):
+        raise HTTPException(
+            status_code=400,
+            detail=f"hours must be between 1 and {max_days[resolution] * 24} at resolution {resolution}",
+        )
+    width = RESOLUTIONS[resolution]
+    start = _floor(datetime.now(timezone.utc), width) - timedelta(hours=hours)
+    return resolution, width, start
+
+
+def _rolled_through(cur, resolution: str) -> datetime | None:
+    cur.execute("SELECT rolled_through FROM launcher_state_rollups WHERE resolution = %s", (resolution,))
+    row = cur.fetchone()
+    return row[0] if row else None
+
+
+def _buckets(start: datetime, end: datetime, width: int) -> list[datetime]:
+    return [start + timedelta(seconds=i * width) for i in range(int((end - start).total_seconds()) // width)]
+
+
+def _ratio(part, whole, digits: int = 4):
+    return round(part / whole, digits) if whole else None
+
+
+def _launcher_point(t: datetime, online_s, known_s, session_s, sessions_max, transitions) -> dict:
+    return {
+        "t": t.isoformat(),
+        "availability": _ratio(online_s, known_s),
+        "sessions_avg": _ratio(session_s, known_s, 2),
+        "sessions_max": sessions_max,
+        "transitions": transitions,
+    }
+
+
+def launcher_curve(machine_name: str, hours: int, resolution: str | None) -> dict:
+    """Availability / session curve of one launcher (5m from raw history, 1h from launcher_state_1h)."""
+    resolution, width, start = _range(
+        hours, resolution, {"5m": LAUNCHER_HISTORY_RAW_DAYS, "1h": LAUNCHER_HISTORY_DAYS},
+    )
+    with get_pool().connection() as c, c.cursor() as cur:
+        cur.execute("SELECT 1 FROM launchers WHERE machine_name = %s", (machine_name,))
+        if not cur.fetchone():
+            raise HTTPException(status_code=404, detail="Launcher not found")
+
+        points = []
+        if resolution == "5m":
+            end = _floor(datetime.now(timezone.utc), width)
+            cur.execute(_BUCKETS_SQL, {"t0": start, "t1": end, "width": width, "names": [machine_name]})
+            rows = {r[0]: r[2:7] for r in cur.fetchall()}
+            for t in _buckets(start, end, width):
+                points.append(_launcher_point(t, *rows[t]) if t in rows else _launcher_point(t, 0, 0, 0, None, 0))
+        else:
+            end = max(start, _rolled_through(cur, "1h") or start)
+            cur.execute(
+                """
+                (SELECT bucket, online_s, known_s, session_s, sessions_max, transitions,
+                        online_end, sessions_end
+                 FROM launcher_state_1h
+                 WHERE machine_name = %(name)s AND bucket < %(t0)s
+                 ORDER BY bucket DESC
+                 LIMIT 1)
+                UNION ALL
+                SELECT bucket, online_s, known_s, session_s, sessions_max, transitions,
+                       online_end, sessions_end
+                FROM launcher_state_1h
+                WHERE machine_name = %(name)s AND bucket >= %(t0)s AND bucket < %(t1)s
+                ORDER BY bucket
+                """,
+                {"name": machine_name, "t0": start, "t1": end},
+            )
+            rows = cur.fetchall()
+            by_bucket = {r[0]: r for r in rows}
+            carry = rows[0] if rows and rows[0][0] < start else None
+            for t in _buckets(start, end, width):
+                r = by_bucket.get(t)
+                if r is not None:
+                    points.append(_launcher_point(t, *r[1:6]))
+                    carry = r
+                elif carry is not None and carry[6] is not None:
+                    # no transition this hour: the state at the end of the last row held all hour
+                    sessions = carry[7] or 0
+                    points.append(_launcher_point(t, width if carry[6] else 0, width, sessions * width, carry[7], 0))
+                else:
+                    points.append(_launcher_point(t, 0, 0, 0, None, 0))
+
+    return {
+        "machine_name": machine_name,
+        "resolution": resolution,
+        "from": start.isoformat(),
+        "to": end.isoformat(),
+        "points": points,
+    }
+
+
+def group_curve(group_id: str, hours: int, resolution: str | None) -> dict:
+    """Availability / session curve of a launcher group (FLEET_GROUP = all launchers) from the rollups."""
+    resolution, width, start = _range(
+        hours, resolution, {"5m": LAUNCHER_HISTORY_5M_DAYS, "1h": LAUNCHER_HISTORY_DAYS},
+    )
+    table = "launcher_group_state_5m" if resolution == "5m" else "launcher_group_state_1h"
+    with get_pool().connection() as c, c.cursor() as cur:
+        if group_id != FLEET_GROUP:
+            cur.execute("SELECT 1 FROM launcher_groups WHERE id = %s::uuid", (group_id,))
+            if not cur.fetchone():
+                raise HTTPException(status_code=404, detail="Group not found")
+
+        end = max(start, _rolled_through(cur, resolution) or start)
+        cur.execute(
+            f"""
+            SELECT bucket, launchers, online_s, known_s, session_s, sessions_peak, transitions
+            FROM {table}
+            WHERE group_id = %s::uuid AND bucket >= %s AND bucket < %s
+            """,
+            (group_id, start, end),
+        )
+        rows = {r[0]: r[1:] for r in cur.fetchall()}
+
+    points = []
+    for t in _buckets(start, end, width):
+        launchers, online_s, known_s, session_s, peak, transitions = rows.get(t, (0, 0, 0, 0, None, 0))
+        points.append({
+            "t": t.isoformat(),
+            "launchers": launchers,
+            "availability": _ratio(online_s, known_s),
+            "online_avg": round(online_s / width, 2),
+            "sessions_avg": round(session_s / width, 2),
+            "sessions_peak": peak,
+            "transitions": transitions,
+        })
+    return {
+        "group_id": group_id,
+        "resolution": resolution,
+        "from": start.isoformat(),
+        "to": end.isoformat(),
+        "points": points,
+    }
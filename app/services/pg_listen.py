@@ -0,0 +1,144 @@
+# /app/services/pg_listen.py
+import select
+import threading
+
+import psycopg2
+
+from services.db_pool import connect_kwargs
+
+# One LISTEN connection per process, shared by everything that reacts to Postgres NOTIFY
+# (SSE event bus, inventory index). Handlers run on the listener thread, under the lock that
+# guards the connection, and must be quick; hand heavier work to another thread.
+
+LISTEN_PING = 15  # seconds idle before a liveness check
+
+
+class PgListener:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._handlers: dict[str, tuple] = {}  # channel -> (on_notify(conn, payloads), on_connect())
+        self._listening: set[str] = set()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._conn = None
+        self._connected = threading.Event()
+        self._reconnects = 0
+
+    def add(self, channel: str, on_notify, on_connect=None) -> None:
+        """
+        on_notify(conn, payloads) gets every batch of payloads for the channel (conn may be used
+        for follow-up reads; the handler holds the listener lock, so it must not call add()).
+        on_connect() is called each time LISTEN is (re)established, since notifications sent
+        while not listening are lost; use it to resync state.
+        """
+        subscribed = False
+        with self._lock:
+            self._handlers[channel] = (on_notify, on_connect)
+            conn = self._conn
+            if conn is not None and channel not in self._listening:
+                # already connected: subscribe right away instead of on the next reconnect
+                try:
+                    with conn.cursor() as cur:
+                        cur.execute(f"LISTEN {channel}")
+                    self._listening.add(channel)
+                    subscribed = True
+                except Exception as e:
+                    print(f"[pg-listener] LISTEN {channel} failed: {e}")
+        if subscribed and on_connect is not None:
+            on_connect()
+
+    def start(self) -> None:
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._loop, name="pg-listener", daemon=True)
+                self._thread.start()
+
+    def wait_connected(self, timeout: float) -> bool:
+        """True once every registered channel is being listened to."""
+        return self._connected.wait(timeout)
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def stats(self) -> dict:
+        return {
+            "running": self.is_running(),
+            "channels": sorted(self._listening),
+            "reconnects": self._reconnects,
+        }
+
+    def _listen_all(self, conn) -> None:
+        with self._lock:
+            for ch in self._handlers:
+                with conn.cursor() as cur:
+                    cur.execute(f"LISTEN {ch}")
+                self._listening.add(ch)
+            self._conn = conn
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            conn = None
+            try:
+                conn = psycopg2.connect(**connect_kwargs())
+                conn.autocommit = True
+                self._listening = set()
+                self._listen_all(conn)
+
+                with self._lock:
+                    callbacks = [cb for _, cb in self._handlers.values() if cb is not None]
+                for cb in callbacks:
+                    try:
+                        cb()
+                    except Exception as e:
+                        print(f"[pg-listener] connect callback failed: {e}")
+                self._connected.set()
+
+                while not self._stop.is_set():
+                    idle = select.select([conn], [], [], LISTEN_PING) == ([], [], [])
+                    # Under the lock: an unguarded poll() or handler read could consume the reply
+                    # to a LISTEN that add() is running on this connection at the same moment
+                    with self._lock:
+                        if idle:
+                            with conn.cursor() as cur:
+                                cur.execute("SELECT 1")
+                        else:
+                            conn.poll()
+                        # also picks up notifications that arrived while add() ran LISTEN
+                        notifies = conn.notifies[:]
+                        del conn.notifies[:]
+                        if notifies:
+                            self._dispatch(conn, notifies)
+            except Exception as e:
+                self._reconnects += 1
+                print(f"[pg-listener] error, reconnecting: {e}")
+                self._stop.wait(2)
+            finally:
+                self._connected.clear()
+                with self._lock:
+                    self._conn = None
+                if conn is not None:
+                    try:
+                        conn.close()
+                    except Exception:
+                        pass
+
+    def _dispatch(self, conn, notifies) -> None:
+        # caller holds self._lock
+        by_channel: dict[str, list[str]] = {}
+        for n in notifies:
+            by_channel.setdefault(n.channel, []).append(n.payload)
+        for channel, payloads in by_channel.items():
+            handler = self._handlers.get(channel)
+            if handler is None:
+                continue
+            try:
+                handler[0](conn, payloads)
+            except Exception as e:
+                print(f"[pg-listener] {channel} handler failed: {e}")
+
+
+LISTENER = PgListener()
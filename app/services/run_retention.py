@@ -0,0 +1,189 @@
+# /app/services/run_retention.py
+import os
+import re
+import threading
+from datetime import datetime, timedelta, timezone
+
+from services.db_pool import get_pool
+
+# Partition maintenance for automation_runs (monthly range partitions on created_at, UTC).
+#
+# Every AUTOMATION_RUNS_MAINTENANCE_INTERVAL seconds:
+# - make sure partitions exist for the current month and AUTOMATION_RUNS_PARTITIONS_AHEAD more
+#   (a row without a matching partition would land in automation_runs_default),
+# - detach months that ended more than AUTOMATION_RUNS_HOT_DAYS ago and move them to the
+#   lm_archive schema (or drop them with AUTOMATION_RUNS_ARCHIVE=drop),
+# - drop archived months that ended more than AUTOMATION_RUNS_ARCHIVE_DAYS ago (0 = keep),
+# - trim old rows from the default partition.
+#
+# Any process may run this (every API worker, worker.py); a transaction-level advisory lock
+# makes the others skip the cycle.
+
+AUTOMATION_RUNS_HOT_DAYS = int(os.getenv("AUTOMATION_RUNS_HOT_DAYS", "90"))
+AUTOMATION_RUNS_ARCHIVE = os.getenv("AUTOMATION_RUNS_ARCHIVE", "detach")  # "detach" or "drop"
+AUTOMATION_RUNS_ARCHIVE_DAYS = int(os.getenv("AUTOMATION_RUNS_ARCHIVE_DAYS", "365"))
+AUTOMATION_RUNS_PARTITIONS_AHEAD = int(os.getenv("AUTOMATION_RUNS_PARTITIONS_AHEAD", "3"))
+AUTOMATION_RUNS_MAINTENANCE_INTERVAL = int(os.getenv("AUTOMATION_RUNS_MAINTENANCE_INTERVAL", "3600"))
+
+ARCHIVE_SCHEMA = "lm_archive"
+MAINTENANCE_LOCK = 0x6C6D_0001  # pg advisory lock key
+DEFAULT_TRIM_BATCH = 5000
+
+_PARTITION_RE = re.compile(r"^automation_runs_p(\d{4})(\d{2})$")
+
+
+def _month_end(name: str) -> datetime | None:
+    """Upper bound of a monthly partition, from its name."""
+    m = _PARTITION_RE.match(name)
+    if not m:
+        return None
+    year, month = int(m.group(1)), int(m.group(2))
+    if month == 12:
+        return datetime(year + 1, 1, 1, tzinfo=timezone.utc)
+    return datetime(year, month + 1, 1, tzinfo=timezone.utc)
+
+
+class RunRetention:
+    def __init__(self):
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._last: dict = {}
+
+    def start(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, name="run-retention", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def stats(self) -> dict:
+        return {
+            "running": self._thread is not None and self._thread.is_alive(),
+            "hot_days": AUTOMATION_RUNS_HOT_DAYS,
+            "archive": AUTOMATION_RUNS_ARCHIVE,
+            "archive_days": AUTOMATION_RUNS_ARCHIVE_DAYS,
+            "last": self._last,
+        }
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                print(f"[run-retention] maintenance failed: {e}")
+            self._stop.wait(AUTOMATION_RUNS_MAINTENANCE_INTERVAL)
+
+    def run_once(self) -> dict:
+        """One maintenance cycle. Returns what was done (empty when another process holds the lock)."""
+        now = datetime.now(timezone.utc)
+        done = {"at": now.isoformat(), "created": 0, "archived": [], "dropped": [], "trimmed": 0}
+
+        with get_pool().connection() as c, c.cursor() as cur:
+            cur.execute("SELECT pg_try_advisory_xact_lock(%s)", (MAINTENANCE_LOCK,))
+            if not cur.fetchone()[0]:
+                return {}
+            cur.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass('public.automation_runs')")
+            row = cur.fetchone()
+            if not row or row[0] != "p":
+                print("[run-retention] automation_runs is not partitioned; nothing to maintain")
+                self._stop.set()
+                return {}
+
+            cur.execute("SELECT public.lm_automation_runs_ensure_partitions(%s)", (AUTOMATION_RUNS_PARTITIONS_AHEAD,))
+            done["created"] = cur.fetchone()[0]
+
+            cur.execute(
+                """
+                SELECT c.relname
+                FROM pg_inherits i
+                JOIN pg_class c ON c.oid = i.inhrelid
+                WHERE i.inhparent = 'public.automation_runs'::regclass
+                ORDER BY c.relname
+                """
+            )
+            attached = [r[0] for r in cur.fetchall()]
+            cur.execute(
+                """
+                SELECT c.relname
+                FROM pg_class c
+                JOIN pg_namespace n ON n.oid = c.relnamespace
+                WHERE n.nspname = %s AND c.relkind = 'r'
+                ORDER BY c.relname
+                """,
+                (ARCHIVE_SCHEMA,),
+            )
+            archived = [r[0] for r in cur.fetchall()]
+
+        hot_from = now - timedelta(days=AUTOMATION_RUNS_HOT_DAYS)
+        for name in attached:
+            end = _month_end(name)
+            if end is not None and end <= hot_from and self._archive(name):
+                done["archived"].append(name)
+
+        if AUTOMATION_RUNS_ARCHIVE_DAYS > 0:
+            keep_from = now - timedelta(days=AUTOMATION_RUNS_ARCHIVE_DAYS)
+            for name in archived:
+                end = _month_end(name)
+                if end is not None and end <= keep_from and self._drop_archived(name):
+                    done["dropped"].append(name)
+
+        done["trimmed"] = self._trim_default(hot_from)
+        self._last = done
+        if done["created"] or done["archived"] or done["dropped"] or done["trimmed"]:
+            print(f"[run-retention] {done}")
+        return done
+
+    def _archive(self, name: str) -> bool:
+        # Plain DETACH (CONCURRENTLY is not allowed next to a default partition): it only needs
+        # a short exclusive lock on the parent, so give up quickly and retry next cycle if busy.
+        try:
+            with get_pool().connection() as c, c.cursor() as cur:
+                cur.execute("SELECT pg_try_advisory_xact_lock(%s)", (MAINTENANCE_LOCK,))
+                if not cur.fetchone()[0]:
+                    return False
+                cur.execute("SET LOCAL lock_timeout = '5s'")
+                cur.execute(f"ALTER TABLE public.automation_runs DETACH PARTITION public.{name}")
+                if AUTOMATION_RUNS_ARCHIVE == "drop":
+                    cur.execute(f"DROP TABLE public.{name}")
+                else:
+                    cur.execute(f"ALTER TABLE public.{name} SET SCHEMA {ARCHIVE_SCHEMA}")
+            return True
+        except Exception as e:
+            print(f"[run-retention] archiving {name} failed: {e}")
+            return False
+
+    def _drop_archived(self, name: str) -> bool:
+        try:
+            with get_pool().connection() as c, c.cursor() as cur:
+                cur.execute(f"DROP TABLE IF EXISTS {ARCHIVE_SCHEMA}.{name}")
+            return True
+        except Exception as e:
+            print(f"[run-retention] dropping {ARCHIVE_SCHEMA}.{name} failed: {e}")
+            return False
+
+    def _trim_default(self, before: datetime) -> int:
+        # The default partition only fills up when partitions were missing; keep it inside the window too
+        trimmed = 0
+        while not self._stop.is_set():
+            with get_pool().connection() as c, c.cursor() as cur:
+                cur.execute(
+                    """
+                    DELETE FROM public.automation_runs_default
+                    WHERE ctid IN (
+                        SELECT ctid FROM public.automation_runs_default
+                        WHERE created_at < %s
+                        LIMIT %s
+                    )
+                    """,
+                    (before, DEFAULT_TRIM_BATCH),
+                )
+                n = cur.rowcount
+            trimmed += n
+            if n < DEFAULT_TRIM_BATCH:
+                return trimmed
+        return trimmed
+
+
+RETENTION = RunRetention()
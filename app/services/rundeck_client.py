@@ -4,6 +4,11 @@ from fastapi import HTTPException
 # IMPORT THE HELPER
 from utils import get_secret
 
+# Shared keep-alive session (connection pool sized for the concurrent history fan-out)
+_SESSION = requests.Session()
+_SESSION.mount("https://", requests.adapters.HTTPAdapter(pool_maxsize=16))
+_SESSION.mount("http://", requests.adapters.HTTPAdapter(pool_maxsize=16))
+
 class RundeckClient:
     def __init__(self):
         self.base_url = (os.getenv("RUNDECK_URL") or "").rstrip("/")
@@ -30,7 +35,7 @@ class RundeckClient:
     def _request(self, method: str, path: str, **kwargs):
         url = f"{self.base_url}{path}"
         try:
-            r = requests.request(
+            r = _SESSION.request(
                 method,
                 url,
                 headers=self._headers(),
@@ -62,13 +67,13 @@ class RundeckClient:
     def execution_detail(self, execution_id: int):
         return self._request("GET", f"/api/{self.api_version}/execution/{execution_id}")
 
-    def execution_output(self, execution_id: int, offset: int = 0, lastmod: int = 0):
+    def execution_output(self, execution_id: int, offset: int = 0, lastmod: int = 0, compact: bool = True):
         return self._request(
             "GET",
             f"/api/{self.api_version}/execution/{execution_id}/output",
             params={
                 "offset": offset,
                 "lastmod": lastmod,
-                "compact": "true",
+                "compact": "true" if compact else "false",
             }
         )
\ No newline at end of file
@@ -0,0 +1,314 @@
+# /app/services/rundeck_jobs.py
+import os
+import re
+import threading
+from typing import Dict
+
+import requests
+from fastapi import HTTPException
+from urllib3.exceptions import ConnectTimeoutError
+
+from services.events import BROKER
+from utils import get_secret
+
+ALLOWED_ACTIONS = {"commission", "decommission", "start", "stop"}
+
+JOB_CONFIG: Dict[str, Dict[str, str]] = {
+    "commission":   {"job_name": "Commission Launcher",   "job_env": "RUNDECK_JOB_COMMISSION_ID"},
+    "decommission": {"job_name": "Decommission Launcher", "job_env": "RUNDECK_JOB_DECOMMISSION_ID"},
+    "start":        {"job_name": "Start Launcher",        "job_env": "RUNDECK_JOB_START_ID"},
+    "stop":         {"job_name": "Stop Launcher",         "job_env": "RUNDECK_JOB_STOP_ID"},
+}
+
+# --- RUNDECK EXECUTION WATCHER (publishes SSE: "rundeck_execution") ---
+
+RUNDECK_POLL_MIN = float(os.getenv("RUNDECK_POLL_MIN", "1.5"))   # seconds between polls while things change
+RUNDECK_POLL_MAX = float(os.getenv("RUNDECK_POLL_MAX", "10"))    # back-off ceiling when nothing changes
+RUNDECK_WATCH_MAX_ERRORS = 12
+
+ACTIVE_STATUSES = ("running", "scheduled", "queued")
+
+# Shared HTTP session so the watcher reuses connections to Rundeck's Jetty
+_SESSION = requests.Session()
+
+def _parse_opt(argstring: str, opt: str) -> str | None:
+    if not argstring:
+        return None
+    m = re.search(rf"(?:^|\s)-{re.escape(opt)}(?:=|\s+)(\S+)", str(argstring), re.IGNORECASE)
+    return m.group(1) if m else None
+
+def _rundeck_get(path: str, params: dict | None = None) -> dict:
+    token = get_secret("RUNDECK_TOKEN")
+    url = os.getenv("RUNDECK_URL")  # MUST already include /rundeck in your setup
+    if not token or not url:
+        raise RuntimeError("RUNDECK_URL or RUNDECK_TOKEN missing")
+
+    r = _SESSION.get(
+        f"{url}/api/54{path}",
+        params=params,
+        headers={
+            "X-Rundeck-Auth-Token": token,
+            "Accept": "application/json",
+        },
+        timeout=15,
+        verify=False,
+    )
+    r.raise_for_status()
+    return r.json()
+
+def _rundeck_get_execution_detail(execution_id: int) -> dict:
+    return _rundeck_get(f"/execution/{execution_id}")
+
+def _rundeck_running_executions(project: str) -> dict[int, dict]:
+    """All running executions of a project, keyed by execution id (paged, usually one call)."""
+    out: dict[int, dict] = {}
+    offset = 0
+    while True:
+        data = _rundeck_get(f"/project/{project}/executions/running", {"max": 500, "offset": offset}) or {}
+        executions = data.get("executions") or []
+        for ex in executions:
+            try:
+                out[int(ex.get("id"))] = ex
+            except (TypeError, ValueError):
+                continue
+        total = (data.get("paging") or {}).get("total") or 0
+        offset += len(executions)
+        if not executions or offset >= total:
+            return out
+
+def _rundeck_detail_to_event(detail: dict, execution_id: int) -> dict:
+    job = detail.get("job") or {}
+    argstring = detail.get("argstring") or ""
+
+    ds = (detail.get("date-started") or {}).get("date")
+    de = (detail.get("date-ended") or {}).get("date")
+
+    options = detail.get("options") or {}
+    machine = None
+    lm_run_id = None
+
+    if isinstance(options, dict):
+        machine = options.get("machineName")
+        lm_run_id = options.get("lmRunId")
+
+    machine = machine or _parse_opt(argstring, "machineName")
+    lm_run_id = lm_run_id or _parse_opt(argstring, "lmRunId")
+
+    return {
+        "executionId": execution_id,
+        "status": detail.get("status"),
+        "project": detail.get("project"),
+        "user": detail.get("user"),
+        "dateStarted": ds,
+        "dateEnded": de,
+        "job": {"id": job.get("id"), "name": job.get("name")},
+        "machine_name": machine,
+        "lmRunId": lm_run_id,
+    }
+
+class RundeckExecutionWatcher:
+    """
+    One background loop for every in-flight execution.
+
+    Each tick issues a single "running executions" query per project. Only executions
+    that dropped out of that list get an individual detail fetch (to learn their final
+    status). Polling backs off from RUNDECK_POLL_MIN to RUNDECK_POLL_MAX while nothing
+    changes, and events are published only on status transitions.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tracked: dict[int, dict] = {}  # {executionId: {"project", "last", "errors"}}
+        self._wake = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._interval = RUNDECK_POLL_MIN
+
+    def watch(self, execution_id: int, project: str | None = None, status: str | None = None) -> None:
+        with self._lock:
+            if execution_id not in self._tracked:
+                self._tracked[execution_id] = {
+                    "project": project,
+                    "last": (status or "").lower() or None,
+                    "errors": 0,
+                }
+            self._interval = RUNDECK_POLL_MIN
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._loop, name="rundeck-watcher", daemon=True)
+                self._thread.start()
+        self._wake.set()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"tracked": len(self._tracked), "interval_s": round(self._interval, 2)}
+
+    def _loop(self) -> None:
+        while True:
+            with self._lock:
+                idle = not self._tracked
+            if idle:
+                self._wake.wait()
+            self._wake.clear()
+
+            try:
+                changed = self._tick()
+            except Exception as e:
+                print(f"[rundeck-watcher] tick failed: {e}")
+                changed = False
+
+            with self._lock:
+                if changed:
+                    self._interval = RUNDECK_POLL_MIN
+                else:
+                    self._interval = min(self._interval * 1.5, RUNDECK_POLL_MAX)
+                interval = self._interval
+            # new watches wake us early
+            self._wake.wait(interval)
+
+    def _tick(self) -> bool:
+        with self._lock:
+            snapshot = {ex_id: dict(info) for ex_id, info in self._tracked.items()}
+        if not snapshot:
+            return False
+
+        events: list[dict] = []
+        done: list[int] = []
+        failed: list[int] = []
+
+        by_project: dict[str | None, list[int]] = {}
+        for ex_id, info in snapshot.items():
+            by_project.setdefault(info["project"], []).append(ex_id)
+
+        for project, ids in by_project.items():
+            running: dict[int, dict] = {}
+            if project:
+                try:
+                    running = _rundeck_running_executions(project)
+                except Exception as e:
+                    print(f"[rundeck-watcher] running query for project {project} failed: {e}")
+                    failed.extend(ids)
+                    continue
+
+            for ex_id in ids:
+                info = snapshot[ex_id]
+                detail = running.get(ex_id)
+                if detail is None:
+                    # Finished (or project unknown yet): one detail fetch settles it
+                    try:
+                        detail = _rundeck_get_execution_detail(ex_id)
+                    except Exception:
+                        failed.append(ex_id)
+                        continue
+
+                payload = _rundeck_detail_to_event(detail, ex_id)
+                status = (payload.get("status") or "").lower()
+
+                if status != info["last"]:
+                    events.append(payload)
+                    snapshot[ex_id]["last"] = status
+                if payload.get("project"):
+                    snapshot[ex_id]["project"] = payload["project"]
+                if status and status not in ACTIVE_STATUSES:
+                    done.append(ex_id)
+
+        with self._lock:
+            for ex_id, info in snapshot.items():
+                cur = self._tracked.get(ex_id)
+                if cur is None:
+                    continue
+                cur["last"] = info["last"]
+                cur["project"] = info["project"]
+            for ex_id in failed:
+                cur = self._tracked.get(ex_id)
+                if cur is None:
+                    continue
+                cur["errors"] += 1
+                if cur["errors"] >= RUNDECK_WATCH_MAX_ERRORS:
+                    self._tracked.pop(ex_id, None)
+            for ex_id in done:
+                self._tracked.pop(ex_id, None)
+
+        if events:
+            BROKER.publish_many("rundeck_execution", events)
+        return bool(events)
+
+
+WATCHER = RundeckExecutionWatcher()
+
+def _start_rundeck_watch(execution_id: int, project: str | None = None, status: str | None = None) -> None:
+    WATCHER.watch(execution_id, project=project, status=status)
+
+# --- RUNDECK HELPER (NEW) ---
+
+def trigger_rundeck_job(job_id: str, options: dict):
+    """
+    Helper to trigger a Rundeck job with named options.
+
+    Failures tell the caller whether the job can have started: 502 (Rundeck answered with
+    an error) and 503 (not configured / never connected) mean it did not, anything else
+    (no answer after the request was sent) means it may have.
+    """
+    # UPDATED LINE:
+    token = get_secret("RUNDECK_TOKEN")
+    url = os.getenv("RUNDECK_URL")
+
+    if not url or not token:
+        raise HTTPException(status_code=503, detail="Rundeck URL or token not configured")
+    if not job_id:
+        raise HTTPException(status_code=503, detail="Rundeck job ID not configured")
+
+    try:
+        r = requests.post(
+            f"{url}/api/54/job/{job_id}/run",
+            headers={
+                "X-Rundeck-Auth-Token": token,
+                "Content-Type": "application/json",
+                "Accept": "application/json",
+            },
+            json={"options": options},
+            timeout=30,
+            verify=False,
+        )
+        r.raise_for_status()
+
+    except requests.HTTPError as e:
+        # include body to make debugging easier
+        body = ""
+        try:
+            body = e.response.text
+        except Exception:
+            pass
+        raise HTTPException(status_code=502, detail=f"Rundeck HTTP error: {e} {body}")
+
+    except requests.RequestException as e:
+        reason = getattr(e.args[0], "reason", None) if e.args else None
+        if isinstance(reason, ConnectTimeoutError):
+            # refused / unresolvable / connect timeout: nothing was sent
+            raise HTTPException(status_code=503, detail=f"Rundeck unreachable: {e}")
+        raise HTTPException(status_code=504, detail=f"No answer from Rundeck, the job may have started: {e}")
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Rundeck error: {e}")
+
+    # Accepted from here on: a response we cannot parse must not look like a failed trigger
+    try:
+        execution = r.json() or {}
+    except ValueError:
+        execution = {}
+
+    # Rundeck response usually contains {"id": <executionId>}
+    ex_id = execution.get("id") or (execution.get("execution") or {}).get("id")
+    try:
+        ex_id_int = int(ex_id) if ex_id is not None else None
+    except Exception:
+        ex_id_int = None
+
+    if ex_id_int:
+        BROKER.publish("rundeck_execution", {
+            "executionId": ex_id_int,
+            "status": "running",
+            "machine_name": options.get("machineName"),
+            "lmRunId": options.get("lmRunId"),
+        })
+        _start_rundeck_watch(ex_id_int, project=execution.get("project"), status="running")
+
+    return execution
@@ -0,0 +1,164 @@
+# /app/services/sync_engine.py
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+from psycopg2.extras import Json
+
+from services.db_pool import get_pool
+from services.events import BROKER
+
+SYNC_RUNS_RETENTION_DAYS = int(os.getenv("SYNC_RUNS_RETENTION_DAYS", "30"))  # 0 = keep forever
+SYNC_RUNS_PRUNE_INTERVAL = 3600  # seconds between sync_runs prunes per engine
+
+
+class SyncRun:
+    """
+    Timings and counters of one sync cycle, stored as sync_runs.details:
+    {..engine counts, "phases": {"fetch"|"diff"|"write"|"publish": ms}, "duration_ms",
+     "requests", "bytes", "rows_changed"} (+ "error", "error_type", "phase" on failure).
+    """
+
+    def __init__(self):
+        self.started_at = datetime.now(timezone.utc)
+        self._t0 = time.perf_counter()
+        self.phases: dict[str, float] = {}
+        self.current: str | None = None  # phase that was running when the cycle failed
+        self.client = None               # LeClient of the cycle (request / byte counters)
+
+    @contextmanager
+    def phase(self, name: str):
+        self.current = name
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + (time.perf_counter() - t0) * 1000
+        self.current = None
+
+    def details(self, counts: dict) -> dict:
+        client = self.client
+        return {
+            **counts,
+            "phases": {name: round(ms, 1) for name, ms in self.phases.items()},
+            "duration_ms": round((time.perf_counter() - self._t0) * 1000, 1),
+            "requests": client.requests if client is not None else 0,
+            "bytes": client.bytes if client is not None else 0,
+        }
+
+
+class SyncEngine:
+    """
+    Periodic LE -> LM sync (launcher state, launcher groups).
+
+    Subclasses set name / source / lock / interval / enabled and implement
+    _sync(cur, run) -> (counts, events), which runs inside one transaction holding the
+    transaction-level advisory lock `lock` (other processes skip the cycle) and times its
+    steps with run.phase("fetch" / "diff" / "write"). counts["rows_changed"] is the number of
+    rows written. events = [(event, items)] are published after the commit. Every cycle,
+    failed ones included, is recorded in sync_runs with real start / end times.
+    """
+
+    name = "sync"
+    source = "sync"   # sync_runs.source
+    lock = 0
+    interval = 60.0
+    enabled = True
+
+    def __init__(self):
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._last: dict = {}
+        self._pruned_at = 0.0
+        self._totals = {"cycles": 0, "skipped": 0, "errors": 0, "rows_changed": 0}
+
+    def start(self) -> None:
+        if not self.enabled or not self.can_run():
+            return
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, name=self.name, daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def can_run(self) -> bool:
+        return True
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "running": self._thread is not None and self._thread.is_alive(),
+            "interval": self.interval,
+            "last": self._last,
+            **self._totals,
+        }
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            started = time.monotonic()
+            self.run_once()
+            self._stop.wait(max(0.0, self.interval - (time.monotonic() - started)))
+
+    def run_once(self) -> dict:
+        """One sync cycle. Returns its sync_runs details (empty when another process holds the lock)."""
+        run = SyncRun()
+        try:
+            with get_pool().connection() as c, c.cursor() as cur:
+                # Held for the whole cycle (LE fetch included) so only one process polls LE
+                cur.execute("SELECT pg_try_advisory_xact_lock(%s)", (self.lock,))
+                if not cur.fetchone()[0]:
+                    self._totals["skipped"] += 1
+                    return {}
+                counts, events = self._sync(cur, run)
+                self._prune(cur)
+                with run.phase("write"):
+                    c.commit()
+            with run.phase("publish"):
+                for event, items in events:
+                    BROKER.publish_many(event, items)
+        except Exception as e:
+            self._totals["errors"] += 1
+            error = getattr(e, "detail", None) or str(e)
+            print(f"[{self.name}] sync failed ({run.current or 'setup'}): {error}")
+            details = run.details({"error": error, "error_type": type(e).__name__, "phase": run.current})
+            self._record(run, "error", details)
+            return details
+
+        details = run.details(counts)
+        self._record(run, "ok", details)
+        self._totals["cycles"] += 1
+        for key, value in counts.items():
+            if key in self._totals:
+                self._totals[key] += value
+        self._last = {"at": run.started_at.isoformat(), **details}
+        return details
+
+    def _sync(self, cur, run: SyncRun) -> tuple[dict, list[tuple[str, list[dict]]]]:
+        raise NotImplementedError
+
+    def _prune(self, cur) -> None:
+        if SYNC_RUNS_RETENTION_DAYS <= 0 or time.monotonic() - self._pruned_at < SYNC_RUNS_PRUNE_INTERVAL:
+            return
+        cur.execute(
+            "DELETE FROM sync_runs WHERE source = %s AND started_at < now() - make_interval(days => %s)",
+            (self.source, SYNC_RUNS_RETENTION_DAYS),
+        )
+        self._pruned_at = time.monotonic()
+
+    def _record(self, run: SyncRun, status: str, details: dict) -> None:
+        # After commit + publish, so finished_at covers the whole cycle
+        try:
+            with get_pool().connection() as c, c.cursor() as cur:
+                cur.execute(
+                    """
+                    INSERT INTO sync_runs (source, started_at, finished_at, status, details)
+                    VALUES (%s, %s, clock_timestamp(), %s, %s)
+                    """,
+                    (self.source, run.started_at, status, Json(details)),
+                )
+        except Exception as e:
+            print(f"[{self.name}] recording sync run failed: {e}")
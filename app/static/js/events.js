@@ -145,6 +145,8 @@
       if (window.realtime && typeof window.realtime.on === "function") {
         this._onRundeckExecution = (payload) => this.onRundeckExecution(payload);
         window.realtime.on("rundeck_execution", this._onRundeckExecution);
+        this._onResync = () => this.loadRuns();
+        window.realtime.on("resync", this._onResync);
         return;
       }
 
@@ -159,6 +161,8 @@
             console.warn("[Events] SSE payload parse failed", e);
           }
         });
+        // Server could not replay what we missed while disconnected -> reload
+        this.es.addEventListener("resync", () => this.loadRuns());
 
         // Optional: log stream errors (it will auto-reconnect)
         this.es.onerror = () => {
@@ -174,8 +178,10 @@
       // shared realtime client
       if (window.realtime && typeof window.realtime.off === "function" && this._onRundeckExecution) {
         window.realtime.off("rundeck_execution", this._onRundeckExecution);
+        if (this._onResync) window.realtime.off("resync", this._onResync);
       }
       this._onRundeckExecution = null;
+      this._onResync = null;
 
       // direct EventSource
       if (this.es) {
@@ -488,6 +494,10 @@
         clearTimeout(this.pollTimer);
         this.pollTimer = null;
       }
+      if (this.outputSource) {
+        this.outputSource.close();
+        this.outputSource = null;
+      }
     },
 
     async openRun(execId) {
@@ -543,7 +553,49 @@
       await this.streamOutput(execId);
     },
 
+    // One shared server-side tail per execution (SSE); polling is the fallback for older APIs
     async streamOutput(execId) {
+      if (!window.EventSource) return this.pollOutput(execId);
+
+      const src = new EventSource(`/api/rundeck/executions/${encodeURIComponent(execId)}/output/stream`);
+      this.outputSource = src;
+      let received = false;
+
+      src.addEventListener("output", (ev) => {
+        if (this.outputSource !== src) return;
+        received = true;
+        let data;
+        try {
+          data = JSON.parse(ev.data);
+        } catch (e) {
+          return;
+        }
+        if (data.truncated) this.appendOutput("... earlier output not shown ...\n");
+        const text = (data.entries || []).map((entry) => entry?.log ?? "").filter(Boolean).join("\n");
+        if (text) this.appendOutput(text + "\n");
+      });
+
+      src.addEventListener("state", (ev) => {
+        if (this.outputSource !== src) return;
+        received = true;
+        let data = {};
+        try {
+          data = JSON.parse(ev.data) || {};
+        } catch (e) {}
+        if (data.error) this.appendOutput(`\n[${data.error}]\n`);
+        src.close();
+        this.outputSource = null;
+      });
+
+      src.onerror = () => {
+        // CONNECTING = the browser retries (resuming via Last-Event-ID); CLOSED = route unavailable
+        if (this.outputSource !== src || src.readyState !== EventSource.CLOSED) return;
+        this.outputSource = null;
+        if (!received && !this.pollAbort && this.modalOpen) this.pollOutput(execId);
+      };
+    },
+
+    async pollOutput(execId) {
       let offset = 0;
       let lastmod = 0;
 
@@ -0,0 +1,42 @@
+# /app/worker.py
+# Standalone queue worker: `python worker.py`
+# Drains the durable job_queue table (Rundeck triggers) outside of the API process.
+# Run as many of these as needed; SKIP LOCKED keeps them from picking the same job.
+import os
+import signal
+import threading
+
+from services import event_bus, job_queue
+from services.db_pool import get_pool, close_pool
+from services.events import BROKER
+
+
+def main() -> None:
+    stop = threading.Event()
+
+    def _shutdown(signum, frame):
+        print(f"[worker] signal {signum} received, finishing current jobs...")
+        stop.set()
+        job_queue.wake_workers()
+
+    signal.signal(signal.SIGTERM, _shutdown)
+    signal.signal(signal.SIGINT, _shutdown)
+
+    count = int(os.getenv("WORKER_CONCURRENCY", str(job_queue.BULK_WORKERS)))
+    get_pool().open()
+    # No SSE clients here: run/execution events reach the UI through the API's LISTEN connection
+    bus = event_bus.install(BROKER)
+    threads = job_queue.start_workers(count, stop)
+    print(f"[worker] started {count} queue worker thread(s)")
+
+    stop.wait()
+    for t in threads:
+        t.join(timeout=job_queue.JOB_VISIBILITY_TIMEOUT)
+    if bus is not None:
+        bus.stop()
+    close_pool()
+    print("[worker] stopped")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,13 @@
 from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Depends
-from fastapi.responses import HTMLResponse, RedirectResponse, JSONResponse
+from fastapi.responses import HTMLResponse, RedirectResponse, JSONResponse, Response
+from fastapi.encoders import jsonable_encoder
 from fastapi.staticfiles import StaticFiles
 from fastapi import Cookie
 from pydantic import BaseModel
-from typing import Optional, List, Dict, Any
-from datetime import datetime
+from typing import Optional, List, Any
+from datetime import datetime, timezone
 import json, os, psycopg2
-from psycopg2.extras import RealDictCursor, Json
+from psycopg2.extras import RealDictCursor
 import requests
 from cryptography.fernet import Fernet
 import urllib3
@@ -14,13 +15,26 @@ urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 from starlette.responses import StreamingResponse
 from starlette.requests import Request
 import anyio
-import queue
+import asyncio
 import threading
 import time
 import uuid
 import csv
+import re
 import io
 from routers.rundeck import router as rundeck_router
+from services.db_pool import get_pool, close_pool
+from services import db_async
+from services.events import BROKER
+from services import event_bus
+from services.inventory import INVENTORY, INVENTORY_ENABLED, INVENTORY_FULL_RELOAD_KEYS, LAUNCHER_FIELDS
+from services.pg_listen import LISTENER
+from services.rundeck_jobs import ALLOWED_ACTIONS, JOB_CONFIG
+from services import job_queue
+from services.run_retention import RETENTION
+from services.launcher_sync import SYNC as LAUNCHER_SYNC
+from services.group_sync import GROUP_SYNC
+from services.launcher_history import HISTORY, FLEET_GROUP, launcher_curve, group_curve
 from utils import get_secret
 from routers import auth
 
@@ -105,173 +119,93 @@ app.mount("/static", StaticFiles(directory="/app/static"), name="static")
 app.include_router(rundeck_router)  # or add prefix/tags here
 app.include_router(auth.router)
 
-# --- SSE EVENT BROKER ---
-class EventBroker:
-    def __init__(self):
-        self._lock = threading.Lock()
-        self._clients: dict[str, queue.Queue] = {}
-
-    def subscribe(self) -> tuple[str, queue.Queue]:
-        client_id = str(uuid.uuid4())
-        q: queue.Queue = queue.Queue(maxsize=200)
-        with self._lock:
-            self._clients[client_id] = q
-        return client_id, q
-
-    def unsubscribe(self, client_id: str) -> None:
-        with self._lock:
-            self._clients.pop(client_id, None)
-
-    def publish(self, event: str, data: dict) -> None:
-        msg = {"event": event, "data": data}
-        with self._lock:
-            for q in list(self._clients.values()):
-                try:
-                    q.put_nowait(msg)
-                except queue.Full:
-                    # drop oldest and try once more
-                    try:
-                        q.get_nowait()
-                    except queue.Empty:
-                        pass
-                    try:
-                        q.put_nowait(msg)
-                    except queue.Full:
-                        pass
-
-
-BROKER = EventBroker()
-
-def _sse(event: str, data: dict) -> bytes:
-    # SSE format: "event: <name>\ndata: <json>\n\n"
-    payload = json.dumps(data, default=str)
-    return f"event: {event}\ndata: {payload}\n\n".encode("utf-8")
-
-# --- RUNDECK EXECUTION WATCHER (publishes SSE: "rundeck_execution") ---
-
-RUNDECK_WATCH_LOCK = threading.Lock()
-RUNDECK_WATCHING: dict[int, dict] = {}  # {executionId: {"last": "...", "errors": 0}}
-
-def _parse_opt(argstring: str, opt: str) -> str | None:
-    if not argstring:
-        return None
-    import re
-    m = re.search(rf"(?:^|\s)-{re.escape(opt)}(?:=|\s+)(\S+)", str(argstring), re.IGNORECASE)
-    return m.group(1) if m else None
-
-def _rundeck_get_execution_detail(execution_id: int) -> dict:
-    token = get_secret("RUNDECK_TOKEN")
-    url = os.getenv("RUNDECK_URL")  # MUST already include /rundeck in your setup
-    if not token or not url:
-        raise RuntimeError("RUNDECK_URL or RUNDECK_TOKEN missing")
-
-    r = requests.get(
-        f"{url}/api/54/execution/{execution_id}",
-        headers={
-            "X-Rundeck-Auth-Token": token,
-            "Accept": "application/json",
-        },
-        timeout=15,
-        verify=False,
-    )
-    r.raise_for_status()
-    return r.json()
-
-def _rundeck_detail_to_event(detail: dict, execution_id: int) -> dict:
-    job = detail.get("job") or {}
-    argstring = detail.get("argstring") or ""
-
-    ds = (detail.get("date-started") or {}).get("date")
-    de = (detail.get("date-ended") or {}).get("date")
+app.mount("/static", StaticFiles(directory="/app/static"), name="static")
 
-    options = detail.get("options") or {}
-    machine = None
-    lm_run_id = None
+# --- SECURITY CONFIG ---
+# MVP: Load key from env. If missing, generate one (WARNING: ephemeral if not saved!)
+# You should add ENCRYPTION_KEY=... to your .env file.
+_env_key = get_secret("ENCRYPTION_KEY")
+if not _env_key:
+    # Generate a key for dev if missing (logs a warning)
+    print("WARNING: ENCRYPTION_KEY not found in env. Generating temporary key.")
+    _key = Fernet.generate_key()
+else:
+    _key = _env_key.encode()
 
-    if isinstance(options, dict):
-        machine = options.get("machineName")
-        lm_run_id = options.get("lmRunId")
+cipher_suite = Fernet(_key)
 
-    machine = machine or _parse_opt(argstring, "machineName")
-    lm_run_id = lm_run_id or _parse_opt(argstring, "lmRunId")
+def db():
+    """
+    Borrow a pooled connection: `with db() as c, c.cursor() as cur:`.
+    Commits/rolls back on exit and returns the connection to the pool.
+    """
+    return get_pool().connection()
 
-    return {
-        "executionId": execution_id,
-        "status": detail.get("status"),
-        "project": detail.get("project"),
-        "user": detail.get("user"),
-        "dateStarted": ds,
-        "dateEnded": de,
-        "job": {"id": job.get("id"), "name": job.get("name")},
-        "machine_name": machine,
-        "lmRunId": lm_run_id,
-    }
+@app.on_event("startup")
+def _open_db_pool():
+    try:
+        get_pool().open()
+    except Exception as e:
+        # Don't block startup; connections are created on demand once Postgres is reachable.
+        print(f"WARNING: Could not pre-fill DB pool: {e}")
 
-def _start_rundeck_watch(execution_id: int) -> None:
-    with RUNDECK_WATCH_LOCK:
-        if execution_id in RUNDECK_WATCHING:
-            return
-        RUNDECK_WATCHING[execution_id] = {"last": None, "errors": 0}
+@app.on_event("shutdown")
+def _close_db_pool():
+    close_pool()
 
-    def _watch():
-        try:
-            while True:
-                try:
-                    detail = _rundeck_get_execution_detail(execution_id)
-                    payload = _rundeck_detail_to_event(detail, execution_id)
+WORKERS_STOP = threading.Event()
 
-                    status = (payload.get("status") or "").lower()
-                    last = RUNDECK_WATCHING.get(execution_id, {}).get("last")
+@app.on_event("startup")
+def _start_bulk_workers():
+    # Set BULK_WORKERS=0 when dedicated worker processes (worker.py) drain the queue.
+    job_queue.start_workers(job_queue.BULK_WORKERS, WORKERS_STOP)
 
-                    if last is None or status != last:
-                        BROKER.publish("rundeck_execution", payload)
-                        RUNDECK_WATCHING[execution_id]["last"] = status
+@app.on_event("shutdown")
+def _stop_bulk_workers():
+    WORKERS_STOP.set()
+    job_queue.wake_workers()
 
-                    # stop once terminal
-                    if status and status not in ("running", "scheduled", "queued"):
-                        BROKER.publish("rundeck_execution", payload)
-                        break
+@app.on_event("startup")
+def _start_run_retention():
+    # automation_runs partition upkeep; an advisory lock keeps it to one process at a time
+    RETENTION.start()
 
-                    time.sleep(1.5)
+@app.on_event("shutdown")
+def _stop_run_retention():
+    RETENTION.stop()
 
-                except Exception as e:
-                    info = RUNDECK_WATCHING.get(execution_id)
-                    if not info:
-                        break
-                    info["errors"] += 1
-                    if info["errors"] >= 12:
-                        break
-                    time.sleep(2.5)
+@app.on_event("startup")
+def _start_launcher_history():
+    # launcher state history rollups / retention; an advisory lock keeps it to one process at a time
+    HISTORY.start()
 
-        finally:
-            with RUNDECK_WATCH_LOCK:
-                RUNDECK_WATCHING.pop(execution_id, None)
+@app.on_event("shutdown")
+def _stop_launcher_history():
+    HISTORY.stop()
 
-    threading.Thread(target=_watch, daemon=True).start()
+# LE -> LM syncs (replace the n8n refresh workflows); an advisory lock keeps each to one process
+SYNC_ENGINES = {"launchers": LAUNCHER_SYNC, "groups": GROUP_SYNC}
 
-app.mount("/static", StaticFiles(directory="/app/static"), name="static")
+@app.on_event("startup")
+def _start_le_syncs():
+    for engine in SYNC_ENGINES.values():
+        engine.start()
 
-# --- SECURITY CONFIG ---
-# MVP: Load key from env. If missing, generate one (WARNING: ephemeral if not saved!)
-# You should add ENCRYPTION_KEY=... to your .env file.
-_env_key = get_secret("ENCRYPTION_KEY")
-if not _env_key:
-    # Generate a key for dev if missing (logs a warning)
-    print("WARNING: ENCRYPTION_KEY not found in env. Generating temporary key.")
-    _key = Fernet.generate_key()
-else:
-    _key = _env_key.encode()
+@app.on_event("shutdown")
+def _stop_le_syncs():
+    for engine in SYNC_ENGINES.values():
+        engine.stop()
 
-cipher_suite = Fernet(_key)
+@app.on_event("startup")
+async def _open_async_db_pool():
+    try:
+        await db_async.open_pool()
+    except Exception as e:
+        print(f"WARNING: Could not open async DB pool: {e}")
 
-def db():
-    return psycopg2.connect(
-        host=os.getenv("DB_HOST"),
-        port=os.getenv("DB_PORT", "5432"),
-        dbname=os.getenv("DB_NAME"),
-        user=os.getenv("DB_USER"),
-        password=get_secret("DB_PASS")
-    )
+@app.on_event("shutdown")
+async def _close_async_db_pool():
+    await db_async.close_pool()
 
 # --- MODELS ---
 
@@ -307,181 +241,93 @@ class AutomationRun(BaseModel):
 class BulkActionRequest(BaseModel):
     machine_names: List[str]
 
-ALLOWED_ACTIONS = {"commission", "decommission", "start", "stop"}
-
-JOB_CONFIG: Dict[str, Dict[str, str]] = {
-    "commission":   {"job_name": "Commission Launcher",   "job_env": "RUNDECK_JOB_COMMISSION_ID"},
-    "decommission": {"job_name": "Decommission Launcher", "job_env": "RUNDECK_JOB_DECOMMISSION_ID"},
-    "start":        {"job_name": "Start Launcher",        "job_env": "RUNDECK_JOB_START_ID"},
-    "stop":         {"job_name": "Stop Launcher",         "job_env": "RUNDECK_JOB_STOP_ID"},
-}
-
-BULK_WORKERS = int(os.getenv("BULK_WORKERS", "3"))          # concurrency cap
-BULK_DELAY_MS = int(os.getenv("BULK_DELAY_MS", "150"))      # small pacing delay between triggers
-JOB_QUEUE: "queue.Queue[dict]" = queue.Queue(maxsize=5000)
-
-
-def _set_run_failed(lm_run_id: int, machine_name: str, action: str, err: str) -> None:
-    # Optional: mark the queued run as failed if we cannot trigger Rundeck at all.
-    try:
-        with db() as c, c.cursor() as cur:
-            cur.execute(
-                """
-                UPDATE automation_runs
-                SET status = %s, output = %s, finished_at = NOW()
-                WHERE id = %s
-                """,
-                ("failed", err[:4000], lm_run_id),
-            )
-    except Exception:
-        pass
-
-    BROKER.publish("automation_run", {
-        "machine_name": machine_name,
-        "run_id": lm_run_id,
-        "job_type": action,
-        "status": "failed",
-        "step_name": None,
-        "result": {"error": err},
-    })
-
-
-def _bulk_worker_loop(worker_id: int) -> None:
-    while True:
-        job = JOB_QUEUE.get()
-        try:
-            action = job["action"]
-            machine_name = job["machine_name"]
-            lm_run_id = job["lm_run_id"]
-
-            cfg = JOB_CONFIG.get(action)
-            if not cfg:
-                _set_run_failed(lm_run_id, machine_name, action, f"Unknown action '{action}'")
-                continue
-
-            job_id = os.getenv(cfg["job_env"])
-            if not job_id:
-                _set_run_failed(lm_run_id, machine_name, action, f"Missing env var {cfg['job_env']}")
-                continue
-
-            # Trigger Rundeck (this is the rate-limited part)
-            trigger_rundeck_job(
-                job_id,
-                options={"machineName": machine_name, "lmRunId": str(lm_run_id)},
-            )
-
-            # tiny pacing delay so we don't spike Rundeck even with multiple workers
-            if BULK_DELAY_MS > 0:
-                time.sleep(BULK_DELAY_MS / 1000.0)
-
-        except Exception as e:
-            try:
-                _set_run_failed(job.get("lm_run_id"), job.get("machine_name"), job.get("action"), str(e))
-            except Exception:
-                pass
-        finally:
-            JOB_QUEUE.task_done()
-
-
-@app.on_event("startup")
-def _start_bulk_workers():
-    for i in range(BULK_WORKERS):
-        t = threading.Thread(target=_bulk_worker_loop, args=(i,), daemon=True)
-        t.start()
-
-# --- RUNDECK HELPER (NEW) ---
-
-def trigger_rundeck_job(job_id: str, options: dict):
+def _enqueue_actions(machine_names: List[str], action: str) -> tuple[list, list]:
     """
-    Helper to trigger a Rundeck job with named options.
+    Set-based enqueue for one or many launchers.
+    Validation (launcher exists, commission prerequisites), the "queued" run rows and
+    their durable job_queue items are written in a single statement; SSE events follow as one batch.
+    Returns (queued, skipped) in the same order as machine_names.
     """
-    # UPDATED LINE:
-    token = get_secret("RUNDECK_TOKEN")
-    url = os.getenv("RUNDECK_URL")
-
-    if not url or not token:
-        raise HTTPException(status_code=500, detail="Rundeck URL or token not configured")
-    if not job_id:
-        raise HTTPException(status_code=500, detail="Rundeck job ID not configured")
-
-    try:
-        r = requests.post(
-            f"{url}/api/54/job/{job_id}/run",
-            headers={
-                "X-Rundeck-Auth-Token": token,
-                "Content-Type": "application/json",
-                "Accept": "application/json",
-            },
-            json={"options": options},
-            timeout=30,
-            verify=False,
-        )
-        r.raise_for_status()
-        execution = r.json()
-
-        # Rundeck response usually contains {"id": <executionId>}
-        ex_id = execution.get("id") or (execution.get("execution") or {}).get("id")
-        try:
-            ex_id_int = int(ex_id) if ex_id is not None else None
-        except Exception:
-            ex_id_int = None
-
-        if ex_id_int:
-            BROKER.publish("rundeck_execution", {
-                "executionId": ex_id_int,
-                "status": "running",
-                "machine_name": options.get("machineName"),
-                "lmRunId": options.get("lmRunId"),
-            })
-            _start_rundeck_watch(ex_id_int)
-
-        return execution
-
-    except requests.HTTPError as e:
-        # include body to make debugging easier
-        body = ""
-        try:
-            body = e.response.text
-        except Exception:
-            pass
-        raise HTTPException(status_code=502, detail=f"Rundeck HTTP error: {e} {body}")
-
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Rundeck error: {e}")
-
-def _enqueue_action(machine_name: str, action: str) -> int:
     if action not in ALLOWED_ACTIONS:
         raise HTTPException(status_code=400, detail=f"Unsupported action '{action}'")
 
     cfg = JOB_CONFIG[action]
+    require_config = action == "commission"
 
-    # Create "queued" run row and publish SSE event
     with db() as c, c.cursor(cursor_factory=RealDictCursor) as cur:
         cur.execute(
             """
-            INSERT INTO automation_runs (machine_name, job_name, job_type, status)
-            VALUES (%s, %s, %s, %s)
-            RETURNING id
+            WITH req AS (
+                SELECT n.machine_name, n.ord
+                FROM unnest(%(names)s::text[]) WITH ORDINALITY AS n(machine_name, ord)
+            ),
+            checked AS (
+                SELECT
+                  req.machine_name,
+                  req.ord,
+                  CASE
+                    WHEN l.machine_name IS NULL THEN 'Launcher not found'
+                    WHEN %(require_config)s AND l.managed_policy_id IS NULL THEN 'Missing managed_policy_id'
+                    WHEN %(require_config)s AND l.credential_id IS NULL THEN 'Missing credential_id'
+                  END AS skip_reason
+                FROM req
+                LEFT JOIN launchers l
+                  ON l.machine_name = req.machine_name
+            ),
+            ins AS (
+                INSERT INTO automation_runs (machine_name, job_name, job_type, status)
+                SELECT machine_name, %(job_name)s, %(action)s, 'queued'
+                FROM checked
+                WHERE skip_reason IS NULL
+                ORDER BY ord
+                RETURNING id, machine_name
+            ),
+            enq AS (
+                INSERT INTO job_queue (run_id, action, machine_name, max_attempts)
+                SELECT id, %(action)s, machine_name, %(max_attempts)s
+                FROM ins
+                ORDER BY id
+            )
+            SELECT c.machine_name, c.skip_reason, ins.id AS run_id
+            FROM checked c
+            LEFT JOIN ins
+              ON ins.machine_name = c.machine_name
+            ORDER BY c.ord
             """,
-            (machine_name, cfg["job_name"], action, "queued"),
+            {
+                "names": list(machine_names),
+                "require_config": require_config,
+                "job_name": cfg["job_name"],
+                "action": action,
+                "max_attempts": job_queue.JOB_MAX_ATTEMPTS,
+            },
         )
-        lm_run_id = cur.fetchone()["id"]
+        rows = cur.fetchall()
 
-    BROKER.publish("automation_run", {
-        "machine_name": machine_name,
-        "run_id": lm_run_id,
-        "job_type": action,
-        "status": "queued",
-        "step_name": None,
-    })
+    queued = [{"machine_name": r["machine_name"], "automationRunId": r["run_id"]} for r in rows if r["run_id"] is not None]
+    skipped = [{"machine_name": r["machine_name"], "reason": r["skip_reason"]} for r in rows if r["run_id"] is None]
+
+    BROKER.publish_many("automation_run", [
+        {
+            "machine_name": q["machine_name"],
+            "run_id": q["automationRunId"],
+            "job_type": action,
+            "status": "queued",
+            "step_name": None,
+        }
+        for q in queued
+    ])
+
+    if queued:
+        job_queue.wake_workers()
 
-    JOB_QUEUE.put({
-        "action": action,
-        "machine_name": machine_name,
-        "lm_run_id": lm_run_id,
-    })
+    return queued, skipped
 
-    return lm_run_id
+def _enqueue_action(machine_name: str, action: str) -> int:
+    queued, skipped = _enqueue_actions([machine_name], action)
+    if not queued:
+        raise HTTPException(status_code=404, detail=skipped[0]["reason"] if skipped else "Launcher not found")
+    return queued[0]["automationRunId"]
 
 # --- ROUTES ---
 @app.delete("/api/launchers/{machine_name}")
@@ -503,6 +349,7 @@ def delete_launcher(machine_name: str):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Database error: {e}")
 
+    _inventory_refresh([machine_name])
     return {"ok": True, "deleted": machine_name}
     
 @app.post("/api/groups/{group_id}/{action}")
@@ -510,6 +357,8 @@ def run_group_action(group_id: str, action: str):
     if action not in ALLOWED_ACTIONS:
         raise HTTPException(status_code=400, detail=f"Unsupported action '{action}'")
 
+    # Membership comes from SQL, not the inventory index: a group or member the index has not
+    # caught up with yet must not be left out of the action
     with db() as c, c.cursor(cursor_factory=RealDictCursor) as cur:
         cur.execute("SELECT id, name FROM launcher_groups WHERE id = %s", (group_id,))
         g = cur.fetchone()
@@ -518,89 +367,75 @@ def run_group_action(group_id: str, action: str):
 
         cur.execute(
             """
-            SELECT l.machine_name, l.managed_policy_id, l.credential_id
+            SELECT gm.machine_name
             FROM launcher_group_members gm
-            JOIN launchers l
-              ON l.machine_name = gm.machine_name
             WHERE gm.group_id = %s
-            ORDER BY l.machine_name
+            ORDER BY gm.machine_name
             """,
             (group_id,),
         )
-        rows = cur.fetchall()
-
-    queued = []
-    skipped = []
-
-    for r in rows:
-        mn = r["machine_name"]
-
-        if action == "commission":
-            if r.get("managed_policy_id") is None:
-                skipped.append({"machine_name": mn, "reason": "Missing managed_policy_id"})
-                continue
-            if r.get("credential_id") is None:
-                skipped.append({"machine_name": mn, "reason": "Missing credential_id"})
-                continue
+        names = [r["machine_name"] for r in cur.fetchall()]
 
-        run_id = _enqueue_action(mn, action)
-        queued.append({"machine_name": mn, "automationRunId": run_id})
+    queued, skipped = _enqueue_actions(names, action) if names else ([], [])
 
     return {"group_id": group_id, "group_name": g["name"], "action": action, "queued": queued, "skipped": skipped}
 
 @app.get("/api/groups")
-def list_groups():
-    with db() as c, c.cursor(cursor_factory=RealDictCursor) as cur:
-        cur.execute(
-            """
-            SELECT
-              g.id,
-              g.name,
-              g.type,
-              COUNT(DISTINCT l.machine_name)::int AS member_count,
-              g.description,
-              g.last_synced_at
-            FROM launcher_groups g
-            LEFT JOIN launcher_group_members gm
-              ON gm.group_id = g.id
-            LEFT JOIN launchers l
-              ON lower(l.machine_name) = lower(gm.machine_name)
-            GROUP BY g.id, g.name, g.type, g.description, g.last_synced_at
-            ORDER BY g.name
-            """
-        )
-        return cur.fetchall()
+async def list_groups(request: Request):
+    # registered_count is kept up to date by triggers on launcher_group_members
+    return await _versioned_fetch(request, ("launcher_groups",), lambda conn: _fetch_dicts(
+        conn,
+        """
+        SELECT id, name, type, registered_count AS member_count, description, last_synced_at
+        FROM launcher_groups
+        ORDER BY name
+        """,
+    ))
+
+GROUP_MEMBER_FIELDS = (
+    "machine_name", "ip_address", "online", "properties", "first_seen",
+    "autologon_enabled", "secure_launcher_enabled", "current_version",
+    "managed_policy_id", "credential_id",
+)
 
 @app.get("/api/groups/{group_id}")
-def get_group(group_id: str):
-    with db() as c, c.cursor(cursor_factory=RealDictCursor) as cur:
-        cur.execute(
-            """
-            SELECT id, name, type, member_count, description, last_synced_at
-            FROM launcher_groups
-            WHERE id = %s
-            """,
-            (group_id,),
-        )
-        g = cur.fetchone()
+async def get_group(group_id: str):
+    try:
+        gid = uuid.UUID(group_id)
+    except ValueError:
+        raise HTTPException(status_code=404, detail="Group not found")
+
+    if _inventory_ready():
+        g = INVENTORY.get_group(str(gid))
         if not g:
             raise HTTPException(status_code=404, detail="Group not found")
-
-        cur.execute(
-            """
-            SELECT
-              l.machine_name, l.ip_address, l.online, l.properties, l.first_seen,
-              l.autologon_enabled, l.secure_launcher_enabled, l.current_version,
-              l.managed_policy_id, l.credential_id
-            FROM launcher_group_members gm
-            JOIN launchers l
-              ON l.machine_name = gm.machine_name
-            WHERE gm.group_id = %s
-            ORDER BY l.machine_name
-            """,
-            (group_id,),
-        )
-        members = cur.fetchall()
+        return {"group": g, "members": INVENTORY.group_members(str(gid), fields=GROUP_MEMBER_FIELDS)}
+
+    g = await db_async.fetchrow(
+        """
+        SELECT id, name, type, member_count, description, last_synced_at
+        FROM launcher_groups
+        WHERE id = $1
+        """,
+        gid,
+    )
+    if not g:
+        raise HTTPException(status_code=404, detail="Group not found")
+
+    members = await db_async.fetch(
+        """
+        SELECT
+          l.machine_name, l.ip_address, l.online, l.properties, l.first_seen,
+          l.autologon_enabled, l.secure_launcher_enabled, l.current_version,
+          l.managed_policy_id, l.credential_id
+        FROM launcher_group_members gm
+        JOIN launchers_full l
+          ON l.machine_name = gm.machine_name
+        WHERE gm.group_id = $1
+        ORDER BY l.machine_name
+        """,
+        gid,
+    )
 
     return {"group": g, "members": members}
 
@@ -616,64 +451,115 @@ def bulk_launcher_action(action: str, body: BulkActionRequest):
     if not names:
         raise HTTPException(status_code=400, detail="machine_names is required")
 
-    # Fetch launchers once for validation
-    with db() as c, c.cursor(cursor_factory=RealDictCursor) as cur:
-        cur.execute(
-            """
-            SELECT machine_name, managed_policy_id, credential_id
-            FROM launchers
-            WHERE machine_name = ANY(%s)
-            """,
-            (names,),
-        )
-        rows = cur.fetchall()
-
-    found = {r["machine_name"]: r for r in rows}
-    queued = []
-    skipped = []
+    # Validation + run rows in one round trip. Not pre-filtered with the inventory index: it may
+    # not have caught up with a launcher registered or configured a moment ago.
+    queued, skipped = _enqueue_actions(names, action)
 
-    for mn in names:
-        row = found.get(mn)
-        if not row:
-            skipped.append({"machine_name": mn, "reason": "Launcher not found"})
-            continue
+    return {"action": action, "queued": queued, "skipped": skipped}
 
-        if action == "commission":
-            if row.get("managed_policy_id") is None:
-                skipped.append({"machine_name": mn, "reason": "Missing managed_policy_id"})
-                continue
-            if row.get("credential_id") is None:
-                skipped.append({"machine_name": mn, "reason": "Missing credential_id"})
-                continue
+SSE_KEEPALIVE_S = float(os.getenv("SSE_KEEPALIVE_S", "15"))
 
-        run_id = _enqueue_action(mn, action)
-        queued.append({"machine_name": mn, "automationRunId": run_id})
+@app.on_event("startup")
+async def _bind_event_broker():
+    loop = asyncio.get_running_loop()
+    BROKER.bind_loop(loop)
+    # Publish through Postgres NOTIFY so every uvicorn worker / replica sees every event
+    bus = event_bus.install(BROKER)
+    if bus is not None:
+        bus.start_listener(loop)
+
+@app.on_event("shutdown")
+def _stop_event_bus():
+    bus = event_bus.get_bus()
+    if bus is not None:
+        bus.stop()
+    LISTENER.stop()
 
-    return {"action": action, "queued": queued, "skipped": skipped}
+@app.on_event("startup")
+async def _load_inventory():
+    # Launcher list / group / bulk validation reads are served from memory once this is loaded
+    if not INVENTORY_ENABLED:
+        return
+    if not await anyio.to_thread.run_sync(INVENTORY.start):
+        print("WARNING: Inventory index not loaded yet; serving launcher reads from SQL until it is.")
+
+def _inventory_ready() -> bool:
+    return INVENTORY_ENABLED and INVENTORY.ready()
+
+def _inventory_refresh(names: list[str] | None) -> None:
+    # Our own committed launcher writes: apply them now so the next read (the UI refreshes
+    # right after a write) does not wait for the lm_inventory notification
+    if _inventory_ready():
+        INVENTORY.refresh_launchers(names)
+
+# --- CONDITIONAL GET (ETag / If-None-Match) ---
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # If-None-Match uses the weak comparison
+    return any(t.strip().removeprefix("W/") == etag for t in header.split(","))
+
+def _not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "no-cache"})
+
+def _json_with_etag(content, etag: str) -> JSONResponse:
+    # no-cache: browsers keep the body but revalidate every time (cheap 304s)
+    return JSONResponse(jsonable_encoder(content), headers={"ETag": etag, "Cache-Control": "no-cache"})
+
+async def _fetch_dicts(conn, sql: str, *args) -> list[dict]:
+    return [dict(r) for r in await conn.fetch(sql, *args)]
+
+async def _versioned_fetch(request: Request, tables: tuple, fetch) -> Response:
+    """
+    Serve `await fetch(conn)` with an ETag built from collection_versions of `tables`.
+    The versions and the rows come from one snapshot; a matching If-None-Match is answered
+    with 304 after the version lookup alone.
+    """
+    pool = await db_async.open_pool()
+    async with pool.acquire() as conn:
+        async with conn.transaction(isolation="repeatable_read", readonly=True):
+            versions = dict(await conn.fetch(
+                "SELECT name, version FROM collection_versions WHERE name = ANY($1::text[])",
+                list(tables),
+            ))
+            etag = '"' + ".".join(str(versions.get(t, 0)) for t in tables) + '"'
+            if _etag_matches(request, etag):
+                return _not_modified(etag)
+            content = await fetch(conn)
+    return _json_with_etag(content, etag)
 
 @app.get("/api/events")
 async def sse_events(request: Request):
-    client_id, q = BROKER.subscribe()
+    # EventSource sends Last-Event-ID on reconnect; the query param allows a manual resume
+    last_event_id = request.headers.get("last-event-id") or request.query_params.get("lastEventId")
+    client_id, q, backlog = BROKER.subscribe(last_event_id)
 
     async def gen():
         # tell browser how long to wait before reconnecting
         yield b"retry: 2000\n\n"
 
-        last_ping = time.monotonic()
+        if backlog:
+            yield b"".join(backlog)
+
         try:
             while True:
-                if await request.is_disconnected():
-                    break
-
                 try:
-                    # wait up to 1s for an event (in a thread so we don't block the loop)
-                    msg = await anyio.to_thread.run_sync(lambda: q.get(timeout=1))
-                    yield _sse(msg["event"], msg["data"])
-                except queue.Empty:
-                    # keep-alive comment every ~15s (helps proxies keep the stream open)
-                    if time.monotonic() - last_ping > 15:
-                        yield b": keepalive\n\n"
-                        last_ping = time.monotonic()
+                    # Idle clients just await their queue; Starlette cancels us on disconnect
+                    frame = await asyncio.wait_for(q.get(), timeout=SSE_KEEPALIVE_S)
+                except asyncio.TimeoutError:
+                    # keep-alive comment (helps proxies keep the stream open)
+                    yield b": keepalive\n\n"
+                    continue
+
+                # Frames are pre-encoded by the broker; flush whatever else is already queued in one write
+                chunk = [frame]
+                while not q.empty() and len(chunk) < 100:
+                    chunk.append(q.get_nowait())
+                yield b"".join(chunk)
         finally:
             BROKER.unsubscribe(client_id)
 
@@ -685,6 +571,141 @@ async def sse_events(request: Request):
     }
     return StreamingResponse(gen(), media_type="text/event-stream", headers=headers)
 
+@app.get("/api/events/stats")
+def sse_stats():
+    bus = event_bus.get_bus()
+    return {
+        "clients": BROKER.client_count(),
+        "bus": bus.stats() if bus is not None else {"backend": "local"},
+    }
+
+@app.get("/api/inventory/stats")
+def inventory_stats():
+    return {"enabled": INVENTORY_ENABLED, **INVENTORY.stats(), "listener": LISTENER.stats()}
+
+@app.get("/api/automation/retention")
+def automation_retention_stats():
+    return RETENTION.stats()
+
+SYNC_STATS_MAX_MINUTES = 7 * 24 * 60
+
+@app.get("/api/sync/stats")
+async def le_sync_latency(minutes: int = 60, launchers: int = 20):
+    """
+    Rolling sync health over the last `minutes`, from sync_runs:
+    - per source: runs, errors, p50/p95/max cycle duration and p50/p95 per phase (fetch, diff,
+      write, publish), bytes read from LE, rows changed, seconds since the last good run, and
+      whether p95 fits in the sync interval;
+    - launcher lag: how long after a state change in LE (last_state_change) LM applied it
+      (last_synced_at), as p50/p95/max plus the `launchers` slowest launchers.
+    """
+    if not 1 <= minutes <= SYNC_STATS_MAX_MINUTES:
+        raise HTTPException(status_code=400, detail=f"minutes must be between 1 and {SYNC_STATS_MAX_MINUTES}")
+    launchers = max(0, min(launchers, 1000))
+
+    sources = await db_async.fetch(
+        """
+        WITH runs AS (
+            SELECT source, status, started_at, finished_at, details,
+                   extract(epoch FROM finished_at - started_at)::float8 * 1000 AS ms
+            FROM sync_runs
+            WHERE started_at >= now() - make_interval(mins => $1)
+        )
+        SELECT source,
+               count(*) AS runs,
+               count(*) FILTER (WHERE status <> 'ok') AS errors,
+               percentile_cont(0.5) WITHIN GROUP (ORDER BY ms) AS p50_ms,
+               percentile_cont(0.95) WITHIN GROUP (ORDER BY ms) AS p95_ms,
+               max(ms) AS max_ms,
+               coalesce(sum((details->>'bytes')::bigint), 0) AS bytes,
+               coalesce(sum((details->>'rows_changed')::bigint), 0) AS rows_changed,
+               max(finished_at) FILTER (WHERE status = 'ok') AS last_ok_at,
+               extract(epoch FROM now() - max(finished_at) FILTER (WHERE status = 'ok'))::float8 AS staleness_s,
+               (array_agg(details->>'error' ORDER BY started_at DESC) FILTER (WHERE status <> 'ok'))[1] AS last_error
+        FROM runs
+        GROUP BY source
+        ORDER BY source
+        """,
+        minutes,
+    )
+    phases = await db_async.fetch(
+        """
+        SELECT r.source, p.key AS phase,
+               percentile_cont(0.5) WITHIN GROUP (ORDER BY p.value::float8) AS p50_ms,
+               percentile_cont(0.95) WITHIN GROUP (ORDER BY p.value::float8) AS p95_ms
+        FROM sync_runs r
+        CROSS JOIN LATERAL jsonb_each(r.details->'phases') p
+        WHERE r.started_at >= now() - make_interval(mins => $1)
+          AND r.status = 'ok'
+        GROUP BY r.source, p.key
+        """,
+        minutes,
+    )
+    intervals = {engine.source: engine.interval for engine in SYNC_ENGINES.values()}
+    for src in sources:
+        src["phases"] = {
+            p["phase"]: {"p50_ms": p["p50_ms"], "p95_ms": p["p95_ms"]}
+            for p in phases if p["source"] == src["source"]
+        }
+        interval = intervals.get(src["source"])
+        src["interval_s"] = interval
+        src["keeping_up"] = None if interval is None or src["p95_ms"] is None else src["p95_ms"] <= interval * 1000
+
+    lag_sql = """
+        SELECT machine_name, last_state_change, last_synced_at,
+               extract(epoch FROM last_synced_at - last_state_change)::float8 AS lag_s
+        FROM launcher_telemetry
+        WHERE last_state_change >= now() - make_interval(mins => $1)
+          AND last_synced_at >= last_state_change
+    """
+    lag = await db_async.fetchrow(
+        f"""
+        SELECT count(*) AS changes,
+               percentile_cont(0.5) WITHIN GROUP (ORDER BY lag_s) AS p50_s,
+               percentile_cont(0.95) WITHIN GROUP (ORDER BY lag_s) AS p95_s,
+               max(lag_s) AS max_s
+        FROM ({lag_sql}) l
+        """,
+        minutes,
+    )
+    slowest = await db_async.fetch(f"{lag_sql} ORDER BY lag_s DESC, machine_name LIMIT $2", minutes, launchers) if launchers else []
+
+    return {"minutes": minutes, "sources": sources, "launcher_lag": {**lag, "slowest": slowest}}
+
+def _sync_engine(name: str):
+    engine = SYNC_ENGINES.get(name)
+    if engine is None:
+        raise HTTPException(status_code=404, detail=f"Unknown sync '{name}'")
+    return engine
+
+@app.get("/api/sync/{name}")
+def le_sync_stats(name: str):
+    return _sync_engine(name).stats()
+
+@app.post("/api/sync/{name}/run")
+def le_sync_run(name: str):
+    """
+    Run one LE sync (launchers / groups) now. "skipped" when another process is syncing.
+    """
+    done = _sync_engine(name).run_once()
+    if "error" in done:
+        raise HTTPException(status_code=502, detail=done["error"])
+    return done or {"skipped": True}
+
+@app.get("/api/db/pool")
+def db_pool_stats():
+    """
+    Connection pool sizing and counters (for troubleshooting latency / connection churn).
+    """
+    return {"sync": get_pool().stats(), "async": db_async.stats()}
+
+@app.get("/api/jobs/queue")
+def job_queue_stats():
+    """
+    Durable job queue depth (ready / in flight / waiting for retry).
+    """
+    return job_queue.queue_stats()
+
 @app.get("/", response_class=HTMLResponse)
 async def root():
     return open("/app/static/index.html").read()
@@ -693,61 +714,311 @@ async def root():
 async def ui():
     return open("/app/static/index.html").read()
 
+LAUNCHERS_PAGE_DEFAULT = 500
+LAUNCHERS_PAGE_MAX = 5000
+
 @app.get("/api/launchers")
-def list_launchers():
-    with db() as c, c.cursor(cursor_factory=RealDictCursor) as cur:
-        # Updated to include new SSH columns
-        cur.execute(
-            """
-            SELECT machine_name, ip_address, online, commissioned, source, managed_policy_id, 
-                   ssh_host, ssh_port, credential_id, properties, first_seen, autologon_enabled, 
-                   secure_launcher_enabled, sessions, current_version
-            FROM launchers 
-            ORDER BY machine_name
-            """
+async def list_launchers(
+    request: Request,
+    limit: Optional[int] = None,
+    after: Optional[str] = None,
+    online: Optional[bool] = None,
+    commissioned: Optional[bool] = None,
+    policy: Optional[int] = None,
+    credential: Optional[int] = None,
+    group: Optional[str] = None,
+    source: Optional[str] = None,
+    prefix: Optional[str] = None,
+    fields: Optional[str] = None,
+    format: Optional[str] = None,
+):
+    """
+    Without query params: every launcher as a plain array (unchanged contract).
+    With any of them: keyset page ordered by machine_name -> {"items": [...], "next": <after>}
+    or, with format=columnar, {"columns": [...], "rows": [[...]], "next": <after>}.
+    Filters: online, commissioned, policy, credential, group, source, prefix (name prefix).
+    fields=a,b,c limits the columns (machine_name is always included).
+    Responses carry an ETag; If-None-Match gets a 304 when nothing changed.
+    """
+    paged = any(v is not None for v in (
+        limit, after, online, commissioned, policy, credential, group, source, prefix, fields, format,
+    ))
+    if paged:
+        return await _launchers_page(request, limit, after, online, commissioned, policy, credential,
+                                     group, source, prefix, fields, format)
+
+    if _inventory_ready():
+        etag = INVENTORY.etag()  # taken before the read, so it is never newer than the body
+        if _etag_matches(request, etag):
+            return _not_modified(etag)
+        return _json_with_etag(INVENTORY.list_launchers(), etag)
+
+    # Updated to include new SSH columns
+    return await _versioned_fetch(request, ("launchers",), lambda conn: _fetch_dicts(
+        conn,
+        """
+        SELECT machine_name, ip_address, online, commissioned, source, managed_policy_id, 
+               ssh_host, ssh_port, credential_id, properties, first_seen, autologon_enabled, 
+               secure_launcher_enabled, sessions, current_version
+        FROM launchers_full
+        ORDER BY machine_name
+        """,
+    ))
+
+async def _launchers_page(request, limit, after, online, commissioned, policy, credential,
+                          group, source, prefix, fields, fmt):
+    if fmt not in (None, "columnar"):
+        raise HTTPException(status_code=400, detail="format must be 'columnar'")
+    limit = min(max(1, limit or LAUNCHERS_PAGE_DEFAULT), LAUNCHERS_PAGE_MAX)
+
+    if fields:
+        cols = [f.strip() for f in fields.split(",") if f.strip()]
+        unknown = [f for f in cols if f not in LAUNCHER_FIELDS]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+        cols = ["machine_name"] + [f for f in dict.fromkeys(cols) if f != "machine_name"]
+    else:
+        cols = list(LAUNCHER_FIELDS)
+
+    if group is not None:
+        try:
+            group = str(uuid.UUID(group))
+        except ValueError:
+            raise HTTPException(status_code=400, detail="group must be a UUID")
+
+    filters = {
+        "online": online, "commissioned": commissioned, "policy": policy, "credential": credential,
+        "group": group, "source": source, "prefix": prefix,
+    }
+
+    def content(rows, next_after):
+        if fmt == "columnar":
+            return {"columns": cols, "rows": [list(r) for r in rows], "next": next_after}
+        return {"items": [dict(zip(cols, r)) for r in rows], "next": next_after}
+
+    if _inventory_ready():
+        etag = INVENTORY.etag()
+        if _etag_matches(request, etag):
+            return _not_modified(etag)
+        return _json_with_etag(content(*INVENTORY.query(filters, after, limit, tuple(cols))), etag)
+
+    async def fetch(conn):
+        return content(*await _launchers_page_sql(conn, filters, after, limit, cols))
+
+    return await _versioned_fetch(request, ("launchers", "launcher_group_members"), fetch)
+
+async def _launchers_page_sql(conn, filters: dict, after, limit: int, cols: list) -> tuple[list, str | None]:
+    # Same semantics as INVENTORY.query(): byte order ("C") on machine_name, false == "not true"
+    where, args = [], []
+
+    def arg(v):
+        args.append(v)
+        return f"${len(args)}"
+
+    if after is not None:
+        where.append(f'l.machine_name COLLATE "C" > {arg(after)}')
+    if filters["prefix"]:
+        like = re.sub(r"([\\%_])", r"\\\1", filters["prefix"]) + "%"
+        where.append(f'l.machine_name COLLATE "C" LIKE {arg(like)}')
+    for key in ("online", "commissioned"):
+        if filters[key] is not None:
+            where.append(f"l.{key} IS {'TRUE' if filters[key] else 'NOT TRUE'}")
+    if filters["policy"] is not None:
+        where.append(f"l.managed_policy_id = {arg(filters['policy'])}")
+    if filters["credential"] is not None:
+        where.append(f"l.credential_id = {arg(filters['credential'])}")
+    if filters["source"] is not None:
+        where.append(f"l.source = {arg(filters['source'])}")
+    if filters["group"] is not None:
+        where.append(
+            "EXISTS (SELECT 1 FROM launcher_group_members gm "
+            f"WHERE gm.machine_name = l.machine_name AND gm.group_id = {arg(uuid.UUID(filters['group']))})"
+        )
+
+    sql = (
+        "SELECT " + ", ".join(f"l.{c}" for c in cols) + " FROM launchers_full l"
+        + (" WHERE " + " AND ".join(where) if where else "")
+        + f' ORDER BY l.machine_name COLLATE "C" LIMIT {arg(limit + 1)}'
+    )
+    records = await conn.fetch(sql, *args)
+
+    rows = [tuple(r) for r in records[:limit]]
+    next_after = rows[-1][0] if len(records) > limit else None
+    return rows, next_after
+
+# --- LAUNCHER CHANGE FEED ---
+
+LAUNCHER_TOMBSTONE_RETENTION_DAYS = int(os.getenv("LAUNCHER_TOMBSTONE_RETENTION_DAYS", "7"))
+_SNAPSHOT_RE = re.compile(r"^\d+:\d+:(\d+(,\d+)*)?$")
+_TOMBSTONES_PRUNED_AT = 0.0
+
+async def _prune_launcher_tombstones():
+    # at most hourly per process; cursors older than the pruned range get a reset
+    global _TOMBSTONES_PRUNED_AT
+    if time.monotonic() - _TOMBSTONES_PRUNED_AT < 3600:
+        return
+    _TOMBSTONES_PRUNED_AT = time.monotonic()
+    await db_async.execute(
+        """
+        WITH pruned AS (
+            DELETE FROM launcher_tombstones
+            WHERE deleted_at < now() - make_interval(days => $1)
+            RETURNING row_version
         )
-        return cur.fetchall()
+        INSERT INTO change_feed_state (feed, pruned_through)
+        SELECT 'launchers', max(row_version) FROM pruned HAVING count(*) > 0
+        ON CONFLICT (feed) DO UPDATE
+        SET pruned_through = greatest(change_feed_state.pruned_through, EXCLUDED.pruned_through)
+        """,
+        LAUNCHER_TOMBSTONE_RETENTION_DAYS,
+    )
+
+@app.get("/api/launchers/changes")
+async def launcher_changes(since: Optional[str] = None):
+    """
+    Incremental launcher feed for UI polling: {"cursor", "reset", "upserts", "deleted"}.
+    Pass the returned cursor back as ?since=. Without a usable cursor (first call, expired
+    tombstones) reset is true and upserts holds every launcher.
+    """
+    try:
+        await _prune_launcher_tombstones()
+    except Exception as e:
+        print(f"WARNING: tombstone prune failed: {e}")
+
+    if since is not None and not _SNAPSHOT_RE.match(since):
+        since = None
+
+    columns = ", ".join(LAUNCHER_FIELDS)
+    pool = await db_async.open_pool()
+    async with pool.acquire() as conn:
+        # one snapshot for the cursor and the rows read with it
+        async with conn.transaction(isolation="repeatable_read", readonly=True):
+            cursor = await conn.fetchval("SELECT pg_current_snapshot()::text")
+
+            reset = since is None or not await conn.fetchval(
+                """
+                SELECT pg_snapshot_xmin($1::text::pg_snapshot) <= pg_snapshot_xmax($2::text::pg_snapshot)
+                   AND pg_snapshot_xmin($1::text::pg_snapshot) > coalesce(
+                         (SELECT pruned_through FROM change_feed_state WHERE feed = 'launchers'),
+                         '0'::xid8)
+                """,
+                since,
+                cursor,
+            )
+
+            if reset:
+                upserts = await conn.fetch(f"SELECT {columns} FROM launchers_full ORDER BY machine_name")
+                deleted = []
+            else:
+                # changed (launchers or launcher_telemetry row) by transactions that were not
+                # visible in the client's previous snapshot
+                upserts = await conn.fetch(
+                    f"""
+                    SELECT {columns}
+                    FROM launchers_full
+                    WHERE machine_name IN (
+                        SELECT machine_name FROM launchers
+                        WHERE row_version >= pg_snapshot_xmin($1::text::pg_snapshot)
+                          AND NOT pg_visible_in_snapshot(row_version, $1::text::pg_snapshot)
+                        UNION
+                        SELECT machine_name FROM launcher_telemetry
+                        WHERE row_version >= pg_snapshot_xmin($1::text::pg_snapshot)
+                          AND NOT pg_visible_in_snapshot(row_version, $1::text::pg_snapshot)
+                    )
+                    ORDER BY machine_name
+                    """,
+                    since,
+                )
+                deleted = await conn.fetch(
+                    """
+                    SELECT t.machine_name
+                    FROM launcher_tombstones t
+                    WHERE t.row_version >= pg_snapshot_xmin($1::text::pg_snapshot)
+                      AND NOT pg_visible_in_snapshot(t.row_version, $1::text::pg_snapshot)
+                      AND NOT EXISTS (SELECT 1 FROM launchers l WHERE l.machine_name = t.machine_name)
+                    ORDER BY t.machine_name
+                    """,
+                    since,
+                )
+
+    return {
+        "cursor": cursor,
+        "reset": reset,
+        "upserts": [dict(r) for r in upserts],
+        "deleted": [r["machine_name"] for r in deleted],
+    }
+
+# --- LAUNCHER STATE HISTORY ---
+
+@app.get("/api/launchers/history")
+def fleet_state_history(hours: int = 24, resolution: Optional[str] = None):
+    """
+    Fleet-wide availability / session curve: per bucket the launchers with a known state,
+    availability (share of their time online), online_avg / sessions_avg (time-weighted),
+    sessions_peak and transitions. resolution 5m (default up to 48 hours) or 1h.
+    """
+    return group_curve(FLEET_GROUP, hours, resolution)
+
+@app.get("/api/launchers/history/stats")
+def launcher_history_stats():
+    return HISTORY.stats()
+
+@app.get("/api/launchers/{machine_name}/history")
+def launcher_state_history(machine_name: str, hours: int = 24, resolution: Optional[str] = None):
+    """
+    One launcher's availability / session curve: per bucket availability, sessions_avg,
+    sessions_max and transitions. 5m buckets come from the raw transitions, 1h from the
+    hourly rollup (kept a year).
+    """
+    return launcher_curve(machine_name, hours, resolution)
+
+@app.get("/api/groups/{group_id}/history")
+def group_state_history(group_id: str, hours: int = 24, resolution: Optional[str] = None):
+    """Same as /api/launchers/history for the current members of one group."""
+    try:
+        gid = str(uuid.UUID(group_id))
+    except ValueError:
+        raise HTTPException(status_code=404, detail="Group not found")
+    return group_curve(gid, hours, resolution)
 
 # --- GET SINGLE LAUNCHER ---
 
 @app.get("/api/launchers/{machine_name}")
-def get_launcher(machine_name: str):
+async def get_launcher(machine_name: str):
     """
     Returns a single launcher record including SSH + policy linkage.
     Used by UI and automation for ad-hoc inspection.
     """
-    with db() as c, c.cursor(cursor_factory=RealDictCursor) as cur:
-        cur.execute(
-            """
-            SELECT machine_name,
-                   ip_address,
-                   online,
-                   source,
-                   managed_policy_id,
-                   ssh_host,
-                   ssh_port,
-                   credential_id,
-                   properties,
-                   groups,
-                   last_synced_at,
-                   last_state_change
-            FROM launchers
-            WHERE machine_name = %s
-            """,
-            (machine_name,),
-        )
-        row = cur.fetchone()
-        if not row:
-            raise HTTPException(status_code=404, detail="Launcher not found")
-        return row
+    row = await db_async.fetchrow(
+        """
+        SELECT machine_name,
+               ip_address,
+               online,
+               source,
+               managed_policy_id,
+               ssh_host,
+               ssh_port,
+               credential_id,
+               properties,
+               groups,
+               last_synced_at,
+               last_state_change
+        FROM launchers_full
+        WHERE machine_name = $1
+        """,
+        machine_name,
+    )
+    if not row:
+        raise HTTPException(status_code=404, detail="Launcher not found")
+    return row
 
 # --- CREDENTIAL ROUTES ---
 
 @app.get("/api/credentials", response_model=List[CredentialRead])
-def list_credentials():
-    with db() as c, c.cursor(cursor_factory=RealDictCursor) as cur:
-        cur.execute("SELECT id, name, type, username, created_at FROM credentials ORDER BY id")
-        return cur.fetchall()
+async def list_credentials(request: Request):
+    return await _versioned_fetch(request, ("credentials",), lambda conn: _fetch_dicts(
+        conn, "SELECT id, name, type, username, created_at FROM credentials ORDER BY id",
+    ))
 
 @app.delete("/api/credentials/{credential_id}")
 def delete_credential(credential_id: int):
@@ -783,12 +1054,10 @@ def delete_credential(credential_id: int):
         return {"ok": True, "deletedId": row["id"]}
 
 @app.get("/api/policies")
-def list_policies():
-    with db() as c, c.cursor(cursor_factory=RealDictCursor) as cur:
-        cur.execute(
-            "SELECT id, name FROM launcher_policies ORDER BY id"
-        )
-        return cur.fetchall()
+async def list_policies(request: Request):
+    return await _versioned_fetch(request, ("launcher_policies",), lambda conn: _fetch_dicts(
+        conn, "SELECT id, name FROM launcher_policies ORDER BY id",
+    ))
 
 @app.get("/api/policies/{policy_id}")
 def get_policy(policy_id: int):
@@ -845,20 +1114,19 @@ def register(
         cur.execute(
             """
             INSERT INTO launchers (
-                machine_name, ip_address, online, source, 
-                properties, last_synced_at,
+                machine_name, ip_address, source, 
+                properties,
                 ssh_host, ssh_port, credential_id, managed_policy_id
             )
             VALUES (
-                %s, %s, false, 'manual',
-                jsonb_build_object('domain', %s, 'username', %s, 'notes', %s), now(),
+                %s, %s, 'manual',
+                jsonb_build_object('domain', %s, 'username', %s, 'notes', %s),
                 %s, %s, %s, %s
             )
             ON CONFLICT (machine_name) DO UPDATE
             SET ip_address       = EXCLUDED.ip_address,
                 source           = 'manual',
                 properties       = EXCLUDED.properties,
-                last_synced_at   = now(),
                 ssh_host         = EXCLUDED.ssh_host,
                 ssh_port         = EXCLUDED.ssh_port,
                 credential_id    = COALESCE(EXCLUDED.credential_id, launchers.credential_id),
@@ -867,152 +1135,246 @@ def register(
             (machineName, ipAddress, domain, username, notes,
              sshHost, sshPort, credentialId, managedPolicyId),
         )
+    _inventory_refresh([machineName])
     return {"ok": True}
 
-@app.post("/api/launchers/import")
-async def import_launchers(file: UploadFile = File(...)):
-    if not file.filename.lower().endswith(".csv"):
-        raise HTTPException(status_code=400, detail="Please upload a .csv file")
+IMPORT_BATCH_ROWS = int(os.getenv("IMPORT_BATCH_ROWS", "5000"))  # rows per COPY batch / progress event
 
-    raw = await file.read()
-    text = raw.decode("utf-8-sig", errors="replace")
-    reader = csv.DictReader(io.StringIO(text))
+_IMPORT_HEADERS = {
+    "machine_name": ("machinename", "machine", "machinenameid"),
+    "ip_address": ("ipaddress", "ip"),
+    "credential_id": ("credential", "credentialid"),
+    # support: Policy / Policy ID / managed_policy_id / managedPolicyId
+    "managed_policy_id": ("policy", "policyid", "managedpolicy", "managedpolicyid"),
+}
+
+def _import_launchers_csv(fileobj, import_id: str) -> dict:
+    """
+    Streams a CSV upload into a temp staging table with COPY, validates it with
+    set-based joins and merges into launchers in one statement.
+    Publishes "launcher_import" SSE progress events along the way.
+    """
+    text = io.TextIOWrapper(fileobj, encoding="utf-8-sig", errors="replace", newline="")
+    reader = csv.reader(text)
 
     def norm(s: str) -> str:
         return "".join(ch for ch in (s or "").strip().lower() if ch.isalnum())
 
     # Expect these logical columns (flexible header names)
-    # Expect these logical columns (flexible header names)
-    col_map = {}
-    for h in (reader.fieldnames or []):
+    header = next(reader, [])
+    col_idx = {}
+    for i, h in enumerate(header):
         nh = norm(h)
-        if nh in ("machinename", "machine", "machinenameid", "machine_name"):
-            col_map["machine_name"] = h
-        elif nh in ("ipaddress", "ip", "ip_address"):
-            col_map["ip_address"] = h
-        elif nh in ("credential", "credentialid", "credential_id"):
-            col_map["credential_id"] = h
-        # support: Policy / Policy ID / managed_policy_id / managedPolicyId
-        elif nh in ("policy", "policyid", "managedpolicy", "managedpolicyid", "managed_policy_id"):
-            col_map["managed_policy_id"] = h
-
-    missing = [k for k in ("machine_name", "ip_address") if k not in col_map]
+        for key, aliases in _IMPORT_HEADERS.items():
+            if nh in aliases:
+                col_idx[key] = i
+
+    missing = [k for k in ("machine_name", "ip_address") if k not in col_idx]
     if missing:
         raise HTTPException(status_code=400, detail=f"CSV missing required columns: {', '.join(missing)}")
 
-    parsed = []
-    skipped = []
+    def progress(phase: str, **extra) -> None:
+        BROKER.publish("launcher_import", {"import_id": import_id, "phase": phase, **extra})
 
-    for i, row in enumerate(reader, start=2):  # 2 = header is line 1
-        mn = (row.get(col_map["machine_name"]) or "").strip()
-        ip = (row.get(col_map["ip_address"]) or "").strip()
-        cred_raw = (row.get(col_map["credential_id"]) or "").strip()
-        pol_raw = (row.get(col_map["managed_policy_id"]) or "").strip()
+    def cell(row: list, key: str) -> str:
+        i = col_idx.get(key)
+        return (row[i] if i is not None and i < len(row) else "").strip()
 
-        if not mn or not ip or not cred_raw or not pol_raw:
-            skipped.append({"line": i, "machine_name": mn or None, "reason": "Missing required value"})
-            continue
-
-        try:
-            cred_id = int(cred_raw)
-            pol_id = int(pol_raw)
-        except Exception:
-            skipped.append({"line": i, "machine_name": mn, "reason": "Credential/Policy must be numeric IDs"})
-            continue
-
-        parsed.append((mn, ip, cred_id, pol_id))
+    staged = 0
+    with db() as c, c.cursor() as cur:
+        cur.execute(
+            """
+            CREATE TEMP TABLE launcher_import_stage (
+                line          INTEGER NOT NULL,
+                machine_name  TEXT NOT NULL,
+                ip_address    TEXT NOT NULL,
+                credential_raw TEXT NOT NULL,
+                policy_raw    TEXT NOT NULL
+            ) ON COMMIT DROP
+            """
+        )
 
-    if not parsed:
-        return {"inserted": 0, "updated": 0, "skipped": skipped}
+        buf = io.StringIO()
+        writer = csv.writer(buf)
+        pending = 0
+
+        def flush() -> None:
+            nonlocal buf, writer, pending, staged
+            if not pending:
+                return
+            buf.seek(0)
+            cur.copy_expert(
+                "COPY launcher_import_stage FROM STDIN "
+                "WITH (FORMAT csv, FORCE_NOT_NULL (machine_name, ip_address, credential_raw, policy_raw))",
+                buf,
+            )
+            staged += pending
+            pending = 0
+            buf = io.StringIO()
+            writer = csv.writer(buf)
+            progress("staging", rows=staged)
+
+        for line, row in enumerate(reader, start=2):  # 2 = header is line 1
+            if not any((v or "").strip() for v in row):
+                continue
+            writer.writerow([
+                line,
+                cell(row, "machine_name"),
+                cell(row, "ip_address"),
+                cell(row, "credential_id"),
+                cell(row, "managed_policy_id"),
+            ])
+            pending += 1
+            if pending >= IMPORT_BATCH_ROWS:
+                flush()
+        flush()
+
+        progress("validating", rows=staged)
+
+        # Classify every staged row in one pass (anti-joins against credentials/policies).
+        # Duplicate machine names: the last valid line wins, earlier ones are reported as skipped.
+        cur.execute(
+            """
+            CREATE TEMP TABLE launcher_import_checked ON COMMIT DROP AS
+            WITH typed AS (
+                SELECT
+                  s.*,
+                  CASE WHEN s.credential_raw ~ '^[+-]?[0-9]{1,18}$' THEN s.credential_raw::bigint END AS cred_id,
+                  CASE WHEN s.policy_raw ~ '^[+-]?[0-9]{1,18}$' THEN s.policy_raw::bigint END AS pol_id
+                FROM launcher_import_stage s
+            ),
+            classified AS (
+                SELECT
+                  t.line, t.machine_name, t.ip_address, t.cred_id, t.pol_id,
+                  CASE
+                    WHEN t.machine_name = '' OR t.ip_address = '' OR t.credential_raw = '' OR t.policy_raw = ''
+                      THEN 'Missing required value'
+                    WHEN t.cred_id IS NULL OR t.pol_id IS NULL
+                      THEN 'Credential/Policy must be numeric IDs'
+                    WHEN c.id IS NULL
+                      THEN 'Credential ID ' || t.cred_id || ' not found'
+                    WHEN p.id IS NULL
+                      THEN 'Policy ID ' || t.pol_id || ' not found'
+                    WHEN NOT pg_input_is_valid(t.ip_address, 'inet')
+                      THEN 'Invalid IP address'
+                  END AS reason
+                FROM typed t
+                LEFT JOIN credentials c
+                  ON c.id = t.cred_id
+                LEFT JOIN launcher_policies p
+                  ON p.id = t.pol_id
+            )
+            SELECT
+              line, machine_name, ip_address, cred_id, pol_id,
+              CASE
+                WHEN reason IS NULL
+                 AND line <> max(line) FILTER (WHERE reason IS NULL) OVER (PARTITION BY machine_name)
+                  THEN 'Duplicate machine_name (later line used)'
+                ELSE reason
+              END AS reason
+            FROM classified
+            """
+        )
 
-    # Validate IDs exist (one pass)
-    cred_ids = sorted({p[2] for p in parsed})
-    pol_ids = sorted({p[3] for p in parsed})
+        progress("merging", rows=staged)
 
-    with db() as c, c.cursor(cursor_factory=RealDictCursor) as cur:
-        cur.execute("SELECT id FROM credentials WHERE id = ANY(%s)", (cred_ids,))
-        valid_creds = {r["id"] for r in cur.fetchall()}
+        cur.execute(
+            """
+            WITH merged AS (
+                INSERT INTO launchers (
+                    machine_name, ip_address, source,
+                    properties,
+                    ssh_host, ssh_port,
+                    credential_id, managed_policy_id
+                )
+                SELECT
+                    machine_name, ip_address::inet, 'csv',
+                    '{}'::jsonb,
+                    ip_address, 22,
+                    cred_id, pol_id
+                FROM launcher_import_checked
+                WHERE reason IS NULL
+                ON CONFLICT (machine_name) DO UPDATE
+                SET ip_address        = EXCLUDED.ip_address,
+                    source            = 'csv',
+                    ssh_host          = EXCLUDED.ssh_host,
+                    ssh_port          = EXCLUDED.ssh_port,
+                    credential_id     = COALESCE(EXCLUDED.credential_id, launchers.credential_id),
+                    managed_policy_id = COALESCE(EXCLUDED.managed_policy_id, launchers.managed_policy_id)
+                RETURNING (xmax = 0) AS inserted
+            )
+            SELECT
+              COUNT(*) FILTER (WHERE inserted)::int     AS inserted,
+              COUNT(*) FILTER (WHERE NOT inserted)::int AS updated
+            FROM merged
+            """
+        )
+        inserted, updated = cur.fetchone()
 
-        cur.execute("SELECT id FROM launcher_policies WHERE id = ANY(%s)", (pol_ids,))
-        valid_pols = {r["id"] for r in cur.fetchall()}
+        cur.execute(
+            """
+            SELECT line, NULLIF(machine_name, '') AS machine_name, reason
+            FROM launcher_import_checked
+            WHERE reason IS NOT NULL
+            ORDER BY line
+            """
+        )
+        skipped = [{"line": r[0], "machine_name": r[1], "reason": r[2]} for r in cur.fetchall()]
 
-    inserted = 0
-    updated = 0
+        merged_names = None  # a large import reloads the whole index anyway
+        if inserted + updated <= INVENTORY_FULL_RELOAD_KEYS:
+            cur.execute("SELECT machine_name FROM launcher_import_checked WHERE reason IS NULL")
+            merged_names = [r[0] for r in cur.fetchall()]
 
-    with db() as c, c.cursor() as cur:
-        for (mn, ip, cred_id, pol_id) in parsed:
-            if cred_id not in valid_creds:
-                skipped.append({"machine_name": mn, "reason": f"Credential ID {cred_id} not found"})
-                continue
-            if pol_id not in valid_pols:
-                skipped.append({"machine_name": mn, "reason": f"Policy ID {pol_id} not found"})
-                continue
+    _inventory_refresh(merged_names)
+    progress("done", rows=staged, inserted=inserted, updated=updated, skipped=len(skipped))
+    return {"import_id": import_id, "inserted": inserted, "updated": updated, "skipped": skipped}
 
-            try:
-                cur.execute(
-                    """
-                    INSERT INTO launchers (
-                        machine_name, ip_address, online, source,
-                        properties, last_synced_at,
-                        ssh_host, ssh_port,
-                        credential_id, managed_policy_id
-                    )
-                    VALUES (
-                        %s, %s, false, 'csv',
-                        '{}'::jsonb, now(),
-                        %s, 22,
-                        %s, %s
-                    )
-                    ON CONFLICT (machine_name) DO UPDATE
-                    SET ip_address        = EXCLUDED.ip_address,
-                        source            = 'csv',
-                        last_synced_at    = now(),
-                        ssh_host          = EXCLUDED.ssh_host,
-                        ssh_port          = EXCLUDED.ssh_port,
-                        credential_id     = COALESCE(EXCLUDED.credential_id, launchers.credential_id),
-                        managed_policy_id = COALESCE(EXCLUDED.managed_policy_id, launchers.managed_policy_id)
-                    RETURNING (xmax = 0) AS inserted
-                    """,
-                    (mn, ip, ip, cred_id, pol_id),
-                )
-                was_inserted = cur.fetchone()[0]
-                if was_inserted:
-                    inserted += 1
-                else:
-                    updated += 1
-            except Exception as e:
-                skipped.append({"machine_name": mn, "reason": f"DB error: {str(e)}"})
+@app.post("/api/launchers/import")
+async def import_launchers(
+    file: UploadFile = File(...),
+    importId: Optional[str] = Form(None, max_length=64),
+):
+    if not file.filename.lower().endswith(".csv"):
+        raise HTTPException(status_code=400, detail="Please upload a .csv file")
 
-    return {"inserted": inserted, "updated": updated, "skipped": skipped}
+    # The UI picks the id up front so it can tell its own progress events apart
+    import_id = importId or str(uuid.uuid4())
+    try:
+        # Parsing + COPY are blocking; run them off the event loop.
+        return await anyio.to_thread.run_sync(_import_launchers_csv, file.file, import_id)
+    except HTTPException:
+        raise
+    except Exception as e:
+        BROKER.publish("launcher_import", {"import_id": import_id, "phase": "failed", "error": str(e)})
+        raise HTTPException(status_code=500, detail=f"Import failed: {e}")
 
 # --- POLICY RESOLVER FOR A LAUNCHER ---
 
 @app.get("/api/launchers/{machine_name}/policy")
-def get_launcher_policy(machine_name: str):
+async def get_launcher_policy(machine_name: str):
     """
     Returns the effective policy JSON for a launcher, based on managed_policy_id.
     """
-    with db() as c, c.cursor(cursor_factory=RealDictCursor) as cur:
-        cur.execute(
-            """
-            SELECT lp.policy
-            FROM launchers l
-            JOIN launcher_policies lp
-              ON l.managed_policy_id = lp.id
-            WHERE l.machine_name = %s
-            """,
-            (machine_name,),
-        )
-        row = cur.fetchone()
-        if not row:
-            # Either launcher missing or managed_policy_id not set / invalid
-            raise HTTPException(status_code=404, detail="Policy not found for launcher")
-        return row["policy"]
+    row = await db_async.fetchrow(
+        """
+        SELECT lp.policy
+        FROM launchers l
+        JOIN launcher_policies lp
+          ON l.managed_policy_id = lp.id
+        WHERE l.machine_name = $1
+        """,
+        machine_name,
+    )
+    if not row:
+        # Either launcher missing or managed_policy_id not set / invalid
+        raise HTTPException(status_code=404, detail="Policy not found for launcher")
+    return row["policy"]
 
 # --- COMBINED RESOLVER FOR RUNDECK ---
 
 @app.get("/api/automation/resolve/{machine_name}")
-def resolve_for_automation(machine_name: str):
+async def resolve_for_automation(machine_name: str):
     """
     Single endpoint for Rundeck:
     - Resolves launcher SSH connection details
@@ -1020,82 +1382,80 @@ def resolve_for_automation(machine_name: str):
     - Resolves effective policy
     - Includes LE_FQDN so Rundeck jobs never rely on container env
     """
-    with db() as c, c.cursor(cursor_factory=RealDictCursor) as cur:
-        cur.execute(
-            """
-            SELECT
-              l.machine_name,
-              COALESCE(l.ssh_host, l.ip_address::text) AS ssh_host,
-              l.ssh_port,
-              l.managed_policy_id,
-              c.id          AS credential_id,
-              c.username    AS cred_username,
-              c.secret      AS cred_secret,
-              c.type        AS cred_type,
-              lp.policy     AS policy
-            FROM launchers l
-            LEFT JOIN credentials c
-              ON l.credential_id = c.id
-            LEFT JOIN launcher_policies lp
-              ON l.managed_policy_id = lp.id
-            WHERE l.machine_name = %s
-            """,
-            (machine_name,),
+    row = await db_async.fetchrow(
+        """
+        SELECT
+          l.machine_name,
+          COALESCE(l.ssh_host, l.ip_address::text) AS ssh_host,
+          l.ssh_port,
+          l.managed_policy_id,
+          c.id          AS credential_id,
+          c.username    AS cred_username,
+          c.secret      AS cred_secret,
+          c.type        AS cred_type,
+          lp.policy     AS policy
+        FROM launchers l
+        LEFT JOIN credentials c
+          ON l.credential_id = c.id
+        LEFT JOIN launcher_policies lp
+          ON l.managed_policy_id = lp.id
+        WHERE l.machine_name = $1
+        """,
+        machine_name,
+    )
+
+    if not row:
+        raise HTTPException(status_code=404, detail="Launcher not found")
+
+    if row["credential_id"] is None or row["cred_secret"] is None:
+        raise HTTPException(
+            status_code=400,
+            detail="Launcher is missing an associated credential"
         )
-        row = cur.fetchone()
 
-        if not row:
-            raise HTTPException(status_code=404, detail="Launcher not found")
+    # decrypt credential
+    try:
+        secret_plain = cipher_suite.decrypt(row["cred_secret"].encode()).decode()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to decrypt credential: {e}")
 
-        if row["credential_id"] is None or row["cred_secret"] is None:
-            raise HTTPException(
-                status_code=400,
-                detail="Launcher is missing an associated credential"
-            )
+    ssh_host = row["ssh_host"]
+    ssh_port = row["ssh_port"] or 22
 
-        # decrypt credential
-        try:
-            secret_plain = cipher_suite.decrypt(row["cred_secret"].encode()).decode()
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=f"Failed to decrypt credential: {e}")
+    policy = row["policy"] if row["policy"] is not None else {}
 
-        ssh_host = row["ssh_host"]
-        ssh_port = row["ssh_port"] or 22
+    le_fqdn = os.getenv("LE_FQDN")
+    le_ssh_user = os.getenv("LE_SSH_USER")
+    le_ssh_pass = get_secret("LE_SSH_PASS")
+    le_api_token = get_secret("LE_API_TOKEN")
+    
+    lm_ssh_user = os.getenv("LM_SSH_USER")
+    lm_ssh_pass = get_secret("LM_SSH_PASS")
+    lm_fqdn = os.getenv("LM_FQDN")
 
-        policy = row["policy"] if row["policy"] is not None else {}
+    if not le_fqdn or not le_ssh_user or not le_ssh_pass:
+        raise HTTPException(status_code=500, detail="LE appliance SSH environment variables missing")
 
-        le_fqdn = os.getenv("LE_FQDN")
-        le_ssh_user = os.getenv("LE_SSH_USER")
-        le_ssh_pass = get_secret("LE_SSH_PASS")
-        le_api_token = get_secret("LE_API_TOKEN")
-        
-        lm_ssh_user = os.getenv("LM_SSH_USER")
-        lm_ssh_pass = get_secret("LM_SSH_PASS")
-        lm_fqdn = os.getenv("LM_FQDN")
-
-        if not le_fqdn or not le_ssh_user or not le_ssh_pass:
-            raise HTTPException(status_code=500, detail="LE appliance SSH environment variables missing")
-
-        return {
-            "machine_name": row["machine_name"],
-            "ssh": {
-                "host": ssh_host,
-                "port": ssh_port,
-                "username": row["cred_username"],
-                "secret": secret_plain,
-                "type": row["cred_type"],
-            },
-            "policy": policy,
-            "le_appliance": {
-                "fqdn": le_fqdn,
-                "ssh_user": le_ssh_user,
-                "ssh_pass": le_ssh_pass,
-                "api_token": le_api_token,
-                "lm_fqdn": lm_fqdn,
-                "lm_ssh_user": lm_ssh_user,
-                "lm_ssh_pass": lm_ssh_pass
-            }        
-        }
+    return {
+        "machine_name": row["machine_name"],
+        "ssh": {
+            "host": ssh_host,
+            "port": ssh_port,
+            "username": row["cred_username"],
+            "secret": secret_plain,
+            "type": row["cred_type"],
+        },
+        "policy": policy,
+        "le_appliance": {
+            "fqdn": le_fqdn,
+            "ssh_user": le_ssh_user,
+            "ssh_pass": le_ssh_pass,
+            "api_token": le_api_token,
+            "lm_fqdn": lm_fqdn,
+            "lm_ssh_user": lm_ssh_user,
+            "lm_ssh_pass": lm_ssh_pass
+        }        
+    }
 
 # --- EXISTING ROUTES (UNCHANGED LOGIC) ---
 
@@ -1127,8 +1487,9 @@ def get_le_version():
 
 @app.post("/api/launchers/{machine_name}/state")
 def update_launcher_state(machine_name: str, body: LauncherStateUpdate):
-    updates = []
-    params = []
+    # launchers columns / launcher_telemetry columns (hot/cold split, see 10-schema.sql)
+    updates, params = [], []
+    telemetry, telemetry_params = [], []
 
     # Flag to track if we are wiping data (Decommissioning)
     is_decommissioning = (body.commissioned is False)
@@ -1140,8 +1501,8 @@ def update_launcher_state(machine_name: str, body: LauncherStateUpdate):
             raise HTTPException(status_code=400, detail=f"Invalid state '{body.state}'")
         
         # Update 'online' column
-        updates.append("online = CASE WHEN %s = 'running' THEN TRUE ELSE FALSE END")
-        params.append(body.state)
+        telemetry.append("online = CASE WHEN %s = 'running' THEN TRUE ELSE FALSE END")
+        telemetry_params.append(body.state)
         
         # ONLY update specific JSON property if we are NOT about to wipe it entirely
         if not is_decommissioning:
@@ -1168,30 +1529,38 @@ def update_launcher_state(machine_name: str, body: LauncherStateUpdate):
         if is_decommissioning:
             # Overwrite properties with empty JSON (wins over the json_set above)
             updates.append("properties = '{}'::jsonb") 
-            updates.append("current_version = NULL")
-            updates.append("supported_version = NULL")
             updates.append("first_seen = NULL")
-            updates.append("sessions = 0")
+            telemetry.append("current_version = NULL")
+            telemetry.append("supported_version = NULL")
+            telemetry.append("sessions = 0")
             # We already handled 'online' via the state check above, or we can force it here:
             if body.state is None:
-                 updates.append("online = FALSE")
+                 telemetry.append("online = FALSE")
 
-    if not updates:
+    if not updates and not telemetry:
         return {"machine_name": machine_name, "message": "No changes requested"}
 
-    updates.append("last_synced_at = NOW()")
-
-    sql = f"UPDATE launchers SET {', '.join(updates)} WHERE machine_name = %s"
-    params.append(machine_name)
+    telemetry.append("last_synced_at = NOW()")
 
     try:
         with db() as c, c.cursor() as cur:
-            cur.execute(sql, tuple(params))
+            # launchers before launcher_telemetry, the lock order of the sync and of deletes
+            if updates:
+                cur.execute(
+                    f"UPDATE launchers SET {', '.join(updates)} WHERE machine_name = %s",
+                    (*params, machine_name),
+                )
+            cur.execute(
+                f"UPDATE launcher_telemetry SET {', '.join(telemetry)} WHERE machine_name = %s",
+                (*telemetry_params, machine_name),
+            )
     except Exception as e:
         # Log the error so you can see it in docker logs if it happens again
         print(f"DB Error in update_launcher_state: {e}")
         raise HTTPException(status_code=500, detail=f"Database error: {e}")
-    
+
+    _inventory_refresh([machine_name])
+
     if body.state:
         BROKER.publish("launcher_state", {
             "machine_name": machine_name,
@@ -1202,37 +1571,34 @@ def update_launcher_state(machine_name: str, body: LauncherStateUpdate):
     return {"machine_name": machine_name, "updated": body.dict(exclude_unset=True)}
 # --- AUTOMATION RUNS ENDPOINT TO USE NEW COLUMNS ---
 @app.post("/api/automation/runs")
-def record_automation_run(run: AutomationRun):
+async def record_automation_run(run: AutomationRun):
     """
     Records an automation run result.
     Now supports job_type, step_name, and structured result JSON.
     """
     try:
-        with db() as c, c.cursor() as cur:
-            cur.execute(
-                """
-                INSERT INTO automation_runs (
-                    machine_name,
-                    job_name,
-                    status,
-                    output,
-                    finished_at,
-                    job_type,
-                    step_name,
-                    result
-                )
-                VALUES (%s, %s, %s, %s, NOW(), %s, %s, %s)
-                """,
-                (
-                    run.machine_name,
-                    run.job_name,
-                    run.status,
-                    run.output,
-                    run.job_type,
-                    run.step_name,
-                    Json(run.result) if run.result is not None else None,
-                ),
+        await db_async.execute(
+            """
+            INSERT INTO automation_runs (
+                machine_name,
+                job_name,
+                status,
+                output,
+                finished_at,
+                job_type,
+                step_name,
+                result
             )
+            VALUES ($1, $2, $3, $4, NOW(), $5, $6, $7)
+            """,
+            run.machine_name,
+            run.job_name,
+            run.status,
+            run.output,
+            run.job_type,
+            run.step_name,
+            run.result,
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Database error: {e}")
    
@@ -1247,6 +1613,128 @@ def record_automation_run(run: AutomationRun):
     
     return {"ok": True, "recorded": run.dict()}
 
+def _split_csv(value: str) -> list[str]:
+    return [v.strip() for v in value.split(",") if v.strip()]
+
+def _parse_iso(value: str, name: str) -> datetime:
+    try:
+        ts = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"{name} must be an ISO timestamp")
+    return ts if ts.tzinfo else ts.replace(tzinfo=timezone.utc)
+
+RUNS_PAGE_DEFAULT = 100
+RUNS_PAGE_MAX = 1000
+RUN_FIELDS = (
+    "id", "machine_name", "job_name", "job_type", "step_name", "status", "result",
+    "created_at", "finished_at",
+)
+
+@app.get("/api/automation/runs")
+async def list_automation_runs(
+    machine_name: Optional[str] = None,
+    job_type: Optional[str] = None,
+    status: Optional[str] = None,
+    step_name: Optional[str] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    before: Optional[int] = None,
+    limit: Optional[int] = None,
+    output: bool = False,
+    format: Optional[str] = None,
+):
+    """
+    Run history from automation_runs, newest first.
+    Keyset page: {"items": [...], "next": <before>}; pass next back as ?before= for the next page.
+    Filters: machine_name, job_type, status (comma list), step_name, since/until (created_at, ISO).
+    output=true adds the output text. format=ndjson streams every match (or up to limit)
+    as one JSON object per line, for exports.
+    """
+    if format not in (None, "ndjson"):
+        raise HTTPException(status_code=400, detail="format must be 'ndjson'")
+
+    where, args = [], []
+
+    def arg(v):
+        args.append(v)
+        return f"${len(args)}"
+
+    if machine_name is not None:
+        where.append(f"machine_name = {arg(machine_name)}")
+    if job_type is not None:
+        where.append(f"job_type = {arg(job_type)}")
+    if status:
+        where.append(f"status = ANY({arg(_split_csv(status))}::text[])")
+    if step_name is not None:
+        where.append(f"step_name = {arg(step_name)}")
+    if since:
+        where.append(f"created_at >= {arg(_parse_iso(since, 'since'))}")
+    if until:
+        where.append(f"created_at < {arg(_parse_iso(until, 'until'))}")
+    if before is not None:
+        where.append(f"id < {arg(before)}")
+
+    cols = RUN_FIELDS + (("output",) if output else ())
+    sql = (
+        f"SELECT {', '.join(cols)} FROM automation_runs"
+        f"{' WHERE ' + ' AND '.join(where) if where else ''}"
+        " ORDER BY id DESC"
+    )
+
+    if format == "ndjson":
+        if limit is not None:
+            sql += f" LIMIT {arg(max(1, limit))}"
+
+        async def lines():
+            chunk = []
+            async for row in db_async.stream(sql, *args):
+                chunk.append(json.dumps(row, default=str))
+                if len(chunk) >= 500:
+                    yield "\n".join(chunk) + "\n"
+                    chunk = []
+            if chunk:
+                yield "\n".join(chunk) + "\n"
+
+        return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+    limit = min(max(1, limit or RUNS_PAGE_DEFAULT), RUNS_PAGE_MAX)
+    rows = await db_async.fetch(sql + f" LIMIT {arg(limit + 1)}", *args)
+    next_before = rows[limit - 1]["id"] if len(rows) > limit else None
+    return {"items": rows[:limit], "next": next_before}
+
+@app.get("/api/automation/last-runs")
+async def list_last_runs(
+    job_type: Optional[str] = None,
+    status: Optional[str] = None,
+    since: Optional[str] = None,
+):
+    """
+    Latest run per (launcher, job_type) for the whole fleet, from launcher_last_run.
+    status takes a comma separated list; since filters on finished_at (ISO timestamp),
+    e.g. ?status=failed&since=2025-01-01T08:00:00Z for "what failed in the last rollout".
+    """
+    where, args = [], []
+    if job_type is not None:
+        args.append(job_type)
+        where.append(f"job_type = ${len(args)}")
+    if status:
+        args.append(_split_csv(status))
+        where.append(f"status = ANY(${len(args)}::text[])")
+    if since:
+        args.append(_parse_iso(since, "since"))
+        where.append(f"finished_at >= ${len(args)}")
+
+    return await db_async.fetch(
+        f"""
+        SELECT machine_name, NULLIF(job_type, '') AS job_type, run_id, job_name, status,
+               step_name, created_at, finished_at
+        FROM launcher_last_run
+        {"WHERE " + " AND ".join(where) if where else ""}
+        ORDER BY machine_name, job_type
+        """,
+        *args,
+    )
+
 @app.post("/api/policies")
 def upload_policy(name: str = Form(...), file: UploadFile = File(...)):
     try:
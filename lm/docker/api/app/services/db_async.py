@@ -0,0 +1,102 @@
+# /app/services/db_async.py
+import asyncio
+import json
+import os
+
+import asyncpg
+
+from utils import get_secret
+
+# Async (event-loop native) database access for hot read / automation endpoints.
+# Sync handlers keep using db() from services.db_pool; both pools talk to the same database.
+
+_POOL: asyncpg.Pool | None = None
+_POOL_LOCK: asyncio.Lock | None = None
+
+
+async def _init_connection(conn: asyncpg.Connection) -> None:
+    # Match psycopg2 behaviour: json/jsonb come back as Python objects, dicts go in as JSON.
+    for typename in ("json", "jsonb"):
+        await conn.set_type_codec(
+            typename,
+            encoder=lambda v: json.dumps(v, default=str),
+            decoder=json.loads,
+            schema="pg_catalog",
+        )
+
+
+async def open_pool() -> asyncpg.Pool:
+    global _POOL, _POOL_LOCK
+    if _POOL is not None:
+        return _POOL
+    if _POOL_LOCK is None:
+        _POOL_LOCK = asyncio.Lock()
+    async with _POOL_LOCK:
+        if _POOL is None:
+            _POOL = await asyncpg.create_pool(
+                host=os.getenv("DB_HOST"),
+                port=int(os.getenv("DB_PORT", "5432")),
+                database=os.getenv("DB_NAME"),
+                user=os.getenv("DB_USER"),
+                password=get_secret("DB_PASS"),
+                min_size=int(os.getenv("DB_ASYNC_POOL_MIN_SIZE", "2")),
+                max_size=int(os.getenv("DB_ASYNC_POOL_MAX_SIZE", "20")),
+                max_inactive_connection_lifetime=float(os.getenv("DB_POOL_MAX_IDLE", "300")),
+                timeout=float(os.getenv("DB_CONNECT_TIMEOUT", "10")),
+                server_settings={"application_name": os.getenv("DB_APPLICATION_NAME", "lm-api") + "-async"},
+                init=_init_connection,
+            )
+    return _POOL
+
+
+async def close_pool() -> None:
+    global _POOL
+    pool, _POOL = _POOL, None
+    if pool is not None:
+        await pool.close()
+
+
+async def fetch(sql: str, *args) -> list[dict]:
+    pool = await open_pool()
+    rows = await pool.fetch(sql, *args)
+    return [dict(r) for r in rows]
+
+
+async def fetchrow(sql: str, *args) -> dict | None:
+    pool = await open_pool()
+    row = await pool.fetchrow(sql, *args)
+    return dict(row) if row is not None else None
+
+
+async def fetchval(sql: str, *args):
+    pool = await open_pool()
+    return await pool.fetchval(sql, *args)
+
+
+async def execute(sql: str, *args) -> str:
+    pool = await open_pool()
+    return await pool.execute(sql, *args)
+
+
+async def stream(sql: str, *args, prefetch: int = 500):
+    """Yield rows as dicts from a server-side cursor (large exports without buffering the result)."""
+    pool = await open_pool()
+    async with pool.acquire() as conn:
+        async with conn.transaction(readonly=True):
+            async for row in conn.cursor(sql, *args, prefetch=prefetch):
+                yield dict(row)
+
+
+def stats() -> dict | None:
+    pool = _POOL
+    if pool is None:
+        return None
+    size = pool.get_size()
+    idle = pool.get_idle_size()
+    return {
+        "min_size": pool.get_min_size(),
+        "max_size": pool.get_max_size(),
+        "size": size,
+        "idle": idle,
+        "in_use": size - idle,
+    }
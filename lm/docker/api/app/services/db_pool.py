@@ -0,0 +1,306 @@
+# /app/services/db_pool.py
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import psycopg2
+from psycopg2 import extensions
+
+from utils import get_secret
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection becomes available within the pool timeout."""
+
+
+class ConnectionPool:
+    """
+    Thread-safe psycopg2 connection pool used behind db().
+
+    - Keeps between min_size and max_size connections open.
+    - Pings connections that sat idle longer than check_after before handing them out.
+    - Recycles connections older than max_lifetime and trims idle ones above min_size.
+    """
+
+    def __init__(
+        self,
+        connect_kwargs: dict,
+        min_size: int = 2,
+        max_size: int = 20,
+        max_lifetime: float = 1800.0,
+        max_idle: float = 300.0,
+        check_after: float = 30.0,
+        timeout: float = 30.0,
+    ):
+        self._connect_kwargs = connect_kwargs
+        self.min_size = max(0, min_size)
+        self.max_size = max(1, max_size, self.min_size)
+        self.max_lifetime = max_lifetime
+        self.max_idle = max_idle
+        self.check_after = check_after
+        self.timeout = timeout
+
+        self._cond = threading.Condition()
+        self._idle: deque = deque()  # (conn, last_used) - most recently used on the right
+        self._born: dict[int, float] = {}  # id(conn) -> creation time
+        self._size = 0  # open connections (idle + in use)
+        self._waiting = 0
+        self._closed = False
+        self._counters = {
+            "requests": 0,
+            "requests_waited": 0,
+            "wait_ms_total": 0.0,
+            "timeouts": 0,
+            "connections_created": 0,
+            "connections_closed": 0,
+            "connections_recycled": 0,
+            "health_check_failures": 0,
+            "connect_errors": 0,
+        }
+
+    # --- lifecycle ---
+
+    def open(self) -> None:
+        """Pre-fill the pool up to min_size."""
+        while True:
+            with self._cond:
+                if self._closed or self._size >= self.min_size:
+                    return
+                self._size += 1
+            try:
+                conn = self._connect()
+            except Exception:
+                with self._cond:
+                    self._size -= 1
+                    self._cond.notify()
+                raise
+            with self._cond:
+                self._idle.append((conn, time.monotonic()))
+                self._cond.notify()
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+            self._cond.notify_all()
+        for conn, _ in idle:
+            self._discard(conn)
+
+    # --- checkout / checkin ---
+
+    def getconn(self):
+        started = time.monotonic()
+        deadline = started + self.timeout
+        waited = False
+
+        with self._cond:
+            self._counters["requests"] += 1
+
+        while True:
+            conn = None
+            last_used = 0.0
+            create = False
+
+            with self._cond:
+                while True:
+                    if self._closed:
+                        raise PoolTimeout("Connection pool is closed")
+                    if self._idle:
+                        conn, last_used = self._idle.pop()
+                        break
+                    if self._size < self.max_size:
+                        self._size += 1
+                        create = True
+                        break
+
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._counters["timeouts"] += 1
+                        raise PoolTimeout(
+                            f"Timed out after {self.timeout:.0f}s waiting for a database connection "
+                            f"(max_size={self.max_size})"
+                        )
+                    waited = True
+                    self._waiting += 1
+                    try:
+                        self._cond.wait(remaining)
+                    finally:
+                        self._waiting -= 1
+
+            if create:
+                try:
+                    conn = self._connect()
+                except Exception:
+                    with self._cond:
+                        self._size -= 1
+                        self._counters["connect_errors"] += 1
+                        self._cond.notify()
+                    raise
+            elif not self._usable(conn, last_used):
+                self._discard(conn)
+                continue
+
+            if waited:
+                with self._cond:
+                    self._counters["requests_waited"] += 1
+                    self._counters["wait_ms_total"] += (time.monotonic() - started) * 1000.0
+            return conn
+
+    def putconn(self, conn, discard: bool = False) -> None:
+        if not discard and not conn.closed:
+            status = conn.info.transaction_status
+            if status != extensions.TRANSACTION_STATUS_IDLE:
+                # Caller left a transaction open (or it failed) - roll back before reuse.
+                try:
+                    conn.rollback()
+                except Exception:
+                    discard = True
+
+        if discard or conn.closed or self._expired(conn) or self._closed:
+            self._discard(conn)
+            return
+
+        now = time.monotonic()
+        stale = []
+        with self._cond:
+            self._idle.append((conn, now))
+            # Trim connections that have been idle too long, oldest first, down to min_size.
+            while (
+                self._size - len(stale) > self.min_size
+                and self._idle
+                and now - self._idle[0][1] > self.max_idle
+            ):
+                stale.append(self._idle.popleft()[0])
+            self._cond.notify()
+
+        for c in stale:
+            self._discard(c)
+
+    @contextmanager
+    def connection(self):
+        """
+        Borrow a connection for one unit of work.
+        Commits on success, rolls back on error, always returns the connection to the pool.
+        """
+        conn = self.getconn()
+        discard = False
+        try:
+            with conn:
+                yield conn
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            discard = True
+            raise
+        finally:
+            self.putconn(conn, discard=discard)
+
+    # --- stats ---
+
+    def stats(self) -> dict:
+        with self._cond:
+            idle = len(self._idle)
+            out = {
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+                "size": self._size,
+                "idle": idle,
+                "in_use": self._size - idle,
+                "waiting": self._waiting,
+                "max_lifetime_s": self.max_lifetime,
+                "max_idle_s": self.max_idle,
+                "timeout_s": self.timeout,
+            }
+            out.update(self._counters)
+        out["wait_ms_total"] = round(out["wait_ms_total"], 1)
+        return out
+
+    # --- internals ---
+
+    def _connect(self):
+        conn = psycopg2.connect(**self._connect_kwargs)
+        with self._cond:
+            self._born[id(conn)] = time.monotonic()
+            self._counters["connections_created"] += 1
+        return conn
+
+    def _discard(self, conn) -> None:
+        try:
+            if not conn.closed:
+                conn.close()
+        except Exception:
+            pass
+        with self._cond:
+            self._born.pop(id(conn), None)
+            self._size -= 1
+            self._counters["connections_closed"] += 1
+            self._cond.notify()
+
+    def _expired(self, conn) -> bool:
+        born = self._born.get(id(conn))
+        if born is None or self.max_lifetime <= 0:
+            return False
+        return time.monotonic() - born > self.max_lifetime
+
+    def _usable(self, conn, last_used: float) -> bool:
+        if conn.closed:
+            return False
+        if self._expired(conn):
+            with self._cond:
+                self._counters["connections_recycled"] += 1
+            return False
+        if time.monotonic() - last_used < self.check_after:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except Exception:
+            with self._cond:
+                self._counters["health_check_failures"] += 1
+            return False
+
+
+# --- MODULE-LEVEL POOL (one per process) ---
+
+_POOL: ConnectionPool | None = None
+_POOL_LOCK = threading.Lock()
+
+
+def connect_kwargs() -> dict:
+    return {
+        "host": os.getenv("DB_HOST"),
+        "port": os.getenv("DB_PORT", "5432"),
+        "dbname": os.getenv("DB_NAME"),
+        "user": os.getenv("DB_USER"),
+        "password": get_secret("DB_PASS"),
+        "application_name": os.getenv("DB_APPLICATION_NAME", "lm-api"),
+        "connect_timeout": int(os.getenv("DB_CONNECT_TIMEOUT", "10")),
+    }
+
+
+def get_pool() -> ConnectionPool:
+    global _POOL
+    if _POOL is None:
+        with _POOL_LOCK:
+            if _POOL is None:
+                _POOL = ConnectionPool(
+                    connect_kwargs(),
+                    min_size=int(os.getenv("DB_POOL_MIN_SIZE", "2")),
+                    max_size=int(os.getenv("DB_POOL_MAX_SIZE", "20")),
+                    max_lifetime=float(os.getenv("DB_POOL_MAX_LIFETIME", "1800")),
+                    max_idle=float(os.getenv("DB_POOL_MAX_IDLE", "300")),
+                    check_after=float(os.getenv("DB_POOL_CHECK_AFTER", "30")),
+                    timeout=float(os.getenv("DB_POOL_TIMEOUT", "30")),
+                )
+    return _POOL
+
+
+def close_pool() -> None:
+    global _POOL
+    with _POOL_LOCK:
+        pool, _POOL = _POOL, None
+    if pool is not None:
+        pool.close()
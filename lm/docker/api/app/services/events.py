@@ -0,0 +1,154 @@
+# /app/services/events.py
+import asyncio
+import json
+import os
+import time
+import uuid
+from collections import deque
+from typing import Callable
+
+SSE_REPLAY_SIZE = int(os.getenv("SSE_REPLAY_SIZE", "2000"))  # events kept for Last-Event-ID resume
+
+
+# --- SSE EVENT BROKER ---
+class EventBroker:
+    """
+    asyncio-native SSE fan-out.
+
+    publish() can be called from any thread (request handlers, queue workers, the Rundeck
+    watcher). Each event is serialized to an SSE frame once, handed to the event loop, and
+    the same bytes are pushed to every subscriber's asyncio.Queue - no per-client threads.
+
+    Every event gets an id and is kept in a bounded replay buffer, so a reconnecting
+    EventSource (Last-Event-ID) receives what it missed. Replay goes by buffer position.
+
+    With a relay installed (services.event_bus) publish() hands events to Postgres NOTIFY
+    instead, and every process delivers them locally through deliver() with the global
+    sequence ids. Without one, ids are local and start from the boot time in microseconds,
+    so they keep increasing across restarts.
+    """
+
+    def __init__(self, max_queue: int = 200, replay_size: int = SSE_REPLAY_SIZE):
+        self._max_queue = max_queue
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._clients: dict[str, asyncio.Queue] = {}
+        self._last_id = time.time_ns() // 1000
+        self._ring: deque = deque(maxlen=max(1, replay_size))  # (event_id, frame)
+        self._relay: Callable[[str, list[dict]], None] | None = None
+
+    def set_relay(self, relay: Callable[[str, list[dict]], None] | None) -> None:
+        self._relay = relay
+
+    def bind_loop(self, loop: asyncio.AbstractEventLoop) -> None:
+        self._loop = loop
+
+    def subscribe(self, last_event_id: str | None = None) -> tuple[str, asyncio.Queue, list[bytes]]:
+        """
+        Must be called on the event loop (from an async handler).
+        Returns (client_id, queue, backlog) where backlog holds the frames published after
+        last_event_id, or a single "resync" frame when that id is no longer in the buffer.
+        """
+        if self._loop is None:
+            self._loop = asyncio.get_running_loop()
+        client_id = str(uuid.uuid4())
+        q: asyncio.Queue = asyncio.Queue(maxsize=self._max_queue)
+        self._clients[client_id] = q
+        return client_id, q, self._replay(last_event_id)
+
+    def unsubscribe(self, client_id: str) -> None:
+        self._clients.pop(client_id, None)
+
+    def publish(self, event: str, data: dict) -> None:
+        self.publish_many(event, [data])
+
+    def publish_many(self, event: str, items: list[dict]) -> None:
+        if self._relay is not None:
+            if items:
+                self._relay(event, items)
+            return
+
+        loop = self._loop
+        if loop is None or loop.is_closed() or not items:
+            # No event loop in this process (e.g. worker.py) -> nobody to deliver to
+            return
+
+        frames = [format_sse(event, data) for data in items]  # encode once for all clients
+
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+
+        if running is loop:
+            self._fanout(frames)
+        else:
+            loop.call_soon_threadsafe(self._fanout, frames)
+
+    def _fanout(self, frames: list[bytes]) -> None:
+        # Local mode: runs on the event loop only, so id assignment needs no lock
+        batch = []
+        for frame in frames:
+            batch.append((self._last_id + 1 + len(batch), frame))
+        self.deliver(batch)
+
+    def deliver(self, batch: list[tuple[int, bytes]]) -> None:
+        """Event loop only. batch = [(event_id, frame without id line)] in delivery order."""
+        stamped = []
+        for event_id, frame in batch:
+            framed = b"id: %d\n" % event_id + frame
+            self._ring.append((event_id, framed))
+            stamped.append(framed)
+            self._last_id = event_id
+        self._push(stamped)
+
+    def resync_all(self, reason: str) -> None:
+        """Event loop only. Events may have been lost (e.g. LISTEN reconnect): reset clients."""
+        self._ring.clear()
+        self._push([self._resync_frame(reason)])
+
+    def _push(self, frames: list[bytes]) -> None:
+        for q in list(self._clients.values()):
+            for frame in frames:
+                if q.full():
+                    # drop oldest so slow clients don't hold up everyone else
+                    try:
+                        q.get_nowait()
+                    except asyncio.QueueEmpty:
+                        pass
+                q.put_nowait(frame)
+
+    def _replay(self, last_event_id: str | None) -> list[bytes]:
+        if not last_event_id:
+            return []
+        try:
+            last = int(last_event_id)
+        except ValueError:
+            return [self._resync_frame("invalid Last-Event-ID")]
+
+        if last == self._last_id:
+            return []
+
+        # Sequence ids from several publishers are not strictly ordered, but every process
+        # receives the same notification order, so resume right after the client's last event.
+        ring = list(self._ring)
+        for pos in range(len(ring) - 1, -1, -1):
+            if ring[pos][0] == last:
+                return [frame for _, frame in ring[pos + 1:]]
+        return [self._resync_frame("gap outside replay buffer")]
+
+    def _resync_frame(self, reason: str) -> bytes:
+        # Carries the current head id so the browser resumes from here after reloading state
+        return b"id: %d\n" % self._last_id + format_sse("resync", {"reason": reason})
+
+    def client_count(self) -> int:
+        return len(self._clients)
+
+
+BROKER = EventBroker()
+
+def format_sse(event: str, data: dict) -> bytes:
+    return sse_frame(event, json.dumps(data, default=str))
+
+def sse_frame(event: str, payload: str) -> bytes:
+    # SSE format: "event: <name>\ndata: <json>\n\n"
+    return f"event: {event}\ndata: {payload}\n\n".encode("utf-8")
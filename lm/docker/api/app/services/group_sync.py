@@ -0,0 +1,292 @@
+# /app/services/group_sync.py
+import csv
+import io
+import json
+import os
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from services.le_client import LeClient
+from services.sync_engine import SyncEngine, SyncRun
+
+# LE launcher group sync (replaces the "LE Launcher Groups Sync (Registered Only)" n8n workflow).
+#
+# Every GROUP_SYNC_INTERVAL seconds: read all of /publicApi/v7/launcher-groups (with members),
+# GROUP_SYNC_PARALLEL pages at a time and without a page cap, stage the groups and their
+# registered members with COPY and merge them set-based:
+# - launcher_groups rows are written only when new or when last_modified / member_count /
+#   the registered member list changed,
+# - launcher_group_members gets only the added / removed (group, launcher) pairs,
+# - a group missing from LE in two consecutive cycles is deleted (with its members).
+# Statements with nothing to do are not run at all, so an unchanged cycle writes nothing
+# (no collection version bump, no inventory notification).
+
+GROUP_SYNC_ENABLED = os.getenv("GROUP_SYNC_ENABLED", "true").lower() == "true"
+GROUP_SYNC_INTERVAL = float(os.getenv("GROUP_SYNC_INTERVAL", "60"))  # seconds
+GROUP_SYNC_PAGE_SIZE = int(os.getenv("GROUP_SYNC_PAGE_SIZE", "100"))
+GROUP_SYNC_PARALLEL = int(os.getenv("GROUP_SYNC_PARALLEL", "4"))     # concurrent page requests
+
+_FETCH = ThreadPoolExecutor(max_workers=max(1, GROUP_SYNC_PARALLEL), thread_name_prefix="group-sync")
+
+_GROUP_COLUMNS = ("id", "name", "type", "filter", "description", "member_count", "members", "created", "last_modified")
+
+
+def fetch_groups(client: LeClient) -> tuple[list[dict], int]:
+    """All LE groups (deduplicated by id, LE order) and the number of pages read."""
+    size = max(1, GROUP_SYNC_PAGE_SIZE)
+    first = client.launcher_groups(0, size, total=True)
+    pages = [first.get("items") or []]
+    offset = size
+
+    total = first.get("totalCount")
+    if len(pages[0]) == size and isinstance(total, int) and total > size:
+        # Known size: request every remaining page at once (bounded by the pool)
+        offsets = list(range(size, total, size))
+        pages.extend(_fetch_pages(client, offsets, size))
+        offset = size * (1 + len(offsets))
+
+    # No totalCount (or groups were added meanwhile): read ahead in waves until a short page
+    while len(pages[-1]) == size:
+        offsets = [offset + i * size for i in range(max(1, GROUP_SYNC_PARALLEL))]
+        for items in _fetch_pages(client, offsets, size):
+            pages.append(items)
+            if len(items) < size:
+                break
+        offset += size * len(offsets)
+
+    groups: dict[str, dict] = {}
+    for page in pages:
+        new = 0
+        for g in page:
+            gid = (g.get("id") or g.get("groupId")) if isinstance(g, dict) else None
+            if gid is not None and str(gid) not in groups:
+                groups[str(gid)] = g
+                new += 1
+        if len(page) == size and not new:
+            # a full page of groups already seen: the API is not honouring offset
+            raise RuntimeError("LE returned the same launcher groups for different offsets")
+    return list(groups.values()), len(pages)
+
+
+def _fetch_pages(client: LeClient, offsets: list[int], size: int) -> list[list[dict]]:
+    return list(_FETCH.map(lambda o: client.launcher_groups(o, size).get("items") or [], offsets))
+
+
+def _group_row(g: dict, registered: set[str]) -> tuple[tuple, list[str]] | None:
+    """LE group -> (launcher_groups stage row, registered member names), None for an invalid id."""
+    try:
+        gid = str(uuid.UUID(str(g.get("id") or g.get("groupId"))))
+    except ValueError:
+        return None
+
+    members, seen = [], set()
+    for m in g.get("members") or []:
+        name = (m.get("machineName") or m.get("machine_name")) if isinstance(m, dict) else None
+        # exact (case-sensitive) match against registered launchers, as before
+        if name in registered and name not in seen:
+            seen.add(name)
+            members.append(name)
+
+    count = g.get("memberCount")
+    row = (
+        gid,
+        g.get("name") or "",
+        g.get("type") or None,
+        g.get("filter") or None,
+        g.get("description") or None,
+        count if isinstance(count, int) and not isinstance(count, bool) else None,
+        json.dumps(members),
+        g.get("created") or None,
+        g.get("lastModified") or None,
+    )
+    return row, members
+
+
+def _copy(cur, table: str, rows, options: str = "") -> None:
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerows(rows)
+    buf.seek(0)
+    cur.copy_expert(f"COPY {table} FROM STDIN WITH (FORMAT csv{options})", buf)
+
+
+class GroupSync(SyncEngine):
+    name = "group-sync"
+    source = "le-groups"
+    lock = 0x6C6D_0003
+    interval = GROUP_SYNC_INTERVAL
+    enabled = GROUP_SYNC_ENABLED
+
+    def __init__(self):
+        super().__init__()
+        self._missing: set[str] = set()  # groups absent from LE in the previous cycle
+        self._totals.update({"inserted": 0, "updated": 0, "members_added": 0, "members_removed": 0, "deleted": 0})
+
+    def can_run(self) -> bool:
+        if not os.getenv("LE_FQDN"):
+            print("[group-sync] LE_FQDN is not set; launcher group sync disabled")
+            return False
+        return True
+
+    def _sync(self, cur, run: SyncRun) -> tuple[dict, list]:
+        with run.phase("fetch"):
+            client = run.client = LeClient()
+            groups, pages = fetch_groups(client)
+
+        with run.phase("diff"):
+            counts, plan = self._stage(cur, groups)
+            counts["pages"] = pages
+        with run.phase("write"):
+            self._merge(cur, plan, counts)
+        counts["rows_changed"] = sum(counts[k] for k in ("inserted", "updated", "members_added", "members_removed", "deleted"))
+        return counts, []
+
+    def _stage(self, cur, groups: list[dict]) -> tuple[dict, dict]:
+        """COPY the LE groups / registered members into temp tables and work out what changed."""
+        cur.execute("SELECT machine_name FROM launchers")
+        registered = {r[0] for r in cur.fetchall()}
+
+        group_rows, member_rows = [], []
+        for g in groups:
+            parsed = _group_row(g, registered)
+            if parsed is None:
+                continue
+            row, members = parsed
+            group_rows.append(row)
+            member_rows.extend((row[0], name) for name in members)
+
+        cur.execute(
+            """
+            CREATE TEMP TABLE group_sync_stage (
+                id            UUID PRIMARY KEY,
+                name          TEXT NOT NULL,
+                type          TEXT,
+                filter        TEXT,
+                description   TEXT,
+                member_count  INTEGER,
+                members       JSONB NOT NULL,
+                created       TIMESTAMPTZ,
+                last_modified TIMESTAMPTZ
+            ) ON COMMIT DROP;
+            CREATE TEMP TABLE group_sync_members (
+                group_id     UUID NOT NULL,
+                machine_name TEXT NOT NULL
+            ) ON COMMIT DROP;
+            """
+        )
+        _copy(cur, "group_sync_stage", group_rows, ", FORCE_NOT_NULL (name)")
+        _copy(cur, "group_sync_members", member_rows)
+        cur.execute("ANALYZE group_sync_stage; ANALYZE group_sync_members")
+
+        counts = {
+            "groups": len(group_rows),
+            "ignored": len(groups) - len(group_rows),
+            "members": len(member_rows),
+            "inserted": 0,
+            "updated": 0,
+            "members_added": 0,
+            "members_removed": 0,
+            "deleted": 0,
+        }
+
+        # Groups: new or changed only (last_modified is bumped by LE on every edit)
+        cur.execute(
+            """
+            CREATE TEMP TABLE group_sync_changed ON COMMIT DROP AS
+            SELECT s.*
+            FROM group_sync_stage s
+            LEFT JOIN launcher_groups g ON g.id = s.id
+            WHERE g.id IS NULL
+               OR g.last_modified IS DISTINCT FROM s.last_modified
+               OR g.member_count IS DISTINCT FROM s.member_count
+               OR g.members IS DISTINCT FROM s.members
+            """
+        )
+        plan = {"changed": cur.rowcount}
+
+        # Members: only the pairs that appeared / disappeared
+        cur.execute(
+            """
+            CREATE TEMP TABLE group_sync_member_diff ON COMMIT DROP AS
+            SELECT m.group_id, m.machine_name, TRUE AS added
+            FROM group_sync_members m
+            WHERE NOT EXISTS (
+                SELECT 1 FROM launcher_group_members gm
+                WHERE gm.group_id = m.group_id AND gm.machine_name = m.machine_name
+            )
+            UNION ALL
+            SELECT gm.group_id, gm.machine_name, FALSE
+            FROM launcher_group_members gm
+            JOIN group_sync_stage s ON s.id = gm.group_id
+            WHERE NOT EXISTS (
+                SELECT 1 FROM group_sync_members m
+                WHERE m.group_id = gm.group_id AND m.machine_name = gm.machine_name
+            )
+            """
+        )
+        cur.execute("SELECT count(*) FILTER (WHERE added), count(*) FILTER (WHERE NOT added) FROM group_sync_member_diff")
+        plan["add"], plan["remove"] = cur.fetchone()
+
+        # Groups gone from LE: deleted once they are missing twice in a row (offset paging can
+        # skip a row when groups are deleted mid-read). An empty LE answer deletes nothing.
+        cur.execute("SELECT id::text FROM launcher_groups g WHERE NOT EXISTS (SELECT 1 FROM group_sync_stage s WHERE s.id = g.id)")
+        missing = {r[0] for r in cur.fetchall()} if group_rows else set()
+        plan["gone"] = sorted(missing & self._missing)
+        self._missing = missing - set(plan["gone"])
+        return counts, plan
+
+    def _merge(self, cur, plan: dict, counts: dict) -> None:
+        """Apply the staged changes; statements with nothing to do are not run."""
+        if plan["changed"]:
+            cols = ", ".join(_GROUP_COLUMNS)
+            cur.execute(
+                f"""
+                INSERT INTO launcher_groups ({cols}, last_synced_at)
+                SELECT {cols}, now() FROM group_sync_changed
+                ORDER BY id
+                ON CONFLICT (id) DO UPDATE SET
+                    name = EXCLUDED.name,
+                    type = EXCLUDED.type,
+                    filter = EXCLUDED.filter,
+                    description = EXCLUDED.description,
+                    member_count = EXCLUDED.member_count,
+                    members = EXCLUDED.members,
+                    created = EXCLUDED.created,
+                    last_modified = EXCLUDED.last_modified,
+                    last_synced_at = EXCLUDED.last_synced_at
+                RETURNING (xmax = 0)
+                """
+            )
+            inserted = sum(1 for r in cur.fetchall() if r[0])
+            counts["inserted"] = inserted
+            counts["updated"] = cur.rowcount - inserted
+
+        if plan["remove"]:
+            cur.execute(
+                """
+                DELETE FROM launcher_group_members gm
+                USING group_sync_member_diff d
+                WHERE NOT d.added AND gm.group_id = d.group_id AND gm.machine_name = d.machine_name
+                """
+            )
+            counts["members_removed"] = cur.rowcount
+        if plan["add"]:
+            cur.execute(
+                """
+                INSERT INTO launcher_group_members (group_id, machine_name)
+                SELECT d.group_id, d.machine_name
+                FROM group_sync_member_diff d
+                JOIN launchers l ON l.machine_name = d.machine_name
+                WHERE d.added
+                ORDER BY d.group_id, d.machine_name
+                ON CONFLICT (group_id, machine_name) DO NOTHING
+                """
+            )
+            counts["members_added"] = cur.rowcount
+
+        if plan["gone"]:
+            cur.execute("DELETE FROM launcher_groups WHERE id = ANY(%s::uuid[])", (plan["gone"],))
+            counts["deleted"] = cur.rowcount
+
+
+GROUP_SYNC = GroupSync()
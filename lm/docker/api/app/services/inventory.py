@@ -0,0 +1,378 @@
+# /app/services/inventory.py
+import bisect
+import json
+import os
+import threading
+import time
+import uuid
+
+from psycopg2.extras import RealDictCursor
+
+from services.db_pool import get_pool
+from services.pg_listen import LISTENER
+
+# In-process launcher inventory.
+#
+# Launchers live in fixed-layout tuples ("slots") with secondary indexes (slot sets) by group,
+# policy, credential, online and commissioned. The index is loaded once at startup and then kept
+# fresh from the lm_inventory NOTIFY channel (statement triggers on launchers, launcher_groups and
+# launcher_group_members): notifications only carry keys, a refresher thread re-reads those rows.
+# The API's own launcher writes are also applied synchronously (refresh_launchers) before it replies.
+# Hot read paths use it when ready() and fall back to SQL otherwise.
+
+INVENTORY_CHANNEL = "lm_inventory"
+INVENTORY_ENABLED = os.getenv("INVENTORY_INDEX", "1") not in ("0", "false", "no")
+INVENTORY_FULL_RELOAD_KEYS = int(os.getenv("INVENTORY_FULL_RELOAD_KEYS", "2000"))  # above this, reload everything
+INVENTORY_LOAD_TIMEOUT = float(os.getenv("INVENTORY_LOAD_TIMEOUT", "30"))  # startup wait for the first load
+
+# Column layout of a launcher slot (also the /api/launchers row shape)
+LAUNCHER_FIELDS = (
+    "machine_name", "ip_address", "online", "commissioned", "source", "managed_policy_id",
+    "ssh_host", "ssh_port", "credential_id", "properties", "first_seen", "autologon_enabled",
+    "secure_launcher_enabled", "sessions", "current_version",
+)
+_F = {name: i for i, name in enumerate(LAUNCHER_FIELDS)}
+
+GROUP_FIELDS = ("id", "name", "type", "member_count", "description", "last_synced_at")
+
+# launchers_full = launchers + launcher_telemetry (online, sessions, current_version)
+_LAUNCHER_SQL = "SELECT " + ", ".join(LAUNCHER_FIELDS) + " FROM launchers_full"
+_GROUP_SQL = "SELECT " + ", ".join(GROUP_FIELDS) + " FROM launcher_groups"
+
+
+class InventoryIndex:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._slots: list[tuple | None] = []
+        self._free: list[int] = []
+        self._slot_of: dict[str, int] = {}
+        self._names: list[str] = []  # sorted machine_names
+
+        self._by_group: dict[str, set[int]] = {}
+        self._by_policy: dict[int, set[int]] = {}
+        self._by_credential: dict[int, set[int]] = {}
+        self._online: set[int] = set()
+        self._commissioned: set[int] = set()
+        self._groups: dict[str, dict] = {}
+
+        self._ready = False
+        self._loaded = threading.Event()
+        self._loaded_at: float | None = None
+        self._version = 0
+        self._instance = uuid.uuid4().hex[:12]  # ETags from different processes/boots never collide
+
+        # pending change keys from notifications, applied by the refresher thread
+        self._pending: dict[str, set[str] | None] = {}
+        self._wake = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._full_reloads = 0
+        self._partial_refreshes = 0
+
+    # --- lifecycle ---
+
+    def start(self, timeout: float = INVENTORY_LOAD_TIMEOUT) -> bool:
+        """
+        Subscribe to change notifications; the full load runs once LISTEN is active so no change
+        can slip in between. Blocks up to timeout for that first load (call from a worker thread).
+        """
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._refresh_loop, name="inventory-refresh", daemon=True)
+            self._thread.start()
+        LISTENER.add(INVENTORY_CHANNEL, self._on_notify, self._on_connect)
+        LISTENER.start()
+        return self._loaded.wait(timeout)
+
+    def ready(self) -> bool:
+        return self._ready
+
+    def reload(self) -> None:
+        with get_pool().connection() as c, c.cursor(cursor_factory=RealDictCursor) as cur:
+            cur.execute(_LAUNCHER_SQL)
+            launchers = cur.fetchall()
+            cur.execute(_GROUP_SQL)
+            groups = cur.fetchall()
+            cur.execute("SELECT group_id::text AS group_id, machine_name FROM launcher_group_members")
+            members = cur.fetchall()
+
+        with self._lock:
+            self._slots, self._free, self._slot_of, self._names = [], [], {}, []
+            self._by_group, self._by_policy, self._by_credential = {}, {}, {}
+            self._online, self._commissioned = set(), set()
+            for r in launchers:
+                self._put(r, keep_sorted=False)
+            self._names = sorted(self._slot_of)
+            self._groups = {str(g["id"]): g for g in groups}
+            for m in members:
+                slot = self._slot_of.get(m["machine_name"])
+                if slot is not None:
+                    self._by_group.setdefault(m["group_id"], set()).add(slot)
+            self._ready = True
+            self._loaded.set()
+            self._loaded_at = time.time()
+            self._version += 1
+            self._full_reloads += 1
+
+    # --- slot maintenance (caller holds the lock) ---
+
+    def _put(self, row: dict, keep_sorted: bool = True) -> None:
+        name = row["machine_name"]
+        rec = tuple(row.get(f) for f in LAUNCHER_FIELDS)
+        slot = self._slot_of.get(name)
+        if slot is not None:
+            self._unindex(slot, keep_groups=True)
+        else:
+            if self._free:
+                slot = self._free.pop()
+            else:
+                slot = len(self._slots)
+                self._slots.append(None)
+            if keep_sorted:
+                bisect.insort(self._names, name)
+        self._slots[slot] = rec
+        self._slot_of[name] = slot
+
+        if rec[_F["managed_policy_id"]] is not None:
+            self._by_policy.setdefault(rec[_F["managed_policy_id"]], set()).add(slot)
+        if rec[_F["credential_id"]] is not None:
+            self._by_credential.setdefault(rec[_F["credential_id"]], set()).add(slot)
+        if rec[_F["online"]]:
+            self._online.add(slot)
+        if rec[_F["commissioned"]]:
+            self._commissioned.add(slot)
+
+    def _unindex(self, slot: int, keep_groups: bool) -> None:
+        rec = self._slots[slot]
+        for index, key in ((self._by_policy, rec[_F["managed_policy_id"]]),
+                           (self._by_credential, rec[_F["credential_id"]])):
+            members = index.get(key)
+            if members is not None:
+                members.discard(slot)
+                if not members:
+                    index.pop(key, None)
+        self._online.discard(slot)
+        self._commissioned.discard(slot)
+        if not keep_groups:
+            for members in self._by_group.values():
+                members.discard(slot)
+
+    def _drop(self, name: str) -> None:
+        slot = self._slot_of.pop(name, None)
+        if slot is None:
+            return
+        self._unindex(slot, keep_groups=False)
+        self._slots[slot] = None
+        self._free.append(slot)
+        i = bisect.bisect_left(self._names, name)
+        if i < len(self._names) and self._names[i] == name:
+            del self._names[i]
+
+    # --- change notifications ---
+
+    def _on_notify(self, conn, payloads: list[str]) -> None:
+        with self._lock:
+            for payload in payloads:
+                try:
+                    msg = json.loads(payload)
+                except ValueError:
+                    continue
+                table, keys = msg.get("table"), msg.get("keys")
+                if keys is None:
+                    self._pending[table] = None
+                elif table not in self._pending:
+                    self._pending[table] = set(keys)
+                elif self._pending[table] is not None:
+                    self._pending[table].update(keys)
+        self._wake.set()
+
+    def _on_connect(self) -> None:
+        # (re)listening: anything before this point may have been missed -> full reload
+        with self._lock:
+            self._pending["*"] = None
+        self._wake.set()
+
+    def _refresh_loop(self) -> None:
+        while True:
+            self._wake.wait()
+            self._wake.clear()
+            with self._lock:
+                pending, self._pending = self._pending, {}
+            if not pending:
+                continue
+            try:
+                self._apply(pending)
+            except Exception as e:
+                # Serve from SQL until a full reload succeeds
+                print(f"[inventory] refresh failed, retrying with a full reload: {e}")
+                with self._lock:
+                    self._ready = False
+                    self._pending["*"] = None
+                time.sleep(5)
+                self._wake.set()
+
+    def refresh_launchers(self, names: list[str] | None) -> None:
+        """
+        Re-read launchers this process just wrote (None = everything) instead of waiting for
+        their notification. On failure the refresher thread picks them up.
+        """
+        if names is not None and not names:
+            return
+        try:
+            self._apply({"launchers": None if names is None else set(names)})
+        except Exception as e:
+            print(f"[inventory] refresh after local write failed, deferring: {e}")
+            with self._lock:
+                if names is None or self._pending.get("launchers", set()) is None:
+                    self._pending["launchers"] = None
+                else:
+                    self._pending.setdefault("launchers", set()).update(names)
+            self._wake.set()
+
+    def _apply(self, pending: dict) -> None:
+        if "*" in pending or any(
+            keys is None or len(keys) > INVENTORY_FULL_RELOAD_KEYS for keys in pending.values()
+        ):
+            self.reload()
+            return
+
+        names = list(pending.get("launchers") or ())
+        group_ids = list(pending.get("launcher_groups") or ())
+        member_group_ids = list(pending.get("launcher_group_members") or ())
+
+        with get_pool().connection() as c, c.cursor(cursor_factory=RealDictCursor) as cur:
+            launchers = groups = members = []
+            if names:
+                cur.execute(_LAUNCHER_SQL + " WHERE machine_name = ANY(%s)", (names,))
+                launchers = cur.fetchall()
+            if group_ids:
+                cur.execute(_GROUP_SQL + " WHERE id = ANY(%s::uuid[])", (group_ids,))
+                groups = cur.fetchall()
+            if member_group_ids:
+                cur.execute(
+                    """
+                    SELECT group_id::text AS group_id, machine_name
+                    FROM launcher_group_members
+                    WHERE group_id = ANY(%s::uuid[])
+                    """,
+                    (member_group_ids,),
+                )
+                members = cur.fetchall()
+
+        with self._lock:
+            found = set()
+            for r in launchers:
+                self._put(r)
+                found.add(r["machine_name"])
+            for name in names:
+                if name not in found:
+                    self._drop(name)
+
+            for gid in group_ids:
+                self._groups.pop(gid, None)
+            for g in groups:
+                self._groups[str(g["id"])] = g
+
+            for gid in member_group_ids:
+                self._by_group.pop(gid, None)
+            for m in members:
+                slot = self._slot_of.get(m["machine_name"])
+                if slot is not None:
+                    self._by_group.setdefault(m["group_id"], set()).add(slot)
+
+            self._version += 1
+            self._partial_refreshes += 1
+
+    # --- reads ---
+
+    def _row(self, slot: int) -> dict:
+        return dict(zip(LAUNCHER_FIELDS, self._slots[slot]))
+
+    def list_launchers(self) -> list[dict]:
+        with self._lock:
+            return [self._row(self._slot_of[name]) for name in self._names]
+
+    def query(self, filters: dict, after: str | None, limit: int, fields: tuple) -> tuple[list[tuple], str | None]:
+        """
+        Keyset page ordered by machine_name: (rows as tuples in `fields` order, next cursor).
+        filters: online / commissioned (bool), policy / credential (int), group (uuid str),
+        source (str), prefix (str); None values are ignored.
+        """
+        with self._lock:
+            # narrow with the secondary indexes first
+            candidates: set[int] | None = None
+            for key, index in (("policy", self._by_policy), ("credential", self._by_credential),
+                               ("group", self._by_group)):
+                if filters.get(key) is not None:
+                    found = index.get(filters[key]) or set()
+                    candidates = found if candidates is None else candidates & found
+            for key, flagged in (("online", self._online), ("commissioned", self._commissioned)):
+                want = filters.get(key)
+                if want is True:
+                    candidates = flagged if candidates is None else candidates & flagged
+                elif want is False:
+                    candidates = (set(self._slot_of.values()) - flagged) if candidates is None else candidates - flagged
+
+            prefix = filters.get("prefix") or ""
+            start = after if after is not None and after >= prefix else prefix
+            if candidates is not None and len(candidates) * 8 < len(self._names):
+                names = sorted(self._slots[s][0] for s in candidates)
+            else:
+                names = self._names
+            i = bisect.bisect_right(names, start) if start == after else bisect.bisect_left(names, start)
+
+            source = filters.get("source")
+            idx = [_F[f] for f in fields]
+            rows: list[tuple] = []
+            last = None
+            for j in range(i, len(names)):
+                name = names[j]
+                if prefix and not name.startswith(prefix):
+                    break
+                slot = self._slot_of[name]
+                if candidates is not None and slot not in candidates:
+                    continue
+                rec = self._slots[slot]
+                if source is not None and rec[_F["source"]] != source:
+                    continue
+                if len(rows) == limit:
+                    return rows, last
+                rows.append(tuple(rec[k] for k in idx))
+                last = name
+            return rows, None
+
+    def etag(self) -> str:
+        """Strong ETag of the current index content. Read it before the data it validates."""
+        with self._lock:
+            return f'"inv-{self._instance}-{self._version}"'
+
+    def get_group(self, group_id: str) -> dict | None:
+        with self._lock:
+            g = self._groups.get(group_id)
+            return dict(g) if g is not None else None
+
+    def group_members(self, group_id: str, fields: tuple | None = None) -> list[dict]:
+        with self._lock:
+            slots = self._by_group.get(group_id) or ()
+            rows = sorted((self._slots[s] for s in slots), key=lambda rec: rec[0])
+            if fields is None:
+                return [dict(zip(LAUNCHER_FIELDS, rec)) for rec in rows]
+            return [{f: rec[_F[f]] for f in fields} for rec in rows]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "ready": self._ready,
+                "launchers": len(self._slot_of),
+                "slots": len(self._slots),
+                "groups": len(self._groups),
+                "online": len(self._online),
+                "commissioned": len(self._commissioned),
+                "policies": len(self._by_policy),
+                "credentials": len(self._by_credential),
+                "version": self._version,
+                "loaded_at": self._loaded_at,
+                "full_reloads": self._full_reloads,
+                "partial_refreshes": self._partial_refreshes,
+            }
+
+
+INVENTORY = InventoryIndex()
@@ -0,0 +1,237 @@
+# /app/services/launcher_sync.py
+import hashlib
+import json
+import os
+from datetime import datetime, timezone
+
+from services.le_client import LeClient
+from services.sync_engine import SyncEngine, SyncRun
+
+# LE launcher state sync (replaces the "Launcher State Refresh (Registered Only)" n8n workflow).
+#
+# Every LAUNCHER_SYNC_INTERVAL seconds: fetch /publicApi/v7/launchers, normalize each
+# registered launcher the way the workflow did and hash the result, separately for the
+# launcher_telemetry columns (online, sessions, versions, last_state_change) and the
+# launchers columns (first_seen, properties, groups). Only rows whose state_hash differs are
+# written, one UPDATE ... FROM unnest(...) per table, so a launcher whose sessions changed
+# only rewrites its narrow telemetry row. A launcher that went online/offline or changed its
+# state property gets a launcher_state event. Unchanged rows are not touched
+# (last_synced_at = last time the sync changed the telemetry row; the sync_runs row of each
+# cycle records when LE was last read).
+#
+# Any process may run this (every API worker); see services/sync_engine.py.
+
+LAUNCHER_SYNC_ENABLED = os.getenv("LAUNCHER_SYNC_ENABLED", "true").lower() == "true"
+LAUNCHER_SYNC_INTERVAL = float(os.getenv("LAUNCHER_SYNC_INTERVAL", "60"))  # seconds
+
+_TELEMETRY_SQL = """
+WITH u AS (
+    SELECT *
+    FROM unnest(
+        %s::text[], %s::boolean[], %s::integer[], %s::boolean[], %s::boolean[],
+        %s::timestamptz[], %s::text[]
+    ) AS u(machine_name, online, sessions, supported_version, current_version,
+           last_state_change, state_hash)
+),
+old AS (
+    SELECT t.machine_name, t.online
+    FROM launcher_telemetry t
+    JOIN u ON u.machine_name = t.machine_name
+    WHERE t.state_hash IS DISTINCT FROM u.state_hash
+    FOR UPDATE OF t
+)
+UPDATE launcher_telemetry t
+SET online            = u.online,
+    sessions          = u.sessions,
+    supported_version = u.supported_version,
+    current_version   = u.current_version,
+    last_state_change = u.last_state_change,
+    state_hash        = u.state_hash,
+    last_synced_at    = now()
+FROM u
+JOIN old ON old.machine_name = u.machine_name
+WHERE t.machine_name = u.machine_name
+RETURNING t.machine_name, old.online IS DISTINCT FROM t.online, t.online
+"""
+
+_INVENTORY_SQL = """
+WITH u AS (
+    SELECT *
+    FROM unnest(%s::text[], %s::timestamptz[], %s::jsonb[], %s::jsonb[], %s::text[])
+        AS u(machine_name, first_seen, properties, groups, state_hash)
+),
+old AS (
+    SELECT l.machine_name, l.properties->>'state' AS state
+    FROM launchers l
+    JOIN u ON u.machine_name = l.machine_name
+    WHERE l.state_hash IS DISTINCT FROM u.state_hash
+    FOR UPDATE OF l
+)
+UPDATE launchers l
+SET first_seen = u.first_seen,
+    properties = u.properties,
+    groups     = u.groups,
+    state_hash = u.state_hash
+FROM u
+JOIN old ON old.machine_name = u.machine_name
+WHERE l.machine_name = u.machine_name
+RETURNING l.machine_name, old.state IS DISTINCT FROM l.properties->>'state', l.properties->>'state'
+"""
+
+# launcher_telemetry / launchers columns owned by the sync, hashed separately
+_TELEMETRY_FIELDS = ("online", "sessions", "supported_version", "current_version", "last_state_change")
+_INVENTORY_FIELDS = ("first_seen", "properties", "groups")
+
+
+def _timestamp(value) -> str | None:
+    # LE sends ISO strings; epoch milliseconds are accepted like the workflow's new Date() did
+    if value in (None, ""):
+        return None
+    if isinstance(value, (int, float)):
+        return datetime.fromtimestamp(value / 1000, tz=timezone.utc).isoformat()
+    return str(value)
+
+
+def _hash(row: dict, fields: tuple) -> str:
+    canonical = json.dumps([row[f] for f in fields], sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha1(canonical.encode("utf-8")).hexdigest()
+
+
+def normalize(item: dict) -> dict | None:
+    """
+    One LE launcher -> the columns the sync owns, plus telemetry_hash (launcher_telemetry
+    columns) and state_hash (launchers columns).
+    """
+    machine_name = item.get("machineName")
+    if not machine_name:
+        return None
+
+    props = {}
+    raw = item.get("properties")
+    if isinstance(raw, list):
+        for p in raw:
+            if isinstance(p, dict) and p.get("propertyId") and "value" in p:
+                props[p["propertyId"]] = p["value"]
+    elif isinstance(raw, dict):
+        props.update(raw)
+
+    groups = item.get("groups")
+    row = {
+        "machine_name": machine_name,
+        "online": item.get("online"),
+        "sessions": item.get("sessions"),
+        "supported_version": item.get("supportedVersion"),
+        "current_version": item.get("currentVersion"),
+        "first_seen": _timestamp(item.get("firstSeen")),
+        "last_state_change": _timestamp(item.get("lastStateChange")),
+        "properties": props,
+        "groups": {"items": groups if isinstance(groups, list) else []},
+    }
+    row["telemetry_hash"] = _hash(row, _TELEMETRY_FIELDS)
+    row["state_hash"] = _hash(row, _INVENTORY_FIELDS)
+    return row
+
+
+class LauncherSync(SyncEngine):
+    name = "launcher-sync"
+    source = "le-telemetry"  # same as the n8n workflow wrote
+    lock = 0x6C6D_0002
+    interval = LAUNCHER_SYNC_INTERVAL
+    enabled = LAUNCHER_SYNC_ENABLED
+
+    def __init__(self):
+        super().__init__()
+        self._totals.update({"updated": 0, "transitions": 0})
+
+    def can_run(self) -> bool:
+        if not os.getenv("LE_FQDN"):
+            print("[launcher-sync] LE_FQDN is not set; launcher state sync disabled")
+            return False
+        return True
+
+    def _sync(self, cur, run: SyncRun) -> tuple[dict, list]:
+        with run.phase("fetch"):
+            client = run.client = LeClient()
+            items = client.launchers()
+
+        with run.phase("diff"):
+            cur.execute(
+                """
+                SELECT l.machine_name, t.state_hash, l.state_hash, t.online, l.properties->>'state'
+                FROM launchers l
+                LEFT JOIN launcher_telemetry t ON t.machine_name = l.machine_name
+                """
+            )
+            current = {r[0]: r[1:] for r in cur.fetchall()}
+
+            hot: dict[str, dict] = {}
+            cold: dict[str, dict] = {}
+            seen: set[str] = set()
+            ignored = 0
+            for item in items:
+                row = normalize(item) if isinstance(item, dict) else None
+                if row is None or row["machine_name"] not in current:
+                    ignored += 1
+                    continue
+                name = row["machine_name"]
+                seen.add(name)
+                telemetry_hash, state_hash = current[name][:2]
+                if telemetry_hash != row["telemetry_hash"]:
+                    hot[name] = row
+                if state_hash != row["state_hash"]:
+                    cold[name] = row
+
+        telemetry, inventory = [], []
+        with run.phase("write"):
+            # launchers before launcher_telemetry (same lock order as other writers); sorted
+            # names for a stable row lock order
+            if cold:
+                rows = [cold[name] for name in sorted(cold)]
+                cur.execute(_INVENTORY_SQL, (
+                    [r["machine_name"] for r in rows],
+                    [r["first_seen"] for r in rows],
+                    [json.dumps(r["properties"], default=str) for r in rows],
+                    [json.dumps(r["groups"], default=str) for r in rows],
+                    [r["state_hash"] for r in rows],
+                ))
+                inventory = cur.fetchall()
+            if hot:
+                rows = [hot[name] for name in sorted(hot)]
+                cur.execute(_TELEMETRY_SQL, (
+                    [r["machine_name"] for r in rows],
+                    [r["online"] for r in rows],
+                    [r["sessions"] for r in rows],
+                    [r["supported_version"] for r in rows],
+                    [r["current_version"] for r in rows],
+                    [r["last_state_change"] for r in rows],
+                    [r["telemetry_hash"] for r in rows],
+                ))
+                telemetry = cur.fetchall()
+
+        # online (telemetry) or state property (launchers) transitions, with the values now stored
+        now = {name: [online, state] for name, (_, _, online, state) in current.items()}
+        moved = set()
+        for name, changed, online in telemetry:
+            now[name][0] = online
+            if changed:
+                moved.add(name)
+        for name, changed, state in inventory:
+            now[name][1] = state
+            if changed:
+                moved.add(name)
+        events = [{"machine_name": name, "state": now[name][1], "online": now[name][0]} for name in sorted(moved)]
+
+        counts = {
+            "checked": len(items),
+            "updated": len({r[0] for r in telemetry + inventory}),
+            "telemetry": len(telemetry),
+            "inventory": len(inventory),
+            "ignored": ignored,
+            "missing": len(current) - len(seen),  # registered launchers LE did not report
+            "transitions": len(events),
+            "rows_changed": len(telemetry) + len(inventory),
+        }
+        return counts, [("launcher_state", events)] if events else []
+
+
+SYNC = LauncherSync()
@@ -0,0 +1,72 @@
+# /app/services/le_client.py
+import os
+import threading
+
+import requests
+from fastapi import HTTPException
+
+from utils import get_secret
+
+# Shared keep-alive session for the LE public API (the sync engines poll it every few seconds)
+_SESSION = requests.Session()
+_SESSION.mount("https://", requests.adapters.HTTPAdapter(pool_maxsize=16))
+
+
+class LeClient:
+    def __init__(self):
+        self.fqdn = os.getenv("LE_FQDN") or ""
+        self.token = get_secret("LE_API_TOKEN") or ""
+        self.timeout = int(os.getenv("LE_TIMEOUT", "30"))
+        self.verify = os.getenv("LE_VERIFY_TLS", "false").lower() == "true"
+
+        # transfer counters (sync_runs instrumentation); requests may run on several threads
+        self.requests = 0
+        self.bytes = 0
+        self._lock = threading.Lock()
+
+        if not self.fqdn or not self.token:
+            raise HTTPException(status_code=500, detail="LE_FQDN or LE_API_TOKEN is not configured")
+
+    def _request(self, method: str, path: str, **kwargs):
+        url = f"https://{self.fqdn}/publicApi/v7{path}"
+        try:
+            r = _SESSION.request(
+                method,
+                url,
+                headers={"Authorization": f"Bearer {self.token}", "Accept": "application/json"},
+                timeout=self.timeout,
+                verify=self.verify,
+                **kwargs
+            )
+            with self._lock:
+                self.requests += 1
+                self.bytes += len(r.content)
+            r.raise_for_status()
+            if r.text:
+                return r.json()
+            return None
+        except requests.HTTPError as e:
+            detail = f"LE HTTP error: {getattr(e.response, 'text', str(e))}"
+            print(f"LE API Error: {detail}")
+            raise HTTPException(status_code=502, detail=detail)
+        except Exception as e:
+            print(f"LE Connection Error: {e}")
+            raise HTTPException(status_code=502, detail=f"LE request failed: {e}")
+
+    def launchers(self) -> list[dict]:
+        return (self._request("GET", "/launchers") or {}).get("items") or []
+
+    def launcher_groups(self, offset: int = 0, count: int = 100, total: bool = False) -> dict:
+        """One page of groups with their members, ordered by name. total=True asks for totalCount."""
+        return self._request(
+            "GET",
+            "/launcher-groups",
+            params={
+                "orderBy": "name",
+                "direction": "asc",
+                "count": count,
+                "offset": offset,
+                "include": "members",
+                "includeTotalCount": "true" if total else "false",
+            }
+        ) or {}
@@ -0,0 +1,159 @@
+# /app/services/rundeck_cache.py
+import json
+import threading
+import zlib
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from psycopg2.extras import Json
+
+from services.db_pool import get_pool
+from services.rundeck_client import RundeckClient
+from services.rundeck_jobs import ACTIVE_STATUSES
+
+# Local copy of finished Rundeck executions (table: rundeck_execution_cache).
+#
+# A finished execution never changes, so the first time LM sees one (detail read, output
+# tail completing) its detail and full log are stored, the log zlib-compressed. From then on
+# detail / output / raw log reads are answered from Postgres (and a small in-process LRU of
+# decompressed logs) without touching Rundeck, also while Rundeck is down.
+
+OUTPUT_FETCH_MAX_CALLS = 1000   # safety bound while paging a log out of Rundeck
+LOG_LRU_SIZE = 16
+
+_EXECUTOR = ThreadPoolExecutor(max_workers=2, thread_name_prefix="rundeck-cache")
+_PENDING: set[int] = set()
+_PENDING_LOCK = threading.Lock()
+
+_LOG_LRU: OrderedDict = OrderedDict()  # execution_id -> decompressed output dict
+_LOG_LRU_LOCK = threading.Lock()
+
+
+def is_finished(detail: dict | None) -> bool:
+    if not detail:
+        return False
+    status = (detail.get("status") or "").lower()
+    return bool(status) and status not in ACTIVE_STATUSES and bool(detail.get("date-ended"))
+
+
+# --- reads ---
+
+def cached_detail(execution_id: int) -> dict | None:
+    with get_pool().connection() as c, c.cursor() as cur:
+        cur.execute("SELECT detail FROM rundeck_execution_cache WHERE execution_id = %s", (execution_id,))
+        row = cur.fetchone()
+    return row[0] if row else None
+
+
+def cached_output(execution_id: int) -> dict | None:
+    """{"entries", "offset", "lastmod", "execState"} of a cached execution, or None."""
+    with _LOG_LRU_LOCK:
+        out = _LOG_LRU.get(execution_id)
+        if out is not None:
+            _LOG_LRU.move_to_end(execution_id)
+            return out
+
+    with get_pool().connection() as c, c.cursor() as cur:
+        cur.execute("SELECT output FROM rundeck_execution_cache WHERE execution_id = %s", (execution_id,))
+        row = cur.fetchone()
+    if not row or row[0] is None:
+        return None
+    out = json.loads(zlib.decompress(bytes(row[0])))
+
+    with _LOG_LRU_LOCK:
+        _LOG_LRU[execution_id] = out
+        while len(_LOG_LRU) > LOG_LRU_SIZE:
+            _LOG_LRU.popitem(last=False)
+    return out
+
+
+def log_text(output: dict) -> bytes:
+    return "".join((e.get("log") or "") + "\n" for e in output.get("entries") or []).encode("utf-8")
+
+
+def execution_output(client: RundeckClient | None, execution_id: int, offset: int = 0, lastmod: int = 0) -> dict:
+    """
+    Rundeck's /execution/{id}/output response, served locally for cached executions.
+    offset 0 gets the whole log and the final offset; a poller already at the end gets nothing
+    more. Any other offset (a client that started polling while the job was running) still
+    goes to Rundeck, since its offsets are log byte positions.
+    """
+    out = cached_output(execution_id)
+    if out is not None and offset in (0, out["offset"]):
+        return {
+            "id": execution_id,
+            "entries": out["entries"] if offset == 0 else [],
+            "offset": out["offset"],
+            "lastmod": out["lastmod"],
+            "completed": True,
+            "execCompleted": True,
+            "execState": out.get("execState"),
+            "cached": True,
+        }
+    return (client or RundeckClient()).execution_output(execution_id, offset=offset, lastmod=lastmod)
+
+
+# --- filling the cache ---
+
+def remember(execution_id: int, detail: dict | None = None) -> None:
+    """Cache a finished execution in the background (no-op if running, cached or in progress)."""
+    if detail is not None and not is_finished(detail):
+        return
+    with _PENDING_LOCK:
+        if execution_id in _PENDING:
+            return
+        _PENDING.add(execution_id)
+    _EXECUTOR.submit(_store, execution_id, detail)
+
+
+def ensure(execution_id: int) -> dict | None:
+    """Cache a finished execution now (blocking) and return its output, or None if it is still running."""
+    _store(execution_id, None)
+    return cached_output(execution_id)
+
+
+def _store(execution_id: int, detail: dict | None) -> None:
+    try:
+        with get_pool().connection() as c, c.cursor() as cur:
+            cur.execute("SELECT 1 FROM rundeck_execution_cache WHERE execution_id = %s", (execution_id,))
+            if cur.fetchone():
+                return
+
+        client = RundeckClient()
+        if detail is None:
+            detail = client.execution_detail(execution_id)
+        if not is_finished(detail):
+            return
+
+        entries, offset, lastmod = [], 0, 0
+        for _ in range(OUTPUT_FETCH_MAX_CALLS):
+            data = client.execution_output(execution_id, offset=offset, lastmod=lastmod, compact=False) or {}
+            entries.extend(
+                {k: e.get(k) for k in ("log", "time", "level", "node", "stepctx") if e.get(k) is not None}
+                for e in data.get("entries") or []
+            )
+            offset = int(data.get("offset") or offset)
+            lastmod = int(data.get("lastmod") or lastmod)
+            if data.get("completed"):
+                break
+        else:
+            print(f"[rundeck-cache] {execution_id}: log did not complete, not caching")
+            return
+
+        output = {"entries": entries, "offset": offset, "lastmod": lastmod, "execState": detail.get("status")}
+        blob = zlib.compress(json.dumps(output, separators=(",", ":")).encode("utf-8"), 6)
+        with get_pool().connection() as c, c.cursor() as cur:
+            cur.execute(
+                """
+                INSERT INTO rundeck_execution_cache
+                    (execution_id, status, detail, output, output_lines, output_bytes)
+                VALUES (%s, %s, %s, %s, %s, %s)
+                ON CONFLICT (execution_id) DO NOTHING
+                """,
+                (execution_id, detail.get("status"), Json(detail), blob, len(entries), len(log_text(output))),
+            )
+    except Exception as e:
+        print(f"[rundeck-cache] caching execution {execution_id} failed: {getattr(e, 'detail', e)}")
+    finally:
+        with _PENDING_LOCK:
+            _PENDING.discard(execution_id)
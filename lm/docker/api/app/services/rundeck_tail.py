@@ -0,0 +1,217 @@
+# /app/services/rundeck_tail.py
+import asyncio
+import json
+import os
+import threading
+import time
+import uuid
+from collections import deque
+
+from services import rundeck_cache
+from services.events import sse_frame
+from services.rundeck_client import RundeckClient
+
+# One Rundeck log tail per execution, shared by every viewer (SSE:
+# /api/rundeck/executions/{id}/output/stream).
+#
+# A tail thread polls /execution/{id}/output with offset/lastmod, keeps the last
+# RUNDECK_TAIL_MAX_LINES entries in memory and pushes new entries to subscribers. A viewer
+# that joins late gets the buffer at once; a reconnecting EventSource (Last-Event-ID = line
+# number) gets only what it missed. Tails stop polling when the log is complete and are
+# dropped RUNDECK_TAIL_LINGER seconds after the last viewer left.
+
+RUNDECK_TAIL_INTERVAL = float(os.getenv("RUNDECK_TAIL_INTERVAL", "1.5"))  # seconds between output polls
+RUNDECK_TAIL_MAX_LINES = int(os.getenv("RUNDECK_TAIL_MAX_LINES", "5000"))
+RUNDECK_TAIL_LINGER = float(os.getenv("RUNDECK_TAIL_LINGER", "60"))       # keep a viewerless tail this long
+RUNDECK_TAIL_MAX_ERRORS = 5
+TAIL_FRAME_LINES = 500      # entries per SSE frame
+TAIL_QUEUE_SIZE = 500       # frames; a client that falls further behind is disconnected and resumes
+
+
+class ExecutionTail:
+    def __init__(self, execution_id: int, loop: asyncio.AbstractEventLoop):
+        self.execution_id = execution_id
+        self._loop = loop
+        self._lock = threading.Lock()
+        self._lines: deque = deque(maxlen=max(1, RUNDECK_TAIL_MAX_LINES))  # (seq, entry)
+        self._seq = 0                      # number of entries seen so far (= id of the last one)
+        self._offset = 0
+        self._lastmod = 0
+        self._state: dict | None = None    # final {"completed", "execState", "error"} once done
+        self._subs: dict[str, list] = {}   # client_id -> [queue, last_seq, state_sent]; event loop only
+        self._idle_since = time.monotonic()
+        self.polls = 0
+
+    # --- event loop side ---
+
+    def subscribe(self, last_seq: int = 0) -> tuple[str, asyncio.Queue, list[bytes]]:
+        client_id = str(uuid.uuid4())
+        q: asyncio.Queue = asyncio.Queue(maxsize=TAIL_QUEUE_SIZE)
+        with self._lock:
+            lines = [item for item in self._lines if item[0] > last_seq]
+            truncated = bool(self._lines) and self._lines[0][0] > last_seq + 1
+            state = self._state
+            seq = self._seq
+        backlog = []
+        for i in range(0, len(lines), TAIL_FRAME_LINES):
+            backlog.append(_output_frame(lines[i:i + TAIL_FRAME_LINES], truncated and i == 0))
+        if state is not None:
+            backlog.append(_state_frame(seq, state))
+        self._subs[client_id] = [q, max(last_seq, seq), state is not None]
+        return client_id, q, backlog
+
+    def unsubscribe(self, client_id: str) -> None:
+        self._subs.pop(client_id, None)
+        if not self._subs:
+            self._idle_since = time.monotonic()
+
+    def viewers(self) -> int:
+        return len(self._subs)
+
+    def touch(self) -> None:
+        self._idle_since = time.monotonic()
+
+    def _push(self, frames: list[tuple[list, bytes]]) -> None:
+        """frames = [(output items, or [] for the state frame, encoded frame)]"""
+        for client_id, sub in list(self._subs.items()):
+            q = sub[0]
+            for items, frame in frames:
+                is_state = not items
+                if sub[2] or (items and items[-1][0] <= sub[1]):
+                    continue  # already part of this client's backlog
+                if items and items[0][0] <= sub[1]:
+                    # straddles what the client already has (resumed mid-frame): send the rest
+                    frame = _output_frame([item for item in items if item[0] > sub[1]], False)
+                seq = items[-1][0] if items else sub[1]
+                if q.full():
+                    # Too far behind: end the stream; EventSource resumes from its Last-Event-ID
+                    self._subs.pop(client_id, None)
+                    while not q.empty():
+                        q.get_nowait()
+                    q.put_nowait(None)
+                    break
+                q.put_nowait(frame)
+                sub[1] = max(sub[1], seq)
+                sub[2] = is_state
+
+    # --- tail thread ---
+
+    def done(self) -> bool:
+        return self._state is not None
+
+    def idle_for(self) -> float:
+        return 0.0 if self._subs else time.monotonic() - self._idle_since
+
+    def poll(self, client: RundeckClient) -> None:
+        data = rundeck_cache.execution_output(client, self.execution_id, self._offset, self._lastmod) or {}
+        self.polls += 1
+        entries = [
+            {"log": e.get("log") or "", "time": e.get("time"), "level": e.get("level")}
+            for e in (data.get("entries") or [])
+        ]
+        completed = bool(data.get("completed"))
+
+        frames = []
+        with self._lock:
+            batch = []
+            for entry in entries:
+                self._seq += 1
+                item = (self._seq, entry)
+                self._lines.append(item)
+                batch.append(item)
+            try:
+                self._offset = int(data.get("offset") or self._offset)
+                self._lastmod = int(data.get("lastmod") or self._lastmod)
+            except (TypeError, ValueError):
+                pass
+            if completed:
+                self._state = {"completed": True, "execState": data.get("execState")}
+            state, seq = self._state, self._seq
+
+        if completed and not data.get("cached"):
+            rundeck_cache.remember(self.execution_id)
+
+        for i in range(0, len(batch), TAIL_FRAME_LINES):
+            chunk = batch[i:i + TAIL_FRAME_LINES]
+            frames.append((chunk, _output_frame(chunk, False)))
+        if completed:
+            frames.append(([], _state_frame(seq, state)))
+        if frames:
+            self._call_on_loop(self._push, frames)
+
+    def fail(self, message: str) -> None:
+        with self._lock:
+            self._state = {"completed": False, "execState": None, "error": message}
+            state, seq = self._state, self._seq
+        self._call_on_loop(self._push, [([], _state_frame(seq, state))])
+
+    def _call_on_loop(self, fn, *args) -> None:
+        if not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(fn, *args)
+
+    def stats(self) -> dict:
+        return {
+            "viewers": len(self._subs),
+            "lines": self._seq,
+            "buffered": len(self._lines),
+            "polls": self.polls,
+            "done": self.done(),
+        }
+
+
+def _output_frame(items: list[tuple[int, dict]], truncated: bool) -> bytes:
+    payload = {"entries": [entry for _, entry in items]}
+    if truncated:
+        payload["truncated"] = True  # older lines fell out of the buffer
+    return b"id: %d\n" % items[-1][0] + sse_frame("output", json.dumps(payload, default=str))
+
+
+def _state_frame(seq: int, state: dict) -> bytes:
+    return b"id: %d\n" % seq + sse_frame("state", json.dumps(state, default=str))
+
+
+class TailRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tails: dict[int, ExecutionTail] = {}
+
+    def get(self, execution_id: int) -> ExecutionTail:
+        """Event loop only. Returns the shared tail, starting its poll thread on first use."""
+        with self._lock:
+            tail = self._tails.get(execution_id)
+            if tail is None:
+                tail = self._tails[execution_id] = ExecutionTail(execution_id, asyncio.get_running_loop())
+                threading.Thread(
+                    target=self._run, args=(tail,), name=f"rundeck-tail-{execution_id}", daemon=True,
+                ).start()
+            # the caller subscribes right away; until then this keeps the tail from being dropped
+            tail.touch()
+            return tail
+
+    def _run(self, tail: ExecutionTail) -> None:
+        errors = 0
+        client = None
+        while True:
+            if tail.idle_for() > RUNDECK_TAIL_LINGER:
+                with self._lock:
+                    if tail.idle_for() > RUNDECK_TAIL_LINGER:
+                        self._tails.pop(tail.execution_id, None)
+                        return
+            if not tail.done():
+                try:
+                    client = client or RundeckClient()
+                    tail.poll(client)
+                    errors = 0
+                except Exception as e:
+                    errors += 1
+                    print(f"[rundeck-tail] {tail.execution_id}: output poll failed: {getattr(e, 'detail', e)}")
+                    if errors >= RUNDECK_TAIL_MAX_ERRORS:
+                        tail.fail("Could not read execution output from Rundeck")
+            time.sleep(RUNDECK_TAIL_INTERVAL)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {str(ex_id): tail.stats() for ex_id, tail in self._tails.items()}
+
+
+TAILS = TailRegistry()
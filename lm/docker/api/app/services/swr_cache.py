@@ -0,0 +1,85 @@
+# /app/services/swr_cache.py
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Hashable
+
+
+class SWRCache:
+    """
+    Small in-process cache for slow upstream reads (Rundeck).
+
+    - fresh (age < ttl): served from memory.
+    - stale (age < ttl + stale): served from memory while one background refresh runs.
+    - missing / expired: loaded; concurrent callers for the same key wait for that one load
+      instead of each hitting the upstream (request coalescing).
+
+    A failed refresh keeps the stale value until it expires; a failed load raises in every
+    waiting caller.
+    """
+
+    def __init__(self, ttl: float, stale: float, max_entries: int = 64):
+        self.ttl = ttl
+        self.stale = stale
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: dict[Hashable, tuple[float, Any]] = {}  # key -> (loaded_at, value)
+        self._inflight: dict[Hashable, Future] = {}
+        self._counters = {"hits": 0, "stale_hits": 0, "misses": 0, "coalesced": 0, "errors": 0}
+
+    def get(self, key: Hashable, loader: Callable[[], Any]) -> Any:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                age = now - entry[0]
+                if age < self.ttl:
+                    self._counters["hits"] += 1
+                    return entry[1]
+                if age < self.ttl + self.stale:
+                    self._counters["stale_hits"] += 1
+                    if key not in self._inflight:
+                        self._inflight[key] = Future()
+                        threading.Thread(target=self._load, args=(key, loader), daemon=True).start()
+                    return entry[1]
+
+            fut = self._inflight.get(key)
+            if fut is None:
+                fut = self._inflight[key] = Future()
+                owner = True
+                self._counters["misses"] += 1
+            else:
+                owner = False
+                self._counters["coalesced"] += 1
+
+        if owner:
+            self._load(key, loader)
+        return fut.result()
+
+    def _load(self, key: Hashable, loader: Callable[[], Any]) -> None:
+        with self._lock:
+            fut = self._inflight[key]
+        try:
+            value = loader()
+        except BaseException as e:
+            with self._lock:
+                self._counters["errors"] += 1
+                self._inflight.pop(key, None)
+            fut.set_exception(e)
+            return
+
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            if len(self._entries) > self.max_entries:
+                oldest = min(self._entries, key=lambda k: self._entries[k][0])
+                self._entries.pop(oldest, None)
+            self._inflight.pop(key, None)
+        fut.set_result(value)
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._entries), "inflight": len(self._inflight), **self._counters}
@@ -34,6 +34,7 @@
     pageSizeSelect: null,
     refreshTimer: null,
     refreshEveryMs: 15000,
+    changesCursor: null, // /api/launchers/changes cursor (only deltas are fetched on refresh)
   };
 
   // ============================================================================
@@ -221,7 +222,8 @@
     const es = new EventSource("/api/events");
 
     // Define which events we care about globally
-    const eventTypes = ["automation_run", "launcher_state", "rundeck_execution"];
+    // "resync" = server could not replay what we missed (Last-Event-ID too old)
+    const eventTypes = ["automation_run", "launcher_state", "rundeck_execution", "launcher_import", "resync"];
 
     eventTypes.forEach((type) => {
       es.addEventListener(type, (e) => {
@@ -265,6 +267,8 @@
 
     window.realtime.on("automation_run", handleAutomationEvent);
     window.realtime.on("launcher_state", handleLauncherStateEvent);
+    // Missed events could not be replayed after a reconnect -> reload the list once
+    window.realtime.on("resync", refreshLaunchersSoft);
   }
 
   function startAutoRefresh() {
@@ -287,8 +291,28 @@
     }
 
     try {
-      const fresh = await Api.get("/api/launchers");
-      if (!Array.isArray(fresh)) return;
+      const url = STATE.changesCursor
+        ? "/api/launchers/changes?since=" + encodeURIComponent(STATE.changesCursor)
+        : "/api/launchers/changes";
+      const feed = await Api.get(url);
+      if (!feed || !Array.isArray(feed.upserts)) return;
+      STATE.changesCursor = feed.cursor;
+
+      const fresh = feed.upserts;
+      const deleted = new Set(feed.deleted || []);
+      if (feed.reset) {
+        // full snapshot: anything not in it is gone
+        const present = new Set(fresh.map((n) => n.machine_name));
+        STATE.launchers.forEach((l) => {
+          if (!present.has(l.machine_name)) deleted.add(l.machine_name);
+        });
+      }
+      if (!fresh.length && !deleted.size) return; // nothing changed
+
+      if (deleted.size) {
+        STATE.launchers = STATE.launchers.filter((l) => !deleted.has(l.machine_name));
+        deleted.forEach((name) => STATE.selected.delete(name));
+      }
 
       // Merge updates by machine_name (keeps selection + references stable)
       const byName = new Map(STATE.launchers.map(l => [l.machine_name, l]));
@@ -827,8 +851,10 @@
     if (!STATE.root) return;
     UI.showLoading();
     try {
-      const launchers = await Api.get("/api/launchers");
-      STATE.launchers = Array.isArray(launchers) ? launchers : [];
+      // Full snapshot + cursor; auto refresh then only asks for changes since this cursor
+      const feed = await Api.get("/api/launchers/changes");
+      STATE.launchers = feed && Array.isArray(feed.upserts) ? feed.upserts : [];
+      STATE.changesCursor = feed ? feed.cursor : null;
       applyFilter(STATE.searchInput ? STATE.searchInput.value || "" : "");
     } catch (err) {
       renderErrorBlock(err);
@@ -1317,18 +1343,39 @@
     footer.appendChild(cancelBtn);
     footer.appendChild(uploadBtn);
 
+    const progress = document.createElement("div");
+    progress.className = "text-muted";
+    progress.style.marginTop = "8px";
+
     form.appendChild(help);
     form.appendChild(fileInput);
+    form.appendChild(progress);
     form.appendChild(footer);
 
+    // Server streams the upload in batches and reports progress over SSE,
+    // tagged with the id we send so other users' imports are ignored
+    let importId = null;
+    const onImportProgress = (evt) => {
+      if (!evt || !evt.phase || evt.import_id !== importId) return;
+      if (evt.phase === "staging") progress.textContent = `Staged ${evt.rows || 0} rows...`;
+      else if (evt.phase === "validating") progress.textContent = `Validating ${evt.rows || 0} rows...`;
+      else if (evt.phase === "merging") progress.textContent = `Saving ${evt.rows || 0} rows...`;
+    };
+
     form.onsubmit = async (e) => {
       e.preventDefault();
       if (!fileInput.files || !fileInput.files[0]) return;
 
+      importId = window.crypto && crypto.randomUUID
+        ? crypto.randomUUID()
+        : `${Date.now().toString(36)}-${Math.random().toString(36).slice(2)}`;
       const fd = new FormData();
       fd.set("file", fileInput.files[0]);
+      fd.set("importId", importId);
 
       UI.showLoading();
+      progress.textContent = "Uploading...";
+      if (window.realtime) window.realtime.on("launcher_import", onImportProgress);
       try {
         const res = await Api.postForm("/api/launchers/import", fd);
 
@@ -1342,8 +1389,10 @@
         loadLaunchers();
         loadGroups(); // refresh counts
       } catch (err) {
+        progress.textContent = "";
         UI.showErrorToast(err);
       } finally {
+        if (window.realtime) window.realtime.off("launcher_import", onImportProgress);
         UI.hideLoading();
       }
     };
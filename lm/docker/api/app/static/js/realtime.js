@@ -22,7 +22,8 @@
 
     es = new EventSource("/api/events"); // SSE/EventSource :contentReference[oaicite:5]{index=5}
 
-    ["launcher_state", "automation_run"].forEach(function (evt) {
+    // "resync": missed events could not be replayed after a reconnect, reload state
+    ["launcher_state", "automation_run", "resync"].forEach(function (evt) {
       es.addEventListener(evt, function (e) {
         let data = null;
         try { data = e.data ? JSON.parse(e.data) : null; }
@@ -9,6 +9,8 @@
 -- Notes:
 -- - Idempotent for first-boot initialization.
 -- - Includes PKs, FKs, and indexes used by LM.
+-- - Re-running it upgrades an existing database (lm/scripts/upgrade-db.sh);
+--   data moved between tables is migrated at the end of the file.
 -- ============================================================
 
 BEGIN;
@@ -41,7 +43,6 @@ CREATE TABLE IF NOT EXISTS public.launcher_policies (
 CREATE TABLE IF NOT EXISTS public.launchers (
     machine_name            TEXT PRIMARY KEY,
     ip_address              INET,
-    online                  BOOLEAN,
     source                  TEXT DEFAULT 'le-api',
     managed_policy_id       INTEGER,
 
@@ -53,14 +54,9 @@ CREATE TABLE IF NOT EXISTS public.launchers (
     -- Inventory / metadata from LE API
     properties              JSONB,
     first_seen              TIMESTAMPTZ,
-    supported_version       BOOLEAN,
-    sessions                INTEGER,
-    current_version         BOOLEAN,
     autologon_enabled       BOOLEAN,
     secure_launcher_enabled BOOLEAN,
     location_id             INTEGER,
-    last_synced_at          TIMESTAMPTZ DEFAULT now(),
-    last_state_change       TIMESTAMPTZ,
     groups                  JSONB,
 
     -- Observed state (Step 8.3.2)
@@ -71,16 +67,24 @@ CREATE TABLE IF NOT EXISTS public.launchers (
     -- Commissioned flag (UI + automation)
     commissioned            BOOLEAN DEFAULT false,
 
+    -- Change feed: id (xid8) of the transaction that last changed the row (trigger-maintained)
+    row_version             XID8,
+
+    -- LE state sync: hash of first_seen / properties / groups as the sync last wrote them
+    -- (NULL = rewrite on next sync); online, sessions, ... live in launcher_telemetry
+    state_hash              TEXT,
+
     CONSTRAINT launchers_credential_id_fkey
         FOREIGN KEY (credential_id)
         REFERENCES public.credentials(id)
         ON DELETE SET NULL
 );
 
--- Indexes for Launchers
-CREATE INDEX IF NOT EXISTS idx_launchers_online
-    ON public.launchers (online);
+-- Upgraded databases (see the header)
+ALTER TABLE public.launchers ADD COLUMN IF NOT EXISTS row_version XID8;
+ALTER TABLE public.launchers ADD COLUMN IF NOT EXISTS state_hash TEXT;
 
+-- Indexes for Launchers
 CREATE INDEX IF NOT EXISTS idx_launchers_commissioned
     ON public.launchers (commissioned);
 
@@ -97,6 +101,88 @@ CREATE INDEX IF NOT EXISTS idx_launchers_credential_id
 CREATE INDEX IF NOT EXISTS idx_launchers_managed_policy_id
     ON public.launchers (managed_policy_id);
 
+CREATE INDEX IF NOT EXISTS idx_launchers_row_version
+    ON public.launchers (row_version);
+
+-- Keyset pagination / prefix filter on /api/launchers (byte order, same as the in-memory index)
+CREATE INDEX IF NOT EXISTS idx_launchers_machine_name_c
+    ON public.launchers (machine_name COLLATE "C");
+
+-- -------------------------
+-- Launcher telemetry (volatile LE state, one row per launcher)
+-- -------------------------
+-- The LE state sync rewrites these columns every minute. Keeping them out of
+-- the wide launchers row (JSONB + GIN indexes) lets those updates stay HOT:
+-- only the primary key is indexed and pages keep free space for new row
+-- versions. Rows are created by a trigger on launchers and go with them.
+-- Read launchers with their telemetry through the launchers_full view.
+CREATE TABLE IF NOT EXISTS public.launcher_telemetry (
+    machine_name      TEXT PRIMARY KEY
+                      REFERENCES public.launchers(machine_name) ON DELETE CASCADE,
+    online            BOOLEAN DEFAULT false,
+    sessions          INTEGER,
+    supported_version BOOLEAN,
+    current_version   BOOLEAN,
+    last_state_change TIMESTAMPTZ,
+    last_synced_at    TIMESTAMPTZ DEFAULT now(),
+
+    -- Change feed (see launchers.row_version); deliberately not indexed (HOT)
+    row_version       XID8,
+
+    -- LE state sync: hash of the telemetry columns as the sync last wrote them
+    state_hash        TEXT
+) WITH (
+    fillfactor = 70,
+    autovacuum_vacuum_scale_factor = 0.05,
+    autovacuum_analyze_scale_factor = 0.05
+);
+
+CREATE OR REPLACE FUNCTION public.lm_launcher_telemetry_create()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    INSERT INTO public.launcher_telemetry (machine_name)
+    SELECT machine_name FROM new_rows
+    ON CONFLICT (machine_name) DO NOTHING;
+    RETURN NULL;
+END;
+$$;
+
+CREATE OR REPLACE TRIGGER trg_launchers_telemetry_create
+    AFTER INSERT ON public.launchers
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION public.lm_launcher_telemetry_create();
+
+CREATE OR REPLACE VIEW public.launchers_full AS
+SELECT l.machine_name,
+       l.ip_address,
+       t.online,
+       l.source,
+       l.managed_policy_id,
+       l.ssh_host,
+       l.ssh_port,
+       l.credential_id,
+       l.properties,
+       l.first_seen,
+       t.supported_version,
+       t.sessions,
+       t.current_version,
+       l.autologon_enabled,
+       l.secure_launcher_enabled,
+       l.location_id,
+       t.last_synced_at,
+       t.last_state_change,
+       l.groups,
+       l.last_commissioned_at,
+       l.launcher_version,
+       l.uwc_bundle_version,
+       l.commissioned,
+       l.row_version,
+       t.row_version AS telemetry_row_version
+FROM public.launchers l
+LEFT JOIN public.launcher_telemetry t ON t.machine_name = l.machine_name;
+
 -- -------------------------
 -- Launcher Groups (mirrors LE launcher group IDs)
 -- -------------------------
@@ -107,12 +193,17 @@ CREATE TABLE IF NOT EXISTS public.launcher_groups (
     filter         TEXT,
     members        JSONB,
     member_count   INTEGER,
+    -- members registered in LM (launcher_group_members rows), trigger-maintained
+    registered_count INTEGER NOT NULL DEFAULT 0,
     description    TEXT,
     last_synced_at TIMESTAMPTZ DEFAULT now(),
     created        TIMESTAMPTZ,
     last_modified  TIMESTAMPTZ
 );
 
+-- Upgraded databases (see the header); counted at the end of "Group registered member counts"
+ALTER TABLE public.launcher_groups ADD COLUMN IF NOT EXISTS registered_count INTEGER NOT NULL DEFAULT 0;
+
 CREATE INDEX IF NOT EXISTS idx_lg_name
     ON public.launcher_groups (name);
 
@@ -156,11 +247,19 @@ CREATE TABLE IF NOT EXISTS public.sync_runs (
     details     JSONB
 );
 
+-- Rolling sync latency (GET /api/sync/stats) and pruning, per source
+CREATE INDEX IF NOT EXISTS idx_sync_runs_source_started
+    ON public.sync_runs (source, started_at DESC);
+
 -- -------------------------
 -- Automation Runs (Rundeck execution tracking)
 -- -------------------------
+-- Range-partitioned by month on created_at (automation_runs_pYYYYMM, UTC).
+-- lm-api keeps partitions created ahead and moves months older than the
+-- hot window to the lm_archive schema (services/run_retention.py). Rows
+-- outside every monthly range land in automation_runs_default.
 CREATE TABLE IF NOT EXISTS public.automation_runs (
-    id           BIGSERIAL PRIMARY KEY,
+    id           BIGSERIAL,
     machine_name TEXT NOT NULL,
     job_name     TEXT NOT NULL,
     status       TEXT NOT NULL,
@@ -168,19 +267,871 @@ CREATE TABLE IF NOT EXISTS public.automation_runs (
     finished_at  TIMESTAMPTZ DEFAULT now(),
     job_type     TEXT,
     step_name    TEXT,
-    result       JSONB
-);
+    result       JSONB,
+    created_at   TIMESTAMPTZ NOT NULL DEFAULT now(),
+    PRIMARY KEY (id, created_at)
+) PARTITION BY RANGE (created_at);
+
+-- An automation_runs created before partitioning stays a plain table when the
+-- database is upgraded (see the header): it only gains created_at, taken from
+-- finished_at, and run_retention.py leaves it alone.
+DO $$
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1 FROM information_schema.columns
+        WHERE table_schema = 'public' AND table_name = 'automation_runs' AND column_name = 'created_at'
+    ) THEN
+        ALTER TABLE public.automation_runs ADD COLUMN created_at TIMESTAMPTZ;
+        UPDATE public.automation_runs SET created_at = coalesce(finished_at, now());
+        ALTER TABLE public.automation_runs
+            ALTER COLUMN created_at SET DEFAULT now(),
+            ALTER COLUMN created_at SET NOT NULL;
+    END IF;
+    IF EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = 'public.automation_runs'::regclass) THEN
+        CREATE TABLE IF NOT EXISTS public.automation_runs_default
+            PARTITION OF public.automation_runs DEFAULT;
+    END IF;
+END;
+$$;
 
-CREATE INDEX IF NOT EXISTS idx_automation_runs_machine
-    ON public.automation_runs (machine_name);
+CREATE SCHEMA IF NOT EXISTS lm_archive;
+
+-- Rows arrive in time order, so a BRIN index stays tiny and still skips
+-- most of a partition for time-range scans
+CREATE INDEX IF NOT EXISTS idx_automation_runs_created_brin
+    ON public.automation_runs USING BRIN (created_at);
+
+-- Run history (GET /api/automation/runs) pages newest first by id
+CREATE INDEX IF NOT EXISTS idx_automation_runs_machine_id
+    ON public.automation_runs (machine_name, id DESC);
 
 CREATE INDEX IF NOT EXISTS idx_automation_runs_job
     ON public.automation_runs (job_name);
 
-CREATE INDEX IF NOT EXISTS idx_automation_runs_job_type
-    ON public.automation_runs (job_type);
+CREATE INDEX IF NOT EXISTS idx_automation_runs_job_type_status_id
+    ON public.automation_runs (job_type, status, id DESC);
+
+CREATE INDEX IF NOT EXISTS idx_automation_runs_step_name_id
+    ON public.automation_runs (step_name, id DESC);
+
+-- Upgraded databases (see the header): the single-column indexes the
+-- composite ones above replace
+DROP INDEX IF EXISTS public.idx_automation_runs_machine;
+DROP INDEX IF EXISTS public.idx_automation_runs_job_type;
+DROP INDEX IF EXISTS public.idx_automation_runs_step_name;
+
+-- Creates the monthly partitions <parent>_pYYYYMM (UTC) of a range-partitioned
+-- table for the current month and months_ahead more. Returns how many were
+-- created (0 if the table is not partitioned).
+CREATE OR REPLACE FUNCTION public.lm_ensure_monthly_partitions(parent TEXT, months_ahead INTEGER DEFAULT 3)
+RETURNS INTEGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    m       DATE := date_trunc('month', now() AT TIME ZONE 'UTC')::date;
+    part    TEXT;
+    created INTEGER := 0;
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = ('public.' || parent)::regclass) THEN
+        RETURN 0;
+    END IF;
+    FOR i IN 0..months_ahead LOOP
+        part := parent || '_p' || to_char(m, 'YYYYMM');
+        IF to_regclass('public.' || part) IS NULL THEN
+            EXECUTE format(
+                'CREATE TABLE public.%I PARTITION OF public.%I FOR VALUES FROM (%L) TO (%L)',
+                part, parent, m || ' 00:00+00', (m + interval '1 month')::date || ' 00:00+00'
+            );
+            created := created + 1;
+        END IF;
+        m := (m + interval '1 month')::date;
+    END LOOP;
+    RETURN created;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION public.lm_automation_runs_ensure_partitions(months_ahead INTEGER DEFAULT 3)
+RETURNS INTEGER
+LANGUAGE sql
+AS $$
+    SELECT public.lm_ensure_monthly_partitions('automation_runs', months_ahead);
+$$;
+
+SELECT public.lm_automation_runs_ensure_partitions();
+
+-- Latest run per (launcher, job_type), maintained by statement triggers on
+-- automation_runs so fleet status is one read instead of a history scan.
+-- job_type '' stands for runs recorded without one. Survives retention.
+CREATE TABLE IF NOT EXISTS public.launcher_last_run (
+    machine_name TEXT NOT NULL,
+    job_type     TEXT NOT NULL,
+    run_id       BIGINT NOT NULL,
+    job_name     TEXT,
+    status       TEXT,
+    step_name    TEXT,
+    created_at   TIMESTAMPTZ,
+    finished_at  TIMESTAMPTZ,
+    PRIMARY KEY (machine_name, job_type)
+);
+
+CREATE INDEX IF NOT EXISTS idx_launcher_last_run_status
+    ON public.launcher_last_run (status, finished_at);
+
+CREATE OR REPLACE FUNCTION public.lm_launcher_last_run_upsert()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    -- Newest run per key wins; updates of an older run (late status) are ignored
+    INSERT INTO public.launcher_last_run AS lr
+        (machine_name, job_type, run_id, job_name, status, step_name, created_at, finished_at)
+    SELECT DISTINCT ON (r.machine_name, coalesce(r.job_type, ''))
+        r.machine_name, coalesce(r.job_type, ''), r.id, r.job_name, r.status, r.step_name,
+        r.created_at, r.finished_at
+    FROM new_rows r
+    ORDER BY r.machine_name, coalesce(r.job_type, ''), r.id DESC
+    ON CONFLICT (machine_name, job_type) DO UPDATE
+    SET run_id      = EXCLUDED.run_id,
+        job_name    = EXCLUDED.job_name,
+        status      = EXCLUDED.status,
+        step_name   = EXCLUDED.step_name,
+        created_at  = EXCLUDED.created_at,
+        finished_at = EXCLUDED.finished_at
+    WHERE EXCLUDED.run_id >= lr.run_id;
+    RETURN NULL;
+END;
+$$;
+
+CREATE OR REPLACE TRIGGER trg_automation_runs_last_run_ins
+    AFTER INSERT ON public.automation_runs
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION public.lm_launcher_last_run_upsert();
+CREATE OR REPLACE TRIGGER trg_automation_runs_last_run_upd
+    AFTER UPDATE ON public.automation_runs
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION public.lm_launcher_last_run_upsert();
+
+-- History stays in automation_runs; the summary follows the fleet
+CREATE OR REPLACE FUNCTION public.lm_launcher_last_run_forget()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    DELETE FROM public.launcher_last_run lr
+    USING old_rows o
+    WHERE lr.machine_name = o.machine_name;
+    RETURN NULL;
+END;
+$$;
+
+INSERT INTO public.launcher_last_run
+    (machine_name, job_type, run_id, job_name, status, step_name, created_at, finished_at)
+SELECT DISTINCT ON (machine_name, coalesce(job_type, ''))
+    machine_name, coalesce(job_type, ''), id, job_name, status, step_name, created_at, finished_at
+FROM public.automation_runs
+ORDER BY machine_name, coalesce(job_type, ''), id DESC
+ON CONFLICT (machine_name, job_type) DO NOTHING;
+
+-- -------------------------
+-- Finished Rundeck executions (served locally, never change)
+-- -------------------------
+-- output is the zlib-compressed JSON log ({"entries", "offset", "lastmod",
+-- "execState"}); EXTERNAL storage keeps TOAST from compressing it again.
+CREATE TABLE IF NOT EXISTS public.rundeck_execution_cache (
+    execution_id BIGINT PRIMARY KEY,
+    status       TEXT NOT NULL,
+    detail       JSONB NOT NULL,
+    output       BYTEA STORAGE EXTERNAL,
+    output_lines INTEGER,
+    output_bytes INTEGER,
+    cached_at    TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+-- -------------------------
+-- Job Queue (durable Rundeck trigger queue)
+-- -------------------------
+-- Consumed with FOR UPDATE SKIP LOCKED. A claimed row is hidden until
+-- visible_at; if the worker dies it becomes visible again for a retry.
+-- triggered_at is set just before the Rundeck trigger is sent: such a row is
+-- never claimed again (the job may already be running), and one left behind
+-- by a dead worker is dropped instead of retried.
+CREATE TABLE IF NOT EXISTS public.job_queue (
+    id           BIGSERIAL PRIMARY KEY,
+    run_id       BIGINT NOT NULL,
+    action       TEXT NOT NULL,
+    machine_name TEXT NOT NULL,
+    attempts     INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL DEFAULT 3,
+    visible_at   TIMESTAMPTZ NOT NULL DEFAULT now(),
+    locked_by    TEXT,
+    locked_at    TIMESTAMPTZ,
+    triggered_at TIMESTAMPTZ,
+    last_error   TEXT,
+    created_at   TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+-- Upgraded databases (see the header)
+ALTER TABLE public.job_queue ADD COLUMN IF NOT EXISTS triggered_at TIMESTAMPTZ;
+
+CREATE INDEX IF NOT EXISTS idx_job_queue_visible
+    ON public.job_queue (visible_at, id);
+
+-- -------------------------
+-- Event Bus (cross-process SSE fan-out)
+-- -------------------------
+-- Events are published with NOTIFY lm_events and re-broadcast by every
+-- lm-api process. Ids come from lm_event_seq. Payloads too large for a
+-- NOTIFY (8000 bytes) are stored in event_outbox and the notification
+-- only carries the id; rows are purged after a short retention window.
+CREATE SEQUENCE IF NOT EXISTS public.lm_event_seq;
+
+CREATE TABLE IF NOT EXISTS public.event_outbox (
+    id         BIGINT PRIMARY KEY,
+    event      TEXT NOT NULL,
+    data       TEXT NOT NULL,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS idx_event_outbox_created_at
+    ON public.event_outbox (created_at);
+
+-- -------------------------
+-- Launcher change feed (GET /api/launchers/changes)
+-- -------------------------
+-- row_version = pg_current_xact_id() of the last writer. A client cursor is
+-- the pg_snapshot of its previous read: rows whose row_version was not yet
+-- visible in that snapshot are new to the client, which also covers
+-- transactions that were still running (no lost late commits). Updates that
+-- only touch last_synced_at / state_hash keep the old row_version. A launcher
+-- changed when either its launchers or its launcher_telemetry row_version did.
+CREATE OR REPLACE FUNCTION public.lm_set_row_version()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    IF TG_OP = 'UPDATE'
+       AND to_jsonb(NEW) - '{last_synced_at,row_version,state_hash}'::text[]
+         = to_jsonb(OLD) - '{last_synced_at,row_version,state_hash}'::text[] THEN
+        NEW.row_version := OLD.row_version;
+    ELSE
+        NEW.row_version := pg_current_xact_id();
+    END IF;
+    RETURN NEW;
+END;
+$$;
+
+CREATE OR REPLACE TRIGGER trg_launchers_row_version
+    BEFORE INSERT OR UPDATE ON public.launchers
+    FOR EACH ROW EXECUTE FUNCTION public.lm_set_row_version();
+
+CREATE OR REPLACE TRIGGER trg_launcher_telemetry_row_version
+    BEFORE INSERT OR UPDATE ON public.launcher_telemetry
+    FOR EACH ROW EXECUTE FUNCTION public.lm_set_row_version();
+
+-- Deleted launchers, so polling clients can drop them. Pruned after a
+-- retention window; clients with an older cursor get a full reset.
+CREATE TABLE IF NOT EXISTS public.launcher_tombstones (
+    machine_name TEXT PRIMARY KEY,
+    row_version  XID8 NOT NULL,
+    deleted_at   TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS idx_launcher_tombstones_row_version
+    ON public.launcher_tombstones (row_version);
+
+CREATE INDEX IF NOT EXISTS idx_launcher_tombstones_deleted_at
+    ON public.launcher_tombstones (deleted_at);
+
+-- Highest row_version pruned per feed (cursors at or below it must reset)
+CREATE TABLE IF NOT EXISTS public.change_feed_state (
+    feed           TEXT PRIMARY KEY,
+    pruned_through XID8
+);
+
+CREATE OR REPLACE FUNCTION public.lm_launchers_tombstone()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    INSERT INTO public.launcher_tombstones (machine_name, row_version, deleted_at)
+    SELECT machine_name, pg_current_xact_id(), now()
+    FROM old_rows
+    ON CONFLICT (machine_name) DO UPDATE
+    SET row_version = EXCLUDED.row_version,
+        deleted_at  = EXCLUDED.deleted_at;
+    RETURN NULL;
+END;
+$$;
+
+CREATE OR REPLACE TRIGGER trg_launchers_tombstone
+    AFTER DELETE ON public.launchers
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION public.lm_launchers_tombstone();
+
+CREATE OR REPLACE TRIGGER trg_launchers_last_run_forget
+    AFTER DELETE ON public.launchers
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION public.lm_launcher_last_run_forget();
+
+-- -------------------------
+-- LE state sync (lm-api services/launcher_sync.py)
+-- -------------------------
+-- The sync hashes the LE fields it writes (launchers and launcher_telemetry
+-- separately) and only updates rows whose state_hash differs. Any other
+-- writer that changes one of those fields (decommission,
+-- POST /api/launchers/{name}/state) clears the hash, so the next sync writes
+-- the LE values again.
+CREATE OR REPLACE FUNCTION public.lm_launchers_state_hash_reset()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    IF NEW.state_hash IS NOT DISTINCT FROM OLD.state_hash
+       AND (NEW.first_seen, NEW.properties, NEW.groups)
+           IS DISTINCT FROM
+           (OLD.first_seen, OLD.properties, OLD.groups) THEN
+        NEW.state_hash := NULL;
+    END IF;
+    RETURN NEW;
+END;
+$$;
+
+CREATE OR REPLACE TRIGGER trg_launchers_state_hash_reset
+    BEFORE UPDATE ON public.launchers
+    FOR EACH ROW EXECUTE FUNCTION public.lm_launchers_state_hash_reset();
+
+CREATE OR REPLACE FUNCTION public.lm_launcher_telemetry_state_hash_reset()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    IF NEW.state_hash IS NOT DISTINCT FROM OLD.state_hash
+       AND (NEW.online, NEW.sessions, NEW.supported_version, NEW.current_version, NEW.last_state_change)
+           IS DISTINCT FROM
+           (OLD.online, OLD.sessions, OLD.supported_version, OLD.current_version, OLD.last_state_change) THEN
+        NEW.state_hash := NULL;
+    END IF;
+    RETURN NEW;
+END;
+$$;
+
+CREATE OR REPLACE TRIGGER trg_launcher_telemetry_state_hash_reset
+    BEFORE UPDATE ON public.launcher_telemetry
+    FOR EACH ROW EXECUTE FUNCTION public.lm_launcher_telemetry_state_hash_reset();
+
+-- -------------------------
+-- Group registered member counts
+-- -------------------------
+-- launcher_groups.registered_count follows launcher_group_members, so
+-- /api/groups reads one row per group instead of joining the fleet.
+-- (member_count is the LE-side total written by the groups sync.)
+CREATE OR REPLACE FUNCTION public.lm_group_registered_count()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    IF TG_OP = 'TRUNCATE' THEN
+        UPDATE public.launcher_groups SET registered_count = 0 WHERE registered_count <> 0;
+        RETURN NULL;
+    END IF;
+
+    -- transition tables differ per event, so each branch only names its own
+    IF TG_OP = 'INSERT' THEN
+        UPDATE public.launcher_groups g
+        SET registered_count = g.registered_count + d.delta
+        FROM (SELECT group_id, count(*) AS delta FROM new_rows GROUP BY group_id) d
+        WHERE g.id = d.group_id;
+    ELSIF TG_OP = 'DELETE' THEN
+        UPDATE public.launcher_groups g
+        SET registered_count = g.registered_count - d.delta
+        FROM (SELECT group_id, count(*) AS delta FROM old_rows GROUP BY group_id) d
+        WHERE g.id = d.group_id;
+    ELSE
+        UPDATE public.launcher_groups g
+        SET registered_count = g.registered_count + d.delta
+        FROM (
+            SELECT group_id, sum(delta) AS delta
+            FROM (
+                SELECT group_id, 1 AS delta FROM new_rows
+                UNION ALL
+                SELECT group_id, -1 FROM old_rows
+            ) x
+            GROUP BY group_id
+            HAVING sum(delta) <> 0
+        ) d
+        WHERE g.id = d.group_id;
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+CREATE OR REPLACE TRIGGER trg_launcher_group_members_count_ins
+    AFTER INSERT ON public.launcher_group_members
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION public.lm_group_registered_count();
+CREATE OR REPLACE TRIGGER trg_launcher_group_members_count_upd
+    AFTER UPDATE ON public.launcher_group_members
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION public.lm_group_registered_count();
+CREATE OR REPLACE TRIGGER trg_launcher_group_members_count_del
+    AFTER DELETE ON public.launcher_group_members
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION public.lm_group_registered_count();
+CREATE OR REPLACE TRIGGER trg_launcher_group_members_count_trunc
+    AFTER TRUNCATE ON public.launcher_group_members
+    FOR EACH STATEMENT EXECUTE FUNCTION public.lm_group_registered_count();
+
+-- Recount (no-op on a fresh database)
+UPDATE public.launcher_groups g
+SET registered_count = c.n
+FROM (
+    SELECT lg.id, count(gm.machine_name)::int AS n
+    FROM public.launcher_groups lg
+    LEFT JOIN public.launcher_group_members gm ON gm.group_id = lg.id
+    GROUP BY lg.id
+) c
+WHERE g.id = c.id AND g.registered_count <> c.n;
+
+-- -------------------------
+-- Launcher state history (lm-api services/launcher_history.py)
+-- -------------------------
+-- Append-only: one row per change of online / state (properties.state) /
+-- sessions, written by triggers on launcher_telemetry and launchers, so the
+-- LE sync and POST /api/launchers/{name}/state are both recorded. changed_at
+-- is the writing transaction's time: changes to both tables in one
+-- transaction merge into one row. A new launcher starts with its initial
+-- state, a deleted one ends with an all-NULL row (state unknown from then on).
+-- transition = false marks the monthly checkpoint rows lm-api writes (the
+-- state of every launcher at the start of a month), which keep each month
+-- self-contained so old partitions can be dropped. Monthly partitions
+-- launcher_state_history_pYYYYMM (UTC).
+CREATE TABLE IF NOT EXISTS public.launcher_state_history (
+    machine_name TEXT NOT NULL,
+    changed_at   TIMESTAMPTZ NOT NULL DEFAULT now(),
+    online       BOOLEAN,
+    state        TEXT,
+    sessions     INTEGER,
+    transition   BOOLEAN NOT NULL DEFAULT true,
+    PRIMARY KEY (machine_name, changed_at)
+) PARTITION BY RANGE (changed_at);
+
+CREATE TABLE IF NOT EXISTS public.launcher_state_history_default
+    PARTITION OF public.launcher_state_history DEFAULT;
+
+CREATE INDEX IF NOT EXISTS idx_launcher_state_history_changed_brin
+    ON public.launcher_state_history USING BRIN (changed_at);
+
+SELECT public.lm_ensure_monthly_partitions('launcher_state_history');
+
+-- Rollups: seconds online / with a known state / session-seconds per bucket,
+-- so coarser buckets are plain sums. Groups (and the whole fleet as group
+-- 00000000-0000-0000-0000-000000000000, current membership) get a row per
+-- 5-minute and per hour bucket. Launchers get an hourly row only for hours
+-- with a transition; the *_end columns carry their state through the hours
+-- without one. sessions_peak of a group is the highest concurrent session
+-- total of its members within the bucket.
+CREATE TABLE IF NOT EXISTS public.launcher_group_state_5m (
+    group_id      UUID NOT NULL,
+    bucket        TIMESTAMPTZ NOT NULL,
+    launchers     INTEGER NOT NULL,
+    online_s      BIGINT NOT NULL,
+    known_s       BIGINT NOT NULL,
+    session_s     BIGINT NOT NULL,
+    sessions_peak INTEGER,
+    transitions   INTEGER NOT NULL,
+    PRIMARY KEY (group_id, bucket)
+);
+
+CREATE TABLE IF NOT EXISTS public.launcher_group_state_1h (
+    LIKE public.launcher_group_state_5m INCLUDING ALL
+);
+
+CREATE TABLE IF NOT EXISTS public.launcher_state_1h (
+    machine_name TEXT NOT NULL,
+    bucket       TIMESTAMPTZ NOT NULL,
+    online_s     INTEGER NOT NULL,
+    known_s      INTEGER NOT NULL,
+    session_s    INTEGER NOT NULL,
+    sessions_max INTEGER,
+    transitions  INTEGER NOT NULL,
+    online_end   BOOLEAN,
+    state_end    TEXT,
+    sessions_end INTEGER,
+    PRIMARY KEY (machine_name, bucket)
+);
+
+-- Rows arrive in bucket order; retention deletes by bucket
+CREATE INDEX IF NOT EXISTS idx_launcher_group_state_5m_bucket_brin
+    ON public.launcher_group_state_5m USING BRIN (bucket);
+CREATE INDEX IF NOT EXISTS idx_launcher_group_state_1h_bucket_brin
+    ON public.launcher_group_state_1h USING BRIN (bucket);
+CREATE INDEX IF NOT EXISTS idx_launcher_state_1h_bucket_brin
+    ON public.launcher_state_1h USING BRIN (bucket);
+
+-- End of the last bucket rolled up per resolution ('5m', '1h')
+CREATE TABLE IF NOT EXISTS public.launcher_state_rollups (
+    resolution     TEXT PRIMARY KEY,
+    rolled_through TIMESTAMPTZ NOT NULL
+);
+
+CREATE OR REPLACE FUNCTION public.lm_launcher_state_record()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        INSERT INTO public.launcher_state_history (machine_name, changed_at)
+        SELECT machine_name, now() FROM old_rows
+        ON CONFLICT (machine_name, changed_at) DO UPDATE
+        SET online = NULL, state = NULL, sessions = NULL, transition = true;
+    ELSIF TG_OP = 'INSERT' THEN
+        INSERT INTO public.launcher_state_history (machine_name, changed_at, online, state, sessions)
+        SELECT n.machine_name, now(), n.online, l.properties->>'state', n.sessions
+        FROM new_rows n
+        JOIN public.launchers l ON l.machine_name = n.machine_name
+        ON CONFLICT (machine_name, changed_at) DO UPDATE
+        SET online = EXCLUDED.online, state = EXCLUDED.state, sessions = EXCLUDED.sessions, transition = true;
+    ELSIF TG_TABLE_NAME = 'launcher_telemetry' THEN
+        INSERT INTO public.launcher_state_history (machine_name, changed_at, online, state, sessions)
+        SELECT n.machine_name, now(), n.online, l.properties->>'state', n.sessions
+        FROM new_rows n
+        JOIN old_rows o ON o.machine_name = n.machine_name
+        JOIN public.launchers l ON l.machine_name = n.machine_name
+        WHERE (o.online, o.sessions) IS DISTINCT FROM (n.online, n.sessions)
+        ON CONFLICT (machine_name, changed_at) DO UPDATE
+        SET online = EXCLUDED.online, state = EXCLUDED.state, sessions = EXCLUDED.sessions, transition = true;
+    ELSE
+        INSERT INTO public.launcher_state_history (machine_name, changed_at, online, state, sessions)
+        SELECT n.machine_name, now(), t.online, n.properties->>'state', t.sessions
+        FROM new_rows n
+        JOIN old_rows o ON o.machine_name = n.machine_name
+        JOIN public.launcher_telemetry t ON t.machine_name = n.machine_name
+        WHERE o.properties->>'state' IS DISTINCT FROM n.properties->>'state'
+        ON CONFLICT (machine_name, changed_at) DO UPDATE
+        SET online = EXCLUDED.online, state = EXCLUDED.state, sessions = EXCLUDED.sessions, transition = true;
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+CREATE OR REPLACE TRIGGER trg_launcher_telemetry_history_ins
+    AFTER INSERT ON public.launcher_telemetry
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION public.lm_launcher_state_record();
+CREATE OR REPLACE TRIGGER trg_launcher_telemetry_history_upd
+    AFTER UPDATE ON public.launcher_telemetry
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION public.lm_launcher_state_record();
+CREATE OR REPLACE TRIGGER trg_launcher_telemetry_history_del
+    AFTER DELETE ON public.launcher_telemetry
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION public.lm_launcher_state_record();
+CREATE OR REPLACE TRIGGER trg_launchers_history_upd
+    AFTER UPDATE ON public.launchers
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION public.lm_launcher_state_record();
+
+-- -------------------------
+-- Collection versions (ETag / If-None-Match on list endpoints)
+-- -------------------------
+-- Bumped once per writing statement, inside the writing transaction, so a
+-- version read together with the rows always describes exactly those rows.
+-- Updates that change nothing but last_synced_at / state_hash do not bump.
+-- launcher_telemetry updates bump 'launchers' (trigger argument). (The counter
+-- row is locked until the writer commits; writers of the same table queue
+-- behind each other for that row only.)
+CREATE TABLE IF NOT EXISTS public.collection_versions (
+    name       TEXT PRIMARY KEY,
+    version    BIGINT NOT NULL DEFAULT 0,
+    changed_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+INSERT INTO public.collection_versions (name)
+VALUES ('launchers'), ('launcher_groups'), ('launcher_group_members'),
+       ('launcher_policies'), ('credentials')
+ON CONFLICT (name) DO NOTHING;
+
+CREATE OR REPLACE FUNCTION public.lm_bump_collection_version()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    IF TG_OP = 'UPDATE' THEN
+        -- transition tables only exist for the UPDATE trigger
+        IF NOT EXISTS (
+            SELECT to_jsonb(n) - '{last_synced_at,state_hash}'::text[] FROM new_rows n
+            EXCEPT ALL
+            SELECT to_jsonb(o) - '{last_synced_at,state_hash}'::text[] FROM old_rows o
+        ) THEN
+            RETURN NULL;
+        END IF;
+    END IF;
+    UPDATE public.collection_versions
+    SET version = version + 1, changed_at = now()
+    WHERE name = COALESCE(TG_ARGV[0], TG_TABLE_NAME);
+    RETURN NULL;
+END;
+$$;
+
+CREATE OR REPLACE TRIGGER trg_launchers_collection_version
+    AFTER INSERT OR DELETE OR TRUNCATE ON public.launchers
+    FOR EACH STATEMENT EXECUTE FUNCTION public.lm_bump_collection_version();
+CREATE OR REPLACE TRIGGER trg_launchers_collection_version_upd
+    AFTER UPDATE ON public.launchers
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION public.lm_bump_collection_version();
+-- (telemetry rows are inserted / deleted together with their launcher)
+CREATE OR REPLACE TRIGGER trg_launcher_telemetry_collection_version_upd
+    AFTER UPDATE ON public.launcher_telemetry
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION public.lm_bump_collection_version('launchers');
+
+CREATE OR REPLACE TRIGGER trg_launcher_groups_collection_version
+    AFTER INSERT OR DELETE OR TRUNCATE ON public.launcher_groups
+    FOR EACH STATEMENT EXECUTE FUNCTION public.lm_bump_collection_version();
+CREATE OR REPLACE TRIGGER trg_launcher_groups_collection_version_upd
+    AFTER UPDATE ON public.launcher_groups
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION public.lm_bump_collection_version();
+
+CREATE OR REPLACE TRIGGER trg_launcher_group_members_collection_version
+    AFTER INSERT OR DELETE OR TRUNCATE ON public.launcher_group_members
+    FOR EACH STATEMENT EXECUTE FUNCTION public.lm_bump_collection_version();
+CREATE OR REPLACE TRIGGER trg_launcher_group_members_collection_version_upd
+    AFTER UPDATE ON public.launcher_group_members
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION public.lm_bump_collection_version();
+
+CREATE OR REPLACE TRIGGER trg_launcher_policies_collection_version
+    AFTER INSERT OR DELETE OR TRUNCATE ON public.launcher_policies
+    FOR EACH STATEMENT EXECUTE FUNCTION public.lm_bump_collection_version();
+CREATE OR REPLACE TRIGGER trg_launcher_policies_collection_version_upd
+    AFTER UPDATE ON public.launcher_policies
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION public.lm_bump_collection_version();
+
+CREATE OR REPLACE TRIGGER trg_credentials_collection_version
+    AFTER INSERT OR DELETE OR TRUNCATE ON public.credentials
+    FOR EACH STATEMENT EXECUTE FUNCTION public.lm_bump_collection_version();
+CREATE OR REPLACE TRIGGER trg_credentials_collection_version_upd
+    AFTER UPDATE ON public.credentials
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION public.lm_bump_collection_version();
+
+-- -------------------------
+-- Inventory change notifications (lm-api in-memory index)
+-- -------------------------
+-- Statement-level triggers send NOTIFY lm_inventory with the keys that
+-- changed: {"table": ..., "keys": [...]}. "keys" is null when the list
+-- would not fit into a NOTIFY, which makes listeners reload that table.
+-- Updates that only touch last_synced_at / state_hash are not reported.
+CREATE OR REPLACE FUNCTION public.lm_inventory_notify(tbl TEXT, keys TEXT[])
+RETURNS void
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    payload TEXT;
+BEGIN
+    IF keys IS NULL OR cardinality(keys) = 0 THEN
+        RETURN;
+    END IF;
+    payload := json_build_object('table', tbl, 'keys', keys)::text;
+    IF octet_length(payload) > 7900 THEN
+        payload := json_build_object('table', tbl, 'keys', NULL)::text;
+    END IF;
+    PERFORM pg_notify('lm_inventory', payload);
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION public.lm_inventory_launchers_changed()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    keys TEXT[];
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        SELECT array_agg(machine_name) INTO keys FROM new_rows;
+    ELSIF TG_OP = 'DELETE' THEN
+        SELECT array_agg(machine_name) INTO keys FROM old_rows;
+    ELSE
+        SELECT array_agg(DISTINCT k) INTO keys
+        FROM (
+            SELECT n.machine_name AS k
+            FROM new_rows n
+            WHERE NOT EXISTS (
+                SELECT 1 FROM old_rows o
+                WHERE o.machine_name = n.machine_name
+                  AND to_jsonb(o) - '{last_synced_at,state_hash}'::text[]
+                    = to_jsonb(n) - '{last_synced_at,state_hash}'::text[]
+            )
+            UNION ALL
+            SELECT o.machine_name
+            FROM old_rows o
+            WHERE NOT EXISTS (SELECT 1 FROM new_rows n WHERE n.machine_name = o.machine_name)
+        ) changed;
+    END IF;
+    PERFORM public.lm_inventory_notify('launchers', keys);
+    RETURN NULL;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION public.lm_inventory_groups_changed()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    keys TEXT[];
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        SELECT array_agg(id::text) INTO keys FROM new_rows;
+    ELSIF TG_OP = 'DELETE' THEN
+        SELECT array_agg(id::text) INTO keys FROM old_rows;
+    ELSE
+        SELECT array_agg(DISTINCT k) INTO keys
+        FROM (
+            SELECT n.id::text AS k
+            FROM new_rows n
+            WHERE NOT EXISTS (
+                SELECT 1 FROM old_rows o
+                WHERE o.id = n.id
+                  AND to_jsonb(o) - '{last_synced_at,state_hash}'::text[]
+                    = to_jsonb(n) - '{last_synced_at,state_hash}'::text[]
+            )
+            UNION ALL
+            SELECT o.id::text
+            FROM old_rows o
+            WHERE NOT EXISTS (SELECT 1 FROM new_rows n WHERE n.id = o.id)
+        ) changed;
+    END IF;
+    PERFORM public.lm_inventory_notify('launcher_groups', keys);
+    RETURN NULL;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION public.lm_inventory_members_changed()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    keys TEXT[];
+BEGIN
+    -- keyed by group: listeners reload the member list of each affected group
+    IF TG_OP = 'INSERT' THEN
+        SELECT array_agg(DISTINCT group_id::text) INTO keys FROM new_rows;
+    ELSIF TG_OP = 'DELETE' THEN
+        SELECT array_agg(DISTINCT group_id::text) INTO keys FROM old_rows;
+    ELSE
+        SELECT array_agg(DISTINCT k) INTO keys
+        FROM (
+            SELECT group_id::text AS k FROM new_rows
+            UNION ALL
+            SELECT group_id::text FROM old_rows
+        ) changed;
+    END IF;
+    PERFORM public.lm_inventory_notify('launcher_group_members', keys);
+    RETURN NULL;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION public.lm_inventory_truncated()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    PERFORM pg_notify('lm_inventory', json_build_object('table', TG_TABLE_NAME, 'keys', NULL)::text);
+    RETURN NULL;
+END;
+$$;
+
+CREATE OR REPLACE TRIGGER trg_launchers_inventory_ins
+    AFTER INSERT ON public.launchers
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION public.lm_inventory_launchers_changed();
+CREATE OR REPLACE TRIGGER trg_launchers_inventory_upd
+    AFTER UPDATE ON public.launchers
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION public.lm_inventory_launchers_changed();
+CREATE OR REPLACE TRIGGER trg_launchers_inventory_del
+    AFTER DELETE ON public.launchers
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION public.lm_inventory_launchers_changed();
+CREATE OR REPLACE TRIGGER trg_launchers_inventory_trunc
+    AFTER TRUNCATE ON public.launchers
+    FOR EACH STATEMENT EXECUTE FUNCTION public.lm_inventory_truncated();
+CREATE OR REPLACE TRIGGER trg_launcher_telemetry_inventory_upd
+    AFTER UPDATE ON public.launcher_telemetry
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION public.lm_inventory_launchers_changed();
+
+CREATE OR REPLACE TRIGGER trg_launcher_groups_inventory_ins
+    AFTER INSERT ON public.launcher_groups
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION public.lm_inventory_groups_changed();
+CREATE OR REPLACE TRIGGER trg_launcher_groups_inventory_upd
+    AFTER UPDATE ON public.launcher_groups
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION public.lm_inventory_groups_changed();
+CREATE OR REPLACE TRIGGER trg_launcher_groups_inventory_del
+    AFTER DELETE ON public.launcher_groups
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION public.lm_inventory_groups_changed();
+CREATE OR REPLACE TRIGGER trg_launcher_groups_inventory_trunc
+    AFTER TRUNCATE ON public.launcher_groups
+    FOR EACH STATEMENT EXECUTE FUNCTION public.lm_inventory_truncated();
+
+CREATE OR REPLACE TRIGGER trg_launcher_group_members_inventory_ins
+    AFTER INSERT ON public.launcher_group_members
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION public.lm_inventory_members_changed();
+CREATE OR REPLACE TRIGGER trg_launcher_group_members_inventory_upd
+    AFTER UPDATE ON public.launcher_group_members
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION public.lm_inventory_members_changed();
+CREATE OR REPLACE TRIGGER trg_launcher_group_members_inventory_del
+    AFTER DELETE ON public.launcher_group_members
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION public.lm_inventory_members_changed();
+CREATE OR REPLACE TRIGGER trg_launcher_group_members_inventory_trunc
+    AFTER TRUNCATE ON public.launcher_group_members
+    FOR EACH STATEMENT EXECUTE FUNCTION public.lm_inventory_truncated();
+
+-- -------------------------
+-- Upgrade: launcher telemetry split
+-- -------------------------
+-- Databases initialised before launcher_telemetry existed still carry its
+-- columns on launchers. Their values are copied over once every telemetry
+-- trigger above is in place (so the state history starts from them), then
+-- the columns are dropped. No-op on a fresh or already upgraded database.
+DO $$
+BEGIN
+    IF EXISTS (
+        SELECT 1 FROM information_schema.columns
+        WHERE table_schema = 'public' AND table_name = 'launchers' AND column_name = 'online'
+    ) THEN
+        INSERT INTO public.launcher_telemetry
+            (machine_name, online, sessions, supported_version, current_version,
+             last_state_change, last_synced_at)
+        SELECT machine_name, online, sessions, supported_version, current_version,
+               last_state_change, last_synced_at
+        FROM public.launchers
+        ON CONFLICT (machine_name) DO UPDATE
+        SET online            = EXCLUDED.online,
+            sessions          = EXCLUDED.sessions,
+            supported_version = EXCLUDED.supported_version,
+            current_version   = EXCLUDED.current_version,
+            last_state_change = EXCLUDED.last_state_change,
+            last_synced_at    = EXCLUDED.last_synced_at;
 
-CREATE INDEX IF NOT EXISTS idx_automation_runs_step_name
-    ON public.automation_runs (step_name);
+        ALTER TABLE public.launchers
+            DROP COLUMN online,
+            DROP COLUMN sessions,
+            DROP COLUMN supported_version,
+            DROP COLUMN current_version,
+            DROP COLUMN last_state_change,
+            DROP COLUMN last_synced_at;
+    END IF;
+END;
+$$;
 
 COMMIT;
@@ -0,0 +1,12 @@
+#!/bin/bash
+# Applies the current LM schema to an existing database.
+# postgres/init only runs on an empty data volume. 10-schema.sql is idempotent and
+# migrates data it moves, so re-running it upgrades an older database in one transaction.
+# Stop the api and worker containers first, then start them on the new image.
+set -e
+source /opt/lm/env/.env
+
+docker exec -i lm-postgres psql -v ON_ERROR_STOP=1 -U "$PGUSER" -d "$PGDATABASE" \
+  < /opt/lm/docker/postgres/init/10-schema.sql
+
+echo "Database schema upgraded."